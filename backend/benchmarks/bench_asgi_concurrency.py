@@ -0,0 +1,119 @@
+"""
+Concurrency benchmark: the read-heavy endpoints over WSGI vs ASGI.
+
+Start the same project twice against the same database, each with a single
+worker process, e.g.:
+
+    gunicorn hospital_management.wsgi:application -w 1 --threads 4 -b 127.0.0.1:8000
+    uvicorn hospital_management.asgi:application --workers 1 --port 8001
+
+then run:
+
+    python benchmarks/bench_asgi_concurrency.py --username doc1 --password secret \\
+        --doctor 1 --concurrency 200 --requests 4000
+
+Each target is hit by ``--concurrency`` simultaneous clients cycling through
+the doctor list, doctor availability and my-appointments endpoints. Reports
+throughput and latency percentiles per target.
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+
+def login(base_url, username, password):
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    body = json.dumps({'username': username, 'password': password})
+    conn.request('POST', '/api/login/', body=body, headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    payload = response.read()
+    if response.status != 200:
+        raise SystemExit(f'Login against {base_url} failed ({response.status}): {payload[:200]!r}')
+    return json.loads(payload)['access']
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_target(base_url, token, paths, concurrency, total):
+    parts = urlsplit(base_url)
+    headers = {'Authorization': f'Bearer {token}', 'Accept-Encoding': 'identity'}
+    local = threading.local()
+    counter = iter(range(total))
+    lock = threading.Lock()
+    latencies, errors = [], []
+
+    def worker():
+        if not hasattr(local, 'conn'):
+            local.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            path = paths[i % len(paths)]
+            start = time.perf_counter()
+            try:
+                local.conn.request('GET', path, headers=headers)
+                response = local.conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                local.conn.close()
+                local.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+                ok = False
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                (latencies if ok else errors).append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    wall = time.perf_counter() - started
+    return latencies, errors, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--wsgi-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--asgi-url', default='http://127.0.0.1:8001')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--doctor', type=int, default=1, help='doctor id for the availability endpoint')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    day = (date.today() + timedelta(days=1)).isoformat()
+    paths = [
+        '/api/doctors/',
+        f'/api/doctors/{args.doctor}/availability/?date={day}&days=7',
+        '/api/appointments/my/',
+    ]
+
+    print(f"{'target':<6} {'ok':>6} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, base_url in (('wsgi', args.wsgi_url), ('asgi', args.asgi_url)):
+        token = login(base_url, args.username, args.password)
+        latencies, errors, wall = run_target(base_url, token, paths, args.concurrency, args.requests)
+        if not latencies:
+            print(f'{label:<6} all {len(errors)} requests failed')
+            continue
+        print(f"{label:<6} {len(latencies):>6} {len(errors):>6} {len(latencies) / wall:>8.1f} "
+              f"{percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} "
+              f"{percentile(latencies, 99):>8.1f}")
+        print(f"{'':<6} mean {statistics.mean(latencies):.1f} ms over {wall:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
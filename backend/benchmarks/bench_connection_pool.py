@@ -0,0 +1,83 @@
+"""
+Benchmark request latency with and without connection reuse.
+
+Simulates short requests (connection checkout, one small query, request
+teardown) against a direct alias that connects per request and against the
+``default`` alias as configured by ``DATABASE_POOL``, and reports
+p50/p95/p99 latency for each.
+
+Usage:
+    python benchmarks/bench_connection_pool.py [--requests 2000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_management.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import DEFAULT_DB_ALIAS, connections  # noqa: E402
+
+from hospital.models import Doctor  # noqa: E402
+
+DIRECT_ALIAS = 'bench_direct'
+
+
+def add_direct_alias():
+    """Register a copy of ``default`` that opens a new connection per request"""
+    base = dict(connections.settings[DEFAULT_DB_ALIAS])
+    direct = dict(base, CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+    direct['OPTIONS'] = {k: v for k, v in base.get('OPTIONS', {}).items() if k != 'pool'}
+    configured = connections.configure_settings({DEFAULT_DB_ALIAS: base, DIRECT_ALIAS: direct})
+    connections.settings[DIRECT_ALIAS] = configured[DIRECT_ALIAS]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(alias, requests):
+    conn = connections[alias]
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        # Same bookkeeping Django does on request_started / request_finished
+        conn.close_if_unusable_or_obsolete()
+        Doctor.objects.using(alias).exists()
+        conn.close_if_unusable_or_obsolete()
+        samples.append((time.perf_counter() - start) * 1000)
+    conn.close()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    add_direct_alias()
+    print(f"{'alias':<14} {'mode':<12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for alias in (DIRECT_ALIAS, DEFAULT_DB_ALIAS):
+        settings_dict = connections[alias].settings_dict
+        if settings_dict.get('OPTIONS', {}).get('pool'):
+            mode = 'pool'
+        elif settings_dict['CONN_MAX_AGE']:
+            mode = 'persistent'
+        else:
+            mode = 'off'
+        run(alias, 20)  # warm-up
+        samples = run(alias, args.requests)
+        print(f"{alias:<14} {mode:<12} {percentile(samples, 50):>8.3f} {percentile(samples, 95):>8.3f} "
+              f"{percentile(samples, 99):>8.3f} {statistics.mean(samples):>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Login throughput benchmark: password hashing on vs. off the request thread.
+
+Simulates a morning login surge against a running server: ``--concurrency``
+clients log in back to back while a few probe clients keep requesting a
+cheap authenticated endpoint. Reports login throughput and latency, and
+how much the probe latency suffers while the surge is on.
+
+Run it once with ``PASSWORD_HASHING['OFFLOAD'] = True`` and once with
+``False`` against the same server setup, e.g.:
+
+    python manage.py seed_loadtest --patients 200
+    gunicorn hospital_management.wsgi:application -w 2 --threads 8 -b 127.0.0.1:8000
+    python benchmarks/bench_login.py --concurrency 32 --duration 20
+
+Raise the ``login`` throttle rate for the run; otherwise most attempts are
+answered 429 before they reach the hasher.
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Client:
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Accept-Encoding': 'identity'}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            payload = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            payload, status = b'', 0
+        return status, payload, (time.perf_counter() - start) * 1000
+
+
+def login_worker(base_url, usernames, password, deadline, results, lock):
+    client = Client(base_url)
+    i = 0
+    while time.monotonic() < deadline:
+        body = json.dumps({'username': usernames[i % len(usernames)], 'password': password})
+        status, _, elapsed = client.request('POST', '/api/login/', body=body)
+        with lock:
+            results.append((status, elapsed))
+        i += 1
+
+
+def probe_worker(base_url, token, path, deadline, results, lock):
+    client = Client(base_url)
+    while time.monotonic() < deadline:
+        status, _, elapsed = client.request('GET', path, token=token)
+        with lock:
+            results.append((status, elapsed))
+        time.sleep(0.05)
+
+
+def run_probes(base_url, token, args, seconds):
+    lock = threading.Lock()
+    results = []
+    deadline = time.monotonic() + seconds
+    threads = [threading.Thread(target=probe_worker, args=(base_url, token, args.probe_path, deadline, results, lock))
+               for _ in range(args.probes)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--username-prefix', default='lt_patient', help='accounts created by seed_loadtest')
+    parser.add_argument('--users', type=int, default=100, help='distinct accounts to log in as')
+    parser.add_argument('--password', default='loadtest')
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent login clients')
+    parser.add_argument('--probes', type=int, default=4, help='concurrent probe clients')
+    parser.add_argument('--probe-path', default='/api/appointments/my/')
+    parser.add_argument('--duration', type=float, default=20)
+    args = parser.parse_args()
+
+    usernames = [f'{args.username_prefix}_{i}' for i in range(args.users)]
+    status, payload, _ = Client(args.url).request(
+        'POST', '/api/login/', body=json.dumps({'username': usernames[0], 'password': args.password}))
+    if status != 200:
+        raise SystemExit(f'Login failed ({status}): {payload[:200]!r}')
+    token = json.loads(payload)['access']
+
+    # Baseline probe latency with no login traffic
+    threads, baseline = run_probes(args.url, token, args, 3)
+    for thread in threads:
+        thread.join()
+
+    lock = threading.Lock()
+    logins = []
+    deadline = time.monotonic() + args.duration
+    probe_threads, surge = run_probes(args.url, token, args, args.duration)
+    login_threads = [
+        threading.Thread(target=login_worker, args=(args.url, usernames, args.password, deadline, logins, lock))
+        for _ in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in login_threads:
+        thread.start()
+    for thread in login_threads + probe_threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    ok = [elapsed for status, elapsed in logins if status == 200]
+    statuses = {}
+    for status, _ in logins:
+        statuses[status] = statuses.get(status, 0) + 1
+    print(f"{'':<18} {'reqs':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    if ok:
+        print(f"{'login (200)':<18} {len(ok):>6} {len(ok) / wall:>8.1f} {percentile(ok, 50):>8.1f} "
+              f"{percentile(ok, 95):>8.1f} {percentile(ok, 99):>8.1f}")
+    for label, samples in (('probe, idle', baseline), ('probe, surge', surge)):
+        latencies = [elapsed for status, elapsed in samples if status == 200]
+        if latencies:
+            print(f"{label:<18} {len(latencies):>6} {'':>8} {percentile(latencies, 50):>8.1f} "
+                  f"{percentile(latencies, 95):>8.1f} {percentile(latencies, 99):>8.1f}")
+    print(f'\nlogin statuses: {statuses} over {wall:.1f} s with {args.concurrency} clients')
+
+
+if __name__ == '__main__':
+    main()
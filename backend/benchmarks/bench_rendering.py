@@ -0,0 +1,121 @@
+"""
+Benchmark JSON rendering and response compression.
+
+Renders representative appointment and medical record list payloads with
+DRF's stdlib JSONRenderer and the orjson-backed FastJSONRenderer, then
+reports render time and wire size (raw, gzip, brotli).
+
+Usage:
+    python benchmarks/bench_rendering.py [--rows 1000] [--repeat 20]
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_management.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from hospital.renderers import FastJSONRenderer  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def appointment_payload(rows):
+    now = timezone.now()
+    doctor = {
+        'id': 7,
+        'user': {'id': 12, 'username': 'dr_smith', 'email': 'smith@example.com',
+                 'first_name': 'Sarah', 'last_name': 'Smith', 'role': 'DOCTOR'},
+        'specialization': 'Cardiology',
+        'department': 3,
+        'contact_info': '+1 555 0100',
+        'schedule': {day: {'start': '09:00', 'end': '17:00', 'break_start': '12:00', 'break_end': '13:00'}
+                     for day in ('monday', 'tuesday', 'wednesday', 'thursday', 'friday')},
+    }
+    return [
+        {
+            'id': i,
+            'patient': 1000 + i,
+            'doctor_details': doctor,
+            'appointment_time': (now + timedelta(minutes=30 * i)).isoformat(),
+            'status': 'S',
+            'notes': '',
+            'reason': 'Follow-up on blood pressure medication',
+            'duration': 30,
+            'created_at': now.isoformat(),
+            'updated_at': now.isoformat(),
+            'can_cancel': True,
+        }
+        for i in range(rows)
+    ]
+
+
+def medical_record_payload(rows):
+    today = timezone.now().date()
+    return [
+        {
+            'id': i,
+            'patient': 1000 + i,
+            'doctor': 7,
+            'visit_date': today,
+            'visit_notes': 'Patient reports intermittent chest pain after exercise. ' * 8,
+            'diagnosis': 'Stable angina',
+            'prescriptions': 'Nitroglycerin 0.4mg SL PRN; Aspirin 81mg daily',
+            'lab_results': 'Troponin negative. LDL 162 mg/dL. ' * 4,
+            'follow_up_required': True,
+            'follow_up_date': today + timedelta(days=14),
+            'attachments': ['records/%d/ecg.pdf' % i, 'records/%d/labs.pdf' % i],
+            'created_at': timezone.now(),
+            'updated_at': timezone.now(),
+            'amount_due': Decimal('120.50'),
+        }
+        for i in range(rows)
+    ]
+
+
+def bench(renderer, data, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = renderer.render(data)
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    payloads = {
+        'appointments': appointment_payload(args.rows),
+        'medical-records': medical_record_payload(args.rows),
+    }
+    renderers = {'stdlib': JSONRenderer(), 'fast': FastJSONRenderer()}
+
+    print(f"{'payload':<16} {'renderer':<8} {'render ms':>10} {'raw B':>10} {'gzip B':>10} {'br B':>10}")
+    for name, data in payloads.items():
+        for label, renderer in renderers.items():
+            seconds, body = bench(renderer, data, args.repeat)
+            gz = len(gzip.compress(body, compresslevel=6))
+            br = len(brotli.compress(body, quality=5)) if brotli else '-'
+            print(f"{name:<16} {label:<8} {seconds * 1000:>10.2f} {len(body):>10} {gz:>10} {br:>10}")
+
+
+if __name__ == '__main__':
+    main()
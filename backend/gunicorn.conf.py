@@ -0,0 +1,7 @@
+# Gunicorn settings. Export PROMETHEUS_MULTIPROC_DIR (an empty directory)
+# before starting so /metrics aggregates every worker process.
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,9 +1,41 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from .db import estimated_count
 from .models import (
     Department, Doctor, Nurse, Staff, Patient,
-    Appointment, MedicalRecord
+    Appointment, ArchivedAppointment, MedicalRecord, ScheduleException
 )
 
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that skips COUNT(*) on the unfiltered list of a large table.
+
+    Uses PostgreSQL's row estimate once it exceeds
+    ``ADMIN_ESTIMATED_COUNT_THRESHOLD``; filtered and searched lists, and
+    small tables, are still counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """Changelist defaults for tables that grow to millions of rows"""
+    paginator = EstimatedCountPaginator
+    # Don't run a second unfiltered COUNT(*) whenever a filter or search is applied
+    show_full_result_count = False
+
+
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
     list_display = ('name', 'description')
@@ -13,34 +45,83 @@ class DepartmentAdmin(admin.ModelAdmin):
 class DoctorAdmin(admin.ModelAdmin):
     list_display = ('user', 'specialization', 'department', 'contact_info')
     list_filter = ('department', 'specialization')
+    list_select_related = ('user', 'department')
     search_fields = ('user__first_name', 'user__last_name', 'specialization')
+    ordering = ('user__last_name', 'user__first_name')
+    raw_id_fields = ('user',)
 
 @admin.register(Nurse)
 class NurseAdmin(admin.ModelAdmin):
     list_display = ('user', 'department', 'shift', 'contact_info')
     list_filter = ('department', 'shift')
+    list_select_related = ('user', 'department')
     search_fields = ('user__first_name', 'user__last_name')
+    ordering = ('user__last_name', 'user__first_name')
+    raw_id_fields = ('user',)
 
 @admin.register(Staff)
 class StaffAdmin(admin.ModelAdmin):
     list_display = ('user', 'role', 'department', 'contact_info')
     list_filter = ('department', 'role')
+    list_select_related = ('user', 'department')
     search_fields = ('user__first_name', 'user__last_name', 'role')
+    raw_id_fields = ('user',)
 
 @admin.register(Patient)
-class PatientAdmin(admin.ModelAdmin):
+class PatientAdmin(ScalableModelAdmin):
     list_display = ('user', 'age', 'gender', 'assigned_doctor', 'assigned_nurse')
     list_filter = ('gender', 'assigned_doctor', 'assigned_nurse')
+    list_select_related = ('user', 'assigned_doctor__user', 'assigned_nurse__user')
     search_fields = ('user__first_name', 'user__last_name')
+    # Newest first by primary key: cheap to page through, and stable for autocomplete
+    ordering = ('-pk',)
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('assigned_doctor', 'assigned_nurse')
 
 @admin.register(Appointment)
-class AppointmentAdmin(admin.ModelAdmin):
+class AppointmentAdmin(ScalableModelAdmin):
     list_display = ('patient', 'doctor', 'appointment_time', 'status')
-    list_filter = ('status', 'appointment_time', 'doctor')
+    list_filter = ('status', 'doctor')
+    list_select_related = ('patient__user', 'doctor__user')
+    search_fields = ('patient__user__first_name', 'patient__user__last_name', 'doctor__user__first_name')
+    date_hierarchy = 'appointment_time'
+    autocomplete_fields = ('patient', 'doctor')
+
+@admin.register(ArchivedAppointment)
+class ArchivedAppointmentAdmin(ScalableModelAdmin):
+    list_display = ('patient', 'doctor', 'appointment_time', 'status', 'archived_at')
+    list_filter = ('doctor',)
+    list_select_related = ('patient__user', 'doctor__user')
     search_fields = ('patient__user__first_name', 'patient__user__last_name', 'doctor__user__first_name')
+    date_hierarchy = 'appointment_time'
+
+    # Written only by manage.py archive_appointments
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ScheduleException)
+class ScheduleExceptionAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'doctor', 'department', 'start_date', 'end_date', 'start_time', 'end_time', 'reason')
+    list_filter = ('kind', 'department')
+    list_select_related = ('doctor__user', 'department')
+    search_fields = ('reason', 'doctor__user__first_name', 'doctor__user__last_name', 'department__name')
+    date_hierarchy = 'start_date'
+    ordering = ('-start_date',)
+    autocomplete_fields = ('doctor',)
+    raw_id_fields = ('created_by',)
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
 
 @admin.register(MedicalRecord)
-class MedicalRecordAdmin(admin.ModelAdmin):
+class MedicalRecordAdmin(ScalableModelAdmin):
     list_display = ('patient', 'doctor', 'created_at')
     list_filter = ('created_at', 'doctor')
+    list_select_related = ('patient__user', 'doctor__user')
     search_fields = ('patient__user__first_name', 'patient__user__last_name', 'doctor__user__first_name')
+    autocomplete_fields = ('patient', 'doctor')
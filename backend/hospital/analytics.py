@@ -0,0 +1,343 @@
+"""
+Reporting aggregates for department heads and admins.
+
+Doctor utilization: booked minutes divided by scheduled minutes.
+Scheduled minutes come from each doctor's weekly schedule as interpreted by
+``get_weekly_schedule`` (working hours minus the break; days a schedule
+leaves out are off), compiled once per doctor and weekday into a doctors x 7
+array and multiplied by how often each weekday occurs in the range. Leave,
+holidays and closures in the range (``ScheduleException``) are loaded in one
+query and their lost minutes deducted day by day for the doctors they cover.
+Booked minutes are summed in the database per doctor and weekday
+(cancelled appointments excluded; no-shows still occupied the slot), so a
+year of appointments arrives as at most 7 rows per doctor. Rollups per
+doctor, department and weekday are then array sums.
+
+Patient demographics: counts per age band, gender, patient type and
+assigned doctor/nurse, grouped in the database and cached. New patients
+are folded into the cached counts by aggregating only rows past the
+snapshot's highest id. Snapshots are keyed on a version counter that
+edits and deletes of patients (and deletes of the doctors or nurses they
+are assigned to) bump, so a request that read the old data can never
+write its result over the invalidation. The snapshot is also rebuilt in
+full every ``PATIENT_DEMOGRAPHICS['FULL_REFRESH_SECONDS']`` so age bands
+follow birthdays and any patient committed out of id order is picked up.
+"""
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, Max, QuerySet, Sum, Value, When
+from django.db.models.functions import ExtractIsoWeekDay
+from django.utils import timezone
+
+from .cache import bump_version, get_version
+from .models import Appointment, Department, Doctor, Nurse, Patient, ScheduleException
+from .utils import ScheduleExceptions, get_weekly_schedule
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+# A Monday, to evaluate each weekday's schedule
+REFERENCE_MONDAY = date(2024, 1, 1)
+
+
+def scheduled_minutes(schedule: Optional[Dict[str, time]], blocked: Iterable[Tuple[time, time]] = ()) -> int:
+    """
+    Working minutes in a day's schedule, minus the parts of the break and of
+    any ``blocked`` (start, end) hours inside working hours
+    """
+    if not schedule:
+        return 0
+
+    def minutes(t: time) -> int:
+        return t.hour * 60 + t.minute
+
+    start, end = minutes(schedule['start_time']), minutes(schedule['end_time'])
+    gaps = list(blocked)
+    if schedule.get('break_start') and schedule.get('break_end'):
+        gaps.append((schedule['break_start'], schedule['break_end']))
+    total = max(0, end - start)
+    # Merge the gaps clipped to working hours, so overlapping ones count once
+    covered_until = start
+    for gap_start, gap_end in sorted((max(start, minutes(a)), min(end, minutes(b))) for a, b in gaps):
+        gap_start = max(gap_start, covered_until)
+        if gap_end > gap_start:
+            total -= gap_end - gap_start
+            covered_until = gap_end
+    return total
+
+
+def weekday_counts(start: date, end: date) -> np.ndarray:
+    """How many Mondays, Tuesdays, ... Sundays fall in [start, end]"""
+    days = np.arange(np.datetime64(start), np.datetime64(end) + 1, dtype='datetime64[D]')
+    # Day 0 of the epoch (1970-01-01) was a Thursday
+    return np.bincount((days.astype(np.int64) + 3) % 7, minlength=7)
+
+
+def exception_minutes(doctors: List[Doctor], weekly_schedules: List[List[Optional[Dict[str, time]]]],
+                      start: date, end: date) -> np.ndarray:
+    """
+    Scheduled minutes lost to schedule exceptions in [start, end], per doctor
+    and weekday (a doctors x 7 array).
+
+    Each day an exception covers is re-evaluated with every exception that
+    applies to the doctor that day, so overlapping exceptions count once.
+    """
+    lost = np.zeros((len(doctors), 7), dtype=np.int64)
+    exceptions = list(ScheduleException.objects.filter(end_date__gte=start, start_date__lte=end).only(
+        'doctor_id', 'department_id', 'start_date', 'end_date', 'start_time', 'end_time',
+    ).order_by())
+    if not exceptions:
+        return lost
+    by_doctor, by_department, hospital_wide = defaultdict(list), defaultdict(list), []
+    for exception in exceptions:
+        if exception.doctor_id is not None:
+            by_doctor[exception.doctor_id].append(exception)
+        elif exception.department_id is not None:
+            by_department[exception.department_id].append(exception)
+        else:
+            hospital_wide.append(exception)
+
+    for i, doctor in enumerate(doctors):
+        applicable = by_doctor[doctor.pk] + by_department[doctor.department_id] + hospital_wide
+        if not applicable:
+            continue
+        lookup = ScheduleExceptions(applicable)
+        days = set()
+        for exception in applicable:
+            day, last = max(exception.start_date, start), min(exception.end_date, end)
+            while day <= last:
+                days.add(day)
+                day += timedelta(days=1)
+        for day in days:
+            schedule = weekly_schedules[i][day.weekday()]
+            remaining = 0 if lookup.is_day_off(day) else scheduled_minutes(schedule, lookup.blocked_hours(day))
+            lost[i, day.weekday()] += scheduled_minutes(schedule) - remaining
+    return lost
+
+
+def ratios(booked: np.ndarray, scheduled: np.ndarray) -> List[Optional[float]]:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.round(booked / scheduled, 4)
+    return [float(v) if s > 0 else None for v, s in zip(values, scheduled)]
+
+
+def doctor_utilization(start: date, end: date, department: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Utilization per doctor, department and weekday over a date range.
+
+    Args:
+        start: First day (inclusive)
+        end: Last day (inclusive)
+        department: Only doctors in this department
+
+    Returns:
+        Dict with the totals and the per-doctor, per-department and
+        per-weekday breakdowns
+    """
+    doctors = Doctor.objects.select_related('user').only(
+        'id', 'department_id', 'schedule', 'user__first_name', 'user__last_name'
+    ).order_by('id')
+    appointments = Appointment.objects.exclude(status='X').filter(
+        appointment_time__gte=timezone.make_aware(datetime.combine(start, time.min)),
+        appointment_time__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+    if department is not None:
+        doctors = doctors.filter(department_id=department)
+        appointments = appointments.filter(doctor__department_id=department)
+    doctors = list(doctors)
+    index = {doctor.pk: i for i, doctor in enumerate(doctors)}
+
+    # Compile each doctor's weekly schedule once: minutes per weekday
+    weekly_schedules = [
+        [get_weekly_schedule(doctor, REFERENCE_MONDAY + timedelta(days=d)) for d in range(7)]
+        for doctor in doctors
+    ]
+    weekly = np.array([[scheduled_minutes(schedule) for schedule in week] for week in weekly_schedules],
+                      dtype=np.int64).reshape(len(doctors), 7)
+    scheduled = weekly * weekday_counts(start, end) - exception_minutes(doctors, weekly_schedules, start, end)
+
+    # Booked minutes per (doctor, ISO weekday), summed in the database
+    rows = list(appointments.order_by().values_list('doctor_id', ExtractIsoWeekDay('appointment_time'))
+                .annotate(minutes=Sum('duration')))
+    booked = np.zeros((len(doctors), 7), dtype=np.int64)
+    rows = [row for row in rows if row[0] in index]
+    if rows:
+        doctor_ids, weekdays, minutes = np.array(rows, dtype=np.int64).T
+        np.add.at(booked, (np.array([index[d] for d in doctor_ids]), weekdays - 1), minutes)
+
+    booked_by_doctor, scheduled_by_doctor = booked.sum(axis=1), scheduled.sum(axis=1)
+    booked_by_weekday, scheduled_by_weekday = booked.sum(axis=0), scheduled.sum(axis=0)
+
+    department_ids = sorted({d.department_id for d in doctors if d.department_id is not None})
+    position = {pk: i for i, pk in enumerate(department_ids)}
+    department_index = np.array([position.get(d.department_id, -1) for d in doctors], dtype=np.int64)
+    in_department = department_index >= 0
+    booked_by_department = np.bincount(department_index[in_department], booked_by_doctor[in_department],
+                                       minlength=len(department_ids))
+    scheduled_by_department = np.bincount(department_index[in_department], scheduled_by_doctor[in_department],
+                                          minlength=len(department_ids))
+    department_names = dict(Department.objects.filter(pk__in=department_ids).values_list('pk', 'name'))
+
+    total_booked, total_scheduled = booked.sum(), scheduled.sum()
+    return {
+        'start': start,
+        'end': end,
+        'booked_minutes': int(total_booked),
+        'scheduled_minutes': int(total_scheduled),
+        'utilization': ratios(np.array([total_booked]), np.array([total_scheduled]))[0],
+        'doctors': [
+            {
+                'doctor_id': doctor.pk,
+                'name': f"{doctor.user.first_name} {doctor.user.last_name}",
+                'department_id': doctor.department_id,
+                'booked_minutes': int(b),
+                'scheduled_minutes': int(s),
+                'utilization': u,
+            }
+            for doctor, b, s, u in zip(doctors, booked_by_doctor, scheduled_by_doctor,
+                                       ratios(booked_by_doctor, scheduled_by_doctor))
+        ],
+        'departments': [
+            {
+                'department_id': pk,
+                'name': department_names.get(pk),
+                'booked_minutes': int(b),
+                'scheduled_minutes': int(s),
+                'utilization': u,
+            }
+            for pk, b, s, u in zip(department_ids, booked_by_department, scheduled_by_department,
+                                   ratios(booked_by_department, scheduled_by_department))
+        ],
+        'weekdays': [
+            {
+                'weekday': day,
+                'booked_minutes': int(b),
+                'scheduled_minutes': int(s),
+                'utilization': u,
+            }
+            for day, b, s, u in zip(WEEKDAYS, booked_by_weekday, scheduled_by_weekday,
+                                    ratios(booked_by_weekday, scheduled_by_weekday))
+        ],
+    }
+
+
+DEMOGRAPHICS_KEY = 'patient_demographics'
+DEMOGRAPHICS_VERSION_KEY = 'patient_demographics:version'
+# (label, lowest age, highest age); None means open-ended
+AGE_BANDS = [('0-17', 0, 17), ('18-34', 18, 34), ('35-49', 35, 49), ('50-64', 50, 64), ('65+', 65, None)]
+DEMOGRAPHIC_DIMENSIONS = ['age_band', 'gender', 'patient_type', 'assigned_doctor_id', 'assigned_nurse_id']
+
+
+def years_before(day: date, years: int) -> date:
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        # February 29th in a non-leap year
+        return day.replace(year=day.year - years, day=28)
+
+
+def age_band_expression(today: date) -> Case:
+    """Age band of a patient: from the date of birth when known, else the stored age"""
+    whens = []
+    for label, _, highest in AGE_BANDS:
+        if highest is None:
+            continue
+        # Born after this date means not yet highest + 1 years old
+        whens.append(When(dob__gt=years_before(today, highest + 1), then=Value(label)))
+    whens.append(When(dob__isnull=False, then=Value(AGE_BANDS[-1][0])))
+    for label, _, highest in AGE_BANDS[:-1]:
+        whens.append(When(age__lte=highest, then=Value(label)))
+    return Case(*whens, default=Value(AGE_BANDS[-1][0]))
+
+
+def count_demographics(queryset: QuerySet) -> Dict[str, Dict[Any, int]]:
+    """Patient counts per value of each demographic dimension, one GROUP BY per dimension"""
+    queryset = queryset.order_by().annotate(age_band=age_band_expression(timezone.localdate()))
+    return {
+        dimension: dict(queryset.values_list(dimension).annotate(count=Count('pk')).values_list(dimension, 'count'))
+        for dimension in DEMOGRAPHIC_DIMENSIONS
+    }
+
+
+def build_demographics_snapshot() -> Dict[str, Any]:
+    max_id = Patient.objects.aggregate(max_id=Max('pk'))['max_id'] or 0
+    return {
+        'counts': count_demographics(Patient.objects.filter(pk__lte=max_id)),
+        'max_id': max_id,
+        'built_at': timezone.now().timestamp(),
+    }
+
+
+def get_demographics_snapshot() -> Dict[str, Any]:
+    """
+    Cached demographic counts, brought up to date with patients added since.
+
+    Returns:
+        Dict with the counts per dimension, the highest patient id included
+        and when the full aggregation last ran
+    """
+    config = settings.PATIENT_DEMOGRAPHICS
+    # Read the version first: an invalidation while we aggregate moves
+    # readers to a new key, so our possibly stale result is never served
+    key = f'{DEMOGRAPHICS_KEY}:{get_version(DEMOGRAPHICS_VERSION_KEY)}'
+    snapshot = cache.get(key)
+    if snapshot is None or timezone.now().timestamp() - snapshot['built_at'] > config['FULL_REFRESH_SECONDS']:
+        snapshot = build_demographics_snapshot()
+    else:
+        # Only patients past the snapshot: an index range scan on the primary key
+        new_patients = Patient.objects.filter(pk__gt=snapshot['max_id'])
+        max_id = new_patients.aggregate(max_id=Max('pk'))['max_id']
+        if max_id is None:
+            return snapshot
+        delta = count_demographics(new_patients.filter(pk__lte=max_id))
+        snapshot = {
+            'counts': {
+                dimension: dict(Counter(snapshot['counts'][dimension]) + Counter(delta[dimension]))
+                for dimension in DEMOGRAPHIC_DIMENSIONS
+            },
+            'max_id': max_id,
+            'built_at': snapshot['built_at'],
+        }
+    cache.set(key, snapshot, config['FULL_REFRESH_SECONDS'])
+    return snapshot
+
+
+def invalidate_demographics() -> None:
+    bump_version(DEMOGRAPHICS_VERSION_KEY)
+
+
+def patient_demographics() -> Dict[str, Any]:
+    """Demographics dashboard data: counts per age band, gender, patient type and assigned staff"""
+    counts = get_demographics_snapshot()['counts']
+    doctor_names = {
+        pk: f'{first} {last}' for pk, first, last in Doctor.objects.filter(
+            pk__in=[pk for pk in counts['assigned_doctor_id'] if pk is not None]
+        ).values_list('pk', 'user__first_name', 'user__last_name')
+    }
+    nurse_names = {
+        pk: f'{first} {last}' for pk, first, last in Nurse.objects.filter(
+            pk__in=[pk for pk in counts['assigned_nurse_id'] if pk is not None]
+        ).values_list('pk', 'user__first_name', 'user__last_name')
+    }
+
+    def staff(dimension, names, key):
+        rows = counts[dimension]
+        return {
+            'assigned': sorted(
+                ({key: pk, 'name': names.get(pk), 'count': count} for pk, count in rows.items() if pk is not None),
+                key=lambda row: -row['count'],
+            ),
+            'unassigned': rows.get(None, 0),
+        }
+
+    return {
+        'total': sum(counts['gender'].values()),
+        'age_bands': [{'band': label, 'count': counts['age_band'].get(label, 0)} for label, _, _ in AGE_BANDS],
+        'gender': {code: counts['gender'].get(code, 0) for code, _ in Patient.GENDER_CHOICES},
+        'patient_type': {code: counts['patient_type'].get(code, 0) for code, _ in Patient.PATIENT_TYPE_CHOICES},
+        'assigned_doctors': staff('assigned_doctor_id', doctor_names, 'doctor_id'),
+        'assigned_nurses': staff('assigned_nurse_id', nurse_names, 'nurse_id'),
+    }
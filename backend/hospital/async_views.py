@@ -0,0 +1,263 @@
+"""
+Async (ASGI) versions of the read-heavy endpoints, plus the live event stream.
+
+These mirror DoctorListView, DoctorAvailabilityView and MyAppointmentsView
+but await the database through Django's async ORM, so a single ASGI worker
+can keep many slow queries in flight. They are routed in place of the sync
+views for ASGI requests (see ``hospital.urls_asgi``). AppointmentEventsView
+only exists under ASGI: a sync worker would spend a thread per open stream.
+"""
+import json
+import math
+import time
+from datetime import timedelta
+
+from django.conf import settings
+
+from django.contrib.auth import aauthenticate
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .authentication import AsyncJWTAuthentication, AsyncJWTQueryParamAuthentication
+from .cache import aget_cached_directory
+from .events import get_broadcast, user_channel
+from .mixins import parse_field_list
+from .models import Appointment, Doctor
+from .renderers import FastJSONRenderer
+from .serializers import AppointmentSerializer, AvailableSlotSerializer, DoctorListSerializer
+from .hashing import HashingOverloaded
+from .throttling import AvailabilityThrottle, LoginThrottle
+from .utils import aget_available_slots, aget_schedule_exceptions
+from .views import filter_appointments_by_type, filter_doctors, parse_availability_params
+
+
+class AsyncAPIView(View):
+    """
+    Minimal async counterpart of APIView for authenticated JSON reads.
+
+    Authenticates with the JWT access token (unless ``authentication_class``
+    is None), throttles and renders like the sync API.
+    """
+    authentication_class = AsyncJWTAuthentication
+    renderer_class = FastJSONRenderer
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token-authenticated like APIView, so exempt from CSRF in the same way
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or handler is None:
+            return self.render({"detail": f'Method "{request.method}" not allowed.'},
+                               status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        if self.authentication_class is None:
+            request.user, request.auth = AnonymousUser(), None
+        else:
+            authenticator = self.authentication_class()
+            try:
+                result = await authenticator.aauthenticate(request)
+            except AuthenticationFailed as exc:
+                detail = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+                return self.unauthorized(authenticator, request, detail)
+            if result is None:
+                return self.unauthorized(authenticator, request,
+                                         {"detail": "Authentication credentials were not provided."})
+            request.user, request.auth = result
+
+        # Throttle buckets live in the local-memory cache, so checking them never blocks
+        waits = [throttle.wait() for throttle in (cls() for cls in self.throttle_classes)
+                 if not throttle.allow_request(request, self)]
+        if waits:
+            return self.throttled(max((wait for wait in waits if wait is not None), default=None))
+
+        return await handler(request, *args, **kwargs)
+
+    def throttled(self, wait):
+        response = self.render({"detail": "Request was throttled."}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        if wait is not None:
+            response['Retry-After'] = str(math.ceil(wait))
+        return response
+
+    def unauthorized(self, authenticator, request, data):
+        response = self.render(data, status=status.HTTP_401_UNAUTHORIZED)
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+        return response
+
+    def render(self, data, status=status.HTTP_200_OK):
+        return HttpResponse(
+            self.renderer_class().render(data),
+            status=status,
+            content_type=self.renderer_class.media_type,
+        )
+
+
+class AsyncDoctorListView(AsyncAPIView):
+    """Async version of DoctorListView, sharing its directory cache"""
+
+    async def get(self, request):
+        filters = {
+            'department': request.GET.get('department'),
+            'specialization': (request.GET.get('specialization') or '').lower(),
+        }
+
+        async def build():
+            queryset = filter_doctors(Doctor.objects.select_related('user'), request.GET)
+            doctors = [doctor async for doctor in queryset]
+            return list(DoctorListSerializer(doctors, many=True).data)
+
+        return self.render(await aget_cached_directory(filters, build))
+
+
+class AsyncDoctorAvailabilityView(AsyncAPIView):
+    """Async version of DoctorAvailabilityView"""
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES + [AvailabilityThrottle]
+
+    async def get(self, request, pk):
+        try:
+            doctor = await Doctor.objects.select_related('user').aget(pk=pk)
+        except Doctor.DoesNotExist:
+            return self.render({"error": "Doctor not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            date, days, duration = parse_availability_params(request.GET)
+        except ValueError as e:
+            return self.render({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        exceptions = await aget_schedule_exceptions(doctor, date, date + timedelta(days=days - 1))
+        all_slots = []
+        for day_offset in range(days):
+            check_date = date + timedelta(days=day_offset)
+            for slot in await aget_available_slots(doctor, check_date, duration, exceptions):
+                all_slots.append({
+                    'start_time': slot,
+                    'end_time': slot + timedelta(minutes=duration)
+                })
+
+        return self.render({
+            'doctor': DoctorListSerializer(doctor).data,
+            'duration': duration,
+            'slots': AvailableSlotSerializer(all_slots, many=True).data
+        })
+
+
+class AsyncMyAppointmentsView(AsyncAPIView):
+    """Async version of MyAppointmentsView, including ?fields= / ?omit="""
+
+    async def get(self, request):
+        user = request.user
+
+        # Join through the profile instead of loading it first
+        if user.role == 'PATIENT':
+            queryset = Appointment.objects.filter(patient__user=user)
+        elif user.role == 'DOCTOR':
+            queryset = Appointment.objects.filter(doctor__user=user)
+        else:
+            queryset = Appointment.objects.none()
+
+        queryset = filter_appointments_by_type(queryset, request.GET.get('filter'))
+
+        fields = parse_field_list(request.GET.get('fields'))
+        omit = parse_field_list(request.GET.get('omit'))
+        queryset = AppointmentSerializer(fields=fields, omit=omit).trim_queryset(queryset)
+
+        appointments = [a async for a in queryset.order_by('appointment_time')]
+        return self.render(AppointmentSerializer(appointments, many=True, fields=fields, omit=omit).data)
+
+
+class AsyncLoginView(AsyncAPIView):
+    """
+    Async version of the JWT login (TokenObtainPairView).
+
+    The password check is awaited on the hashing pool, so a login surge
+    does not hold up the other requests on this event loop.
+    """
+    authentication_class = None
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES + [LoginThrottle]
+    http_method_names = ['post', 'options']
+
+    async def post(self, request):
+        try:
+            credentials = json.loads(request.body or b'{}')
+        except ValueError:
+            return self.render({"detail": "JSON parse error"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(credentials, dict):
+            credentials = {}
+
+        errors = {field: ["This field is required."] for field in ('username', 'password')
+                  if not credentials.get(field)}
+        if errors:
+            return self.render(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            user = await aauthenticate(request, username=credentials['username'],
+                                       password=credentials['password'])
+        except HashingOverloaded as exc:
+            return self.render({"detail": exc.detail}, status=exc.status_code)
+        if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            return self.unauthorized_login()
+
+        refresh = TokenObtainPairSerializer.get_token(user)
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            user.last_login = timezone.now()
+            await user.asave(update_fields=['last_login'])
+        return self.render({'refresh': str(refresh), 'access': str(refresh.access_token)})
+
+    def unauthorized_login(self):
+        response = self.render({"detail": "No active account found with the given credentials"},
+                               status=status.HTTP_401_UNAUTHORIZED)
+        response['WWW-Authenticate'] = 'Bearer realm="api"'
+        return response
+
+
+class AppointmentEventsView(AsyncAPIView):
+    """
+    Server-sent event stream of the user's appointment changes.
+
+    Sends ``appointment`` events (``appointment.created``, ``.updated`` and
+    ``.cancelled``) for appointments where the user is the patient or the
+    doctor, and a ``: keepalive`` comment when idle. If the client falls
+    ``EVENTS['QUEUE_SIZE']`` events behind it gets a ``resync`` event and
+    should catch up from ``/api/sync/appointments/``. The stream ends when
+    the access token expires; EventSource then reconnects and the client
+    supplies a fresh token.
+    """
+    authentication_class = AsyncJWTQueryParamAuthentication
+    http_method_names = ['get']
+
+    async def get(self, request):
+        subscription = get_broadcast().subscribe([user_channel(request.user.pk)])
+        expires_at = request.auth.get('exp')
+        response = StreamingHttpResponse(self.stream(subscription, expires_at), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, subscription, expires_at):
+        config = settings.EVENTS
+        heartbeat = config.get('HEARTBEAT_SECONDS', 15)
+        try:
+            yield f"retry: {config.get('RETRY_MS', 3000)}\nevent: ready\ndata: {{}}\n\n"
+            while expires_at is None or time.time() < expires_at:
+                message = await subscription.get(heartbeat)
+                if subscription.overflowed:
+                    subscription.clear()
+                    yield 'event: resync\ndata: {}\n\n'
+                elif message is None:
+                    yield ': keepalive\n\n'
+                else:
+                    yield f'event: appointment\ndata: {message}\n\n'
+        finally:
+            # Also runs when the client disconnects and Django cancels the stream
+            get_broadcast().unsubscribe(subscription)
@@ -0,0 +1,73 @@
+from typing import Optional, Tuple
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication with an async entry point for plain Django async views.
+
+    Token parsing and validation are pure CPU work and reuse the parent
+    implementation; only the user lookup goes through the async ORM.
+    """
+
+    async def aauthenticate(self, request) -> Optional[Tuple[object, Token]]:
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token: Token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        # CHECK_REVOKE_TOKEN only exists in newer simplejwt releases
+        if getattr(api_settings, 'CHECK_REVOKE_TOKEN', False):
+            from rest_framework_simplejwt.utils import get_md5_hash_password
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+class AsyncJWTQueryParamAuthentication(AsyncJWTAuthentication):
+    """
+    AsyncJWTAuthentication that also accepts ``?access_token=``.
+
+    For event streams: the browser EventSource API cannot set an
+    Authorization header. The header still wins when both are sent. Keep
+    query-string tokens out of proxy access logs.
+    """
+    query_param = 'access_token'
+
+    async def aauthenticate(self, request) -> Optional[Tuple[object, Token]]:
+        if self.get_header(request) is not None:
+            return await super().aauthenticate(request)
+
+        raw_token = request.GET.get(self.query_param)
+        if not raw_token:
+            return None
+
+        validated_token = self.get_validated_token(raw_token.encode())
+        return await self.aget_user(validated_token), validated_token
@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .hashing import amake_password, averify_password, make_password, verify_password
+
+UserModel = get_user_model()
+
+
+class OffloadedModelBackend(ModelBackend):
+    """
+    ModelBackend that checks passwords through ``hospital.hashing``.
+
+    Keeps ModelBackend's behaviour, including hashing once for unknown
+    usernames to hide which accounts exist and upgrading outdated hashes,
+    but the hasher never runs on the request thread or event loop.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            make_password(password)
+            return None
+        is_correct, must_update = verify_password(password, user.password)
+        if is_correct and must_update:
+            user.password = make_password(password)
+            user.save(update_fields=['password'])
+        if is_correct and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            await amake_password(password)
+            return None
+        is_correct, must_update = await averify_password(password, user.password)
+        if is_correct and must_update:
+            user.password = await amake_password(password)
+            await user.asave(update_fields=['password'])
+        if is_correct and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+DIRECTORY_VERSION_KEY = 'doctor_directory:version'
+DIRECTORY_KEY_PREFIX = 'doctor_directory'
+
+
+def get_version(key: str) -> int:
+    """Current value of a cache version counter, seeding it if missing"""
+    version = cache.get(key)
+    if version is None:
+        # Seed with a timestamp so a cache restart never reuses an old version
+        cache.add(key, int(time.time()), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key: str) -> None:
+    """Advance a cache version counter, orphaning entries keyed on the old value"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time()), None)
+
+
+def get_directory_version() -> int:
+    """Current doctor directory version; bumped whenever the directory changes"""
+    return get_version(DIRECTORY_VERSION_KEY)
+
+
+async def aget_directory_version() -> int:
+    """Async version of get_directory_version()"""
+    version = await cache.aget(DIRECTORY_VERSION_KEY)
+    if version is None:
+        await cache.aadd(DIRECTORY_VERSION_KEY, int(time.time()), None)
+        version = await cache.aget(DIRECTORY_VERSION_KEY)
+    return version
+
+
+def bump_directory_version() -> None:
+    """Invalidate every cached directory listing"""
+    bump_version(DIRECTORY_VERSION_KEY)
+
+
+def directory_key(filters: Dict[str, Optional[str]]) -> str:
+    """Stable, version-independent cache key suffix for a filter combination"""
+    raw = '&'.join(f"{name}={filters[name] or ''}" for name in sorted(filters))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def get_cached_directory(filters: Dict[str, Optional[str]], build: Callable[[], Any]) -> Any:
+    """
+    Return the serialized doctor directory for a filter combination.
+
+    Entries are stored per directory version, so a version bump invalidates
+    them all at once. After an invalidation only the worker holding the
+    rebuild lock runs ``build``; the others serve the previous listing
+    (if any) or wait briefly for the fresh one.
+
+    Args:
+        filters: Query filters that shape the listing
+        build: Callable producing the serialized listing
+
+    Returns:
+        Serialized doctor listing
+    """
+    suffix = directory_key(filters)
+    version = get_directory_version()
+    key = f'{DIRECTORY_KEY_PREFIX}:{version}:{suffix}'
+    stale_key = f'{DIRECTORY_KEY_PREFIX}:stale:{suffix}'
+    lock_key = f'{key}:lock'
+
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    lock_timeout = getattr(settings, 'DOCTOR_DIRECTORY_REBUILD_LOCK_TIMEOUT', 10)
+    if not cache.add(lock_key, 1, lock_timeout):
+        stale = cache.get(stale_key)
+        if stale is not None:
+            return stale
+        # Nothing to fall back on: give the lock holder a moment to finish
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            data = cache.get(key)
+            if data is not None:
+                return data
+        return build()
+
+    try:
+        data = build()
+        cache.set(key, data, getattr(settings, 'DOCTOR_DIRECTORY_CACHE_TIMEOUT', 300))
+        cache.set(stale_key, data, getattr(settings, 'DOCTOR_DIRECTORY_STALE_TIMEOUT', 3600))
+        return data
+    finally:
+        cache.delete(lock_key)
+
+
+async def aget_cached_directory(filters: Dict[str, Optional[str]],
+                                build: Callable[[], Awaitable[Any]]) -> Any:
+    """Async version of get_cached_directory(); ``build`` is awaited"""
+    suffix = directory_key(filters)
+    version = await aget_directory_version()
+    key = f'{DIRECTORY_KEY_PREFIX}:{version}:{suffix}'
+    stale_key = f'{DIRECTORY_KEY_PREFIX}:stale:{suffix}'
+    lock_key = f'{key}:lock'
+
+    data = await cache.aget(key)
+    if data is not None:
+        return data
+
+    lock_timeout = getattr(settings, 'DOCTOR_DIRECTORY_REBUILD_LOCK_TIMEOUT', 10)
+    if not await cache.aadd(lock_key, 1, lock_timeout):
+        stale = await cache.aget(stale_key)
+        if stale is not None:
+            return stale
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            data = await cache.aget(key)
+            if data is not None:
+                return data
+        return await build()
+
+    try:
+        data = await build()
+        await cache.aset(key, data, getattr(settings, 'DOCTOR_DIRECTORY_CACHE_TIMEOUT', 300))
+        await cache.aset(stale_key, data, getattr(settings, 'DOCTOR_DIRECTORY_STALE_TIMEOUT', 3600))
+        return data
+    finally:
+        await cache.adelete(lock_key)
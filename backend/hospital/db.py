@@ -0,0 +1,147 @@
+import io
+import json
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+from django.db import DEFAULT_DB_ALIAS, connections, models
+
+_lock = threading.Lock()
+_connections_opened: Counter = Counter()
+
+
+def record_connection_opened(alias: str) -> None:
+    with _lock:
+        _connections_opened[alias] += 1
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Connection pool metrics for this worker process, per database alias.
+
+    Returns:
+        Dictionary keyed by alias with the pooling mode, configuration and
+        counters; pooled aliases also include psycopg_pool's own statistics
+    """
+    stats = {}
+    for alias in connections:
+        conn = connections[alias]
+        settings_dict = conn.settings_dict
+        entry = {
+            'conn_max_age': settings_dict.get('CONN_MAX_AGE', 0),
+            'health_checks': settings_dict.get('CONN_HEALTH_CHECKS', False),
+            'connections_opened': _connections_opened[alias],
+        }
+        pool = getattr(conn, 'pool', None) if settings_dict.get('OPTIONS', {}).get('pool') else None
+        if pool is not None:
+            entry['mode'] = 'pool'
+            entry['pool'] = pool.get_stats()
+        elif entry['conn_max_age']:
+            entry['mode'] = 'persistent'
+            # Only meaningful for the calling thread's connection
+            entry['connected'] = conn.connection is not None
+        else:
+            entry['mode'] = 'off'
+        stats[alias] = entry
+    return stats
+
+
+def reserve_ids(model, count: int, using: str = DEFAULT_DB_ALIAS) -> List[int]:
+    """
+    Draw ``count`` primary keys from a PostgreSQL table's id sequence.
+
+    Lets callers wire up foreign keys before rows are written with COPY,
+    which cannot return generated ids.
+    """
+    if count <= 0:
+        return []
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            [model._meta.db_table, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def estimated_count(model, using: str = DEFAULT_DB_ALIAS) -> Optional[int]:
+    """
+    The planner's row estimate for a model's table, kept fresh by (auto)vacuum/analyze.
+
+    For a partitioned table (see ``hospital.partitioning``) this is the sum
+    over its partitions, as autovacuum never analyzes the parent.
+
+    Returns:
+        Estimated row count, or None if unavailable (not PostgreSQL, or the
+        table was never analyzed)
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        # reltuples is -1 before the first ANALYZE on PostgreSQL 14+, which for
+        # partitions still empty (months ahead) may never come
+        cursor.execute(
+            'SELECT sum(greatest(c.reltuples, 0))::bigint, bool_and(c.reltuples < 0) '
+            'FROM pg_partition_tree(%s::regclass) t JOIN pg_class c ON c.oid = t.relid WHERE t.isleaf',
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[1]:
+        return None
+    return row[0]
+
+
+def _copy_value(field, obj, connection) -> str:
+    value = getattr(obj, field.attname)
+    if value is None and (getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)):
+        value = field.pre_save(obj, add=True)
+    if value is None:
+        return '\\N'
+    if isinstance(field, models.JSONField):
+        text = json.dumps(value, cls=field.encoder)
+    elif isinstance(value, bool):
+        text = 't' if value else 'f'
+    else:
+        text = str(field.get_db_prep_save(value, connection))
+    return (text.replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def copy_insert(model, objs: Sequence[models.Model], using: str = DEFAULT_DB_ALIAS) -> None:
+    """
+    Insert model instances in bulk, using COPY on PostgreSQL.
+
+    Every instance must already carry its primary key (see ``reserve_ids``).
+    Unlike ``bulk_create``, explicitly set ``auto_now``/``auto_now_add``
+    values are kept, so historical timestamps survive. Other backends fall
+    back to ``bulk_create``.
+
+    Args:
+        model: Model class of the instances
+        objs: Instances to insert
+        using: Database alias
+    """
+    if not objs:
+        return
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        model.objects.using(using).bulk_create(objs, batch_size=2000)
+        return
+
+    fields = model._meta.concrete_fields
+    buffer = io.StringIO()
+    for obj in objs:
+        buffer.write('\t'.join(_copy_value(field, obj, connection) for field in fields))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    quote = connection.ops.quote_name
+    sql = 'COPY {} ({}) FROM STDIN'.format(
+        quote(model._meta.db_table), ', '.join(quote(field.column) for field in fields))
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):  # psycopg2
+            raw.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
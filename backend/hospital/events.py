@@ -0,0 +1,211 @@
+"""
+Broadcast layer for live appointment events.
+
+Publishers call ``publish_appointment_event`` (from any thread, usually in a
+``transaction.on_commit`` hook); subscribers are the server-sent event
+streams in ``async_views``. Each subscriber owns a bounded asyncio queue on
+its event loop, so an idle connection costs a queue and a suspended
+coroutine, not a thread. The backend is chosen by ``EVENTS['BACKEND']``:
+
+``InProcessBroadcast``
+    Delivers to subscribers in the publishing process only. Enough when
+    the same process both writes and streams (a single ASGI worker).
+``PostgresBroadcast``
+    Publishes with ``pg_notify`` and runs one ``LISTEN`` thread per process
+    that fans notifications out locally, so every worker sees every event.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_broadcast = None
+_broadcast_lock = threading.Lock()
+
+
+class Subscription:
+    """A subscriber's bounded queue of messages, bound to its event loop"""
+
+    def __init__(self, channels: Iterable[str], maxsize: int):
+        self.channels = tuple(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        # Set when messages were dropped; the client must resync
+        self.overflowed = False
+
+    def deliver(self, message: str) -> None:
+        """Queue a message; safe to call from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The subscriber's loop has shut down
+            pass
+
+    def _put(self, message: str) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> Optional[str]:
+        """Next message, or None if nothing arrived within ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def clear(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.overflowed = False
+
+
+class InProcessBroadcast:
+    """Fan messages out to the subscribers of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+
+    def publish(self, channel: str, message: str) -> None:
+        self.deliver(channel, message)
+
+    def deliver(self, channel: str, message: str) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+    def subscribe(self, channels: Iterable[str]) -> Subscription:
+        """Register a subscription; must be called on the subscriber's event loop"""
+        subscription = Subscription(channels, settings.EVENTS.get('QUEUE_SIZE', 100))
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len({s for subscribers in self._subscribers.values() for s in subscribers})
+
+    def has_subscribers(self) -> bool:
+        """Whether a publish could reach anyone; False lets publishers skip building events"""
+        with self._lock:
+            return bool(self._subscribers)
+
+
+class PostgresBroadcast(InProcessBroadcast):
+    """
+    Cross-process broadcast over PostgreSQL LISTEN/NOTIFY.
+
+    Publishing costs one ``pg_notify`` on the caller's connection (call it
+    after commit). Each process holds one extra connection for its listener
+    thread, started when the first client subscribes.
+    """
+    pg_channel = 'hospital_events'
+
+    def __init__(self, using: str = DEFAULT_DB_ALIAS):
+        super().__init__()
+        self.using = using
+        self._listener: Optional[threading.Thread] = None
+
+    def publish(self, channel: str, message: str) -> None:
+        payload = json.dumps({'c': channel, 'm': message})
+        with connections[self.using].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.pg_channel, payload])
+
+    def has_subscribers(self) -> bool:
+        # Subscribers may be listening in any process
+        return True
+
+    def subscribe(self, channels: Iterable[str]) -> Subscription:
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='event-listener', daemon=True)
+                self._listener.start()
+        return super().subscribe(channels)
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                self._listen_once()
+            except Exception:
+                logger.exception('Event listener lost its connection; reconnecting')
+                time.sleep(1)
+
+    def _listen_once(self) -> None:
+        wrapper = connections[self.using]
+        # A dedicated connection outside Django's per-thread handling and pools
+        raw = wrapper.Database.connect(**wrapper.get_connection_params())
+        try:
+            raw.autocommit = True
+            cursor = raw.cursor()
+            cursor.execute(f'LISTEN {self.pg_channel}')
+            if hasattr(raw, 'poll'):  # psycopg2
+                while True:
+                    if select.select([raw], [], [], 30) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        self._dispatch(raw.notifies.pop(0).payload)
+            else:  # psycopg 3
+                for notify in raw.notifies():
+                    self._dispatch(notify.payload)
+        finally:
+            raw.close()
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return
+        self.deliver(data['c'], data['m'])
+
+
+def get_broadcast():
+    """The process-wide broadcast backend configured in ``EVENTS['BACKEND']``"""
+    global _broadcast
+    with _broadcast_lock:
+        if _broadcast is None:
+            _broadcast = import_string(settings.EVENTS['BACKEND'])()
+        return _broadcast
+
+
+def user_channel(user_id: int) -> str:
+    return f'user:{user_id}'
+
+
+def publish_appointment_event(event: str, appointment: Dict, user_ids: Iterable[int]) -> None:
+    """
+    Notify users about an appointment change.
+
+    Args:
+        event: ``created``, ``updated`` or ``cancelled``
+        appointment: Fields to send (id, status, appointment_time, ...)
+        user_ids: Users to notify, typically the patient's and the doctor's
+    """
+    message = json.dumps({'type': f'appointment.{event}', 'appointment': appointment},
+                         default=str, separators=(',', ':'))
+    broadcast = get_broadcast()
+    for user_id in set(user_ids):
+        if user_id is not None:
+            broadcast.publish(user_channel(user_id), message)
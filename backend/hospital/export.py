@@ -0,0 +1,295 @@
+"""
+Columnar exports of the clinical and billing tables for the analytics
+warehouse.
+
+Each table is exported incrementally by a watermark column: a run writes
+the rows whose watermark falls after the previous run's high-water mark
+and at or before its own (``now`` less ``ANALYTICS_EXPORT['SETTLE_SECONDS']``,
+so transactions still in flight at the cut-off are picked up next time).
+Rows are split into date partitions by watermark, one file per partition
+per run, laid out as ``<table>/<granularity>=<label>/part-<run>.<ext>``.
+Partitions are independent and can be exported in parallel.
+
+Rows are streamed from the database in chunks (a server-side cursor on
+PostgreSQL) and each chunk is written as one Parquet row group, or
+appended to a gzip-compressed CSV when pyarrow isn't installed, so memory
+stays bounded by the chunk size. An edited row is exported again by the
+run after its edit: consumers keep the latest copy of each ``id``.
+"""
+import csv
+import gzip
+import json
+import os
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Type
+
+from django.db import models
+
+from .models import Appointment, Invoice, InvoiceItem, MedicalRecord, Payment
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = pq = None
+
+STATE_FILE = '_watermarks.json'
+
+
+class Export(NamedTuple):
+    model: Type[models.Model]
+    # Rows are exported when this changes; a lookup through a relation for
+    # tables without a timestamp of their own
+    watermark: str
+
+
+EXPORTS: Dict[str, Export] = {
+    'appointments': Export(Appointment, 'updated_at'),
+    'medical_records': Export(MedicalRecord, 'updated_at'),
+    'invoices': Export(Invoice, 'updated_at'),
+    # Saving an item re-saves its invoice, bumping the invoice's updated_at
+    'invoice_items': Export(InvoiceItem, 'invoice__updated_at'),
+    # Payments are not edited after they're taken
+    'payments': Export(Payment, 'payment_date'),
+}
+
+
+class Partition(NamedTuple):
+    table: str
+    label: str
+    # Watermark range [start, end) of the partition intersected with (low, high] of the run
+    start: datetime
+    end: datetime
+    low: Optional[datetime]
+    high: datetime
+
+
+def columns(export: Export) -> List[str]:
+    """Exported columns: every concrete field, plus the watermark when it's on a related table"""
+    names = [field.attname for field in export.model._meta.concrete_fields]
+    if '__' in export.watermark:
+        names.append(export.watermark)
+    return names
+
+
+def column_name(name: str) -> str:
+    return name.replace('__', '_')
+
+
+def arrow_type(field: models.Field):
+    if isinstance(field, (models.AutoField, models.BigAutoField, models.ForeignKey)):
+        return pa.int64()
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.IntegerField):
+        return pa.int64()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    if isinstance(field, models.DecimalField):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    # Text, choices and JSON (serialised)
+    return pa.string()
+
+
+def resolve_field(model: Type[models.Model], lookup: str) -> models.Field:
+    *relations, name = lookup.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def arrow_schema(export: Export):
+    return pa.schema([
+        pa.field(column_name(name), arrow_type(resolve_field(export.model, name)))
+        for name in columns(export)
+    ])
+
+
+def json_columns(export: Export) -> List[int]:
+    return [i for i, name in enumerate(columns(export))
+            if isinstance(resolve_field(export.model, name), models.JSONField)]
+
+
+def partition_bounds(start: datetime, granularity: str) -> Tuple[str, datetime, datetime]:
+    """The UTC day or month containing ``start``: its label and [start, end) range"""
+    day = start.astimezone(dt_timezone.utc).date()
+    if granularity == 'day':
+        first, following = day, day + timedelta(days=1)
+        label = first.isoformat()
+    else:
+        first = day.replace(day=1)
+        following = (first + timedelta(days=32)).replace(day=1)
+        label = first.strftime('%Y-%m')
+    return (
+        label,
+        datetime.combine(first, time.min, tzinfo=dt_timezone.utc),
+        datetime.combine(following, time.min, tzinfo=dt_timezone.utc),
+    )
+
+
+def plan_partitions(table: str, low: Optional[datetime], high: datetime, granularity: str) -> List[Partition]:
+    """
+    Partitions holding rows changed in (low, high].
+
+    On the first run (no ``low``) they start from the oldest watermark in the
+    table. Empty partitions are skipped when the export runs, not here.
+    """
+    export = EXPORTS[table]
+    if low is None:
+        first = export.model.objects.aggregate(first=models.Min(export.watermark))['first']
+        if first is None:
+            return []
+    else:
+        first = low
+    partitions = []
+    cursor = first
+    while cursor <= high:
+        label, start, end = partition_bounds(cursor, granularity)
+        partitions.append(Partition(table, label, start, end, low, high))
+        cursor = end
+    return partitions
+
+
+def partition_rows(partition: Partition, chunk_size: int) -> Iterator[tuple]:
+    export = EXPORTS[partition.table]
+    watermark = export.watermark
+    filters = {
+        f'{watermark}__gte': partition.start,
+        f'{watermark}__lt': partition.end,
+        f'{watermark}__lte': partition.high,
+    }
+    if partition.low is not None:
+        filters[f'{watermark}__gt'] = partition.low
+    queryset = (export.model.objects.filter(**filters)
+                .order_by(watermark, 'pk').values_list(*columns(export)))
+    # iterator() streams through a server-side cursor on PostgreSQL
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def chunked(rows: Iterator[tuple], size: int) -> Iterator[List[tuple]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ParquetPartWriter:
+    extension = 'parquet'
+
+    def __init__(self, path: str, export: Export, compression: str):
+        self.schema = arrow_schema(export)
+        self.json_columns = json_columns(export)
+        self.writer = pq.ParquetWriter(path, self.schema, compression=compression)
+
+    def write(self, chunk: List[tuple]) -> None:
+        values = [list(column) for column in zip(*chunk)]
+        for i in self.json_columns:
+            values[i] = [None if v is None else json.dumps(v) for v in values[i]]
+        # One row group per chunk
+        self.writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(values, self.schema)],
+            schema=self.schema,
+        ))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class CsvPartWriter:
+    extension = 'csv.gz'
+
+    def __init__(self, path: str, export: Export, compression: str):
+        self.file = gzip.open(path, 'wt', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([column_name(name) for name in columns(export)])
+        self.json_columns = json_columns(export)
+
+    def write(self, chunk: List[tuple]) -> None:
+        for row in chunk:
+            row = list(row)
+            for i in self.json_columns:
+                if row[i] is not None:
+                    row[i] = json.dumps(row[i])
+            self.writer.writerow([self.format(value) for value in row])
+
+    @staticmethod
+    def format(value: Any) -> Any:
+        if value is None:
+            return ''
+        if isinstance(value, datetime):
+            return value.astimezone(dt_timezone.utc).isoformat()
+        if isinstance(value, date):
+            return value.isoformat()
+        return value
+
+    def close(self) -> None:
+        self.file.close()
+
+
+WRITERS = {'parquet': ParquetPartWriter, 'csv': CsvPartWriter}
+
+
+def default_format() -> str:
+    return 'parquet' if pa is not None else 'csv'
+
+
+def export_partition(task: Tuple[Partition, Dict[str, Any]]) -> Tuple[str, str, int, Optional[str]]:
+    """
+    Write one partition's changed rows to a new file.
+
+    The file is written under a temporary name and renamed when complete,
+    so readers never see a partial file. Nothing is written for an empty
+    partition.
+
+    Returns:
+        Table, partition label, rows written and the file path (None when empty)
+    """
+    partition, options = task
+    export = EXPORTS[partition.table]
+    writer_class = WRITERS[options['format']]
+    directory = os.path.join(options['output'], partition.table, f"{options['partition']}={partition.label}")
+    path = os.path.join(directory, f"part-{options['run_id']}.{writer_class.extension}")
+    temporary = path + '.tmp'
+
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunked(partition_rows(partition, options['chunk_size']), options['chunk_size']):
+            if writer is None:
+                os.makedirs(directory, exist_ok=True)
+                writer = writer_class(temporary, export, options['compression'])
+            writer.write(chunk)
+            rows += len(chunk)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            os.remove(temporary)
+        raise
+    if writer is None:
+        return partition.table, partition.label, 0, None
+    writer.close()
+    os.replace(temporary, path)
+    return partition.table, partition.label, rows, path
+
+
+def read_watermarks(output: str) -> Dict[str, datetime]:
+    try:
+        with open(os.path.join(output, STATE_FILE)) as f:
+            return {table: datetime.fromisoformat(value) for table, value in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+
+
+def write_watermarks(output: str, watermarks: Dict[str, datetime]) -> None:
+    path = os.path.join(output, STATE_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump({table: value.isoformat() for table, value in sorted(watermarks.items())}, f, indent=2)
+    os.replace(path + '.tmp', path)
@@ -0,0 +1,167 @@
+"""
+Password hashing off the request thread.
+
+PBKDF2 keeps a CPU busy for tens to hundreds of milliseconds per call. With
+``PASSWORD_HASHING['OFFLOAD']`` enabled, hashing and verification run in a
+bounded pool of ``WORKERS`` processes: a sync worker thread waiting on the
+pool no longer competes for the GIL and CPU with the threads serving other
+requests, and async views can await the result without blocking the event
+loop. At most ``MAX_PENDING`` calls may be queued; beyond that callers get
+``HashingOverloaded`` (a 503) after ``QUEUE_TIMEOUT`` seconds instead of
+piling up. Each server process starts its own pool on first use.
+
+Rosters onboarded over HTTP (``make_passwords``) go through the same
+bounded pool, with no more than ``WORKERS`` of their calls queued at once so
+logins keep their turn; ``STAFF_ONBOARDING['MAX_HTTP_ROWS']`` keeps them
+short enough for a request. Large rosters are for ``manage.py
+onboard_staff``, which hashes with ``bulk_make_passwords``: a short-lived
+pool of ``BULK_WORKERS`` threads outside any server process (PBKDF2 in
+hashlib releases the GIL, so the threads hash on every core).
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+_lock = threading.Lock()
+_executor: Optional[ProcessPoolExecutor] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+
+
+class HashingOverloaded(APIException):
+    """Raised when the hashing pool's queue is full"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Server is busy, please retry shortly.'
+    default_code = 'hashing_overloaded'
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _verify(password: str, encoded: str) -> Tuple[bool, bool]:
+    return hashers.verify_password(password, encoded)
+
+
+def _make(password: Optional[str]) -> str:
+    return hashers.make_password(password)
+
+
+def _config():
+    return getattr(settings, 'PASSWORD_HASHING', {})
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """The process pool, started on first use"""
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            config = _config()
+            # Spawn rather than fork: forking a multi-threaded server process is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=config.get('WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+            if _slots is None:
+                # Kept across pool restarts: calls still queued on a broken pool release into it
+                _slots = threading.BoundedSemaphore(config.get('MAX_PENDING', 64))
+        return _executor
+
+
+def _submit(fn, *args):
+    global _executor
+    executor = get_executor()
+    if not _slots.acquire(timeout=_config().get('QUEUE_TIMEOUT', 5)):
+        raise HashingOverloaded
+    try:
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool for this and later calls
+            with _lock:
+                if _executor is executor:
+                    _executor = None
+            future = get_executor().submit(fn, *args)
+    except BaseException:
+        # Nothing was queued, so the slot would otherwise never come back
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def verify_password(password: str, encoded: str) -> Tuple[bool, bool]:
+    """
+    Check a raw password against an encoded hash.
+
+    Returns:
+        Tuple of (is_correct, must_update) like Django's ``verify_password``
+    """
+    if not _config().get('OFFLOAD'):
+        return _verify(password, encoded)
+    return _submit(_verify, password, encoded).result()
+
+
+def make_password(password: Optional[str]) -> str:
+    """Hash a raw password with the preferred hasher"""
+    if not _config().get('OFFLOAD'):
+        return _make(password)
+    return _submit(_make, password).result()
+
+
+def make_passwords(passwords: Sequence[Optional[str]]) -> List[str]:
+    """
+    Hash several passwords in the bounded pool, in order; None gives an
+    unusable password. Raises ``HashingOverloaded`` like make_password().
+    """
+    if not _config().get('OFFLOAD'):
+        return [_make(password) for password in passwords]
+    window = _config().get('WORKERS', 2)
+    pending = deque()
+    hashed = []
+    for password in passwords:
+        if len(pending) >= window:
+            hashed.append(pending.popleft().result())
+        pending.append(_submit(_make, password))
+    hashed.extend(future.result() for future in pending)
+    return hashed
+
+
+def bulk_make_passwords(passwords: Sequence[Optional[str]]) -> List[str]:
+    """
+    Hash many passwords on every core, bypassing the bounded pool. For
+    offline jobs only (manage.py onboard_staff), never inside a request.
+    """
+    if not passwords:
+        return []
+    workers = min(_config().get('BULK_WORKERS') or os.cpu_count() or 1, len(passwords))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_make, passwords))
+
+
+async def averify_password(password: str, encoded: str) -> Tuple[bool, bool]:
+    """Async version of verify_password()"""
+    if not _config().get('OFFLOAD'):
+        return await asyncio.to_thread(_verify, password, encoded)
+    # Waiting for a queue slot may block briefly, so do it off the event loop
+    future = await asyncio.to_thread(_submit, _verify, password, encoded)
+    return await asyncio.wrap_future(future)
+
+
+async def amake_password(password: Optional[str]) -> str:
+    """Async version of make_password()"""
+    if not _config().get('OFFLOAD'):
+        return await asyncio.to_thread(_make, password)
+    future = await asyncio.to_thread(_submit, _make, password)
+    return await asyncio.wrap_future(future)
@@ -0,0 +1,118 @@
+"""
+Per-request performance metrics.
+
+A RequestMetrics object is bound to the current request through a context
+variable (so it follows the request into async ORM threads). Database time is
+collected by an execute wrapper installed on every connection, serializer
+time by ``SerializerTimingMixin`` on the project's serializers.
+"""
+import os
+import time
+import traceback
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+_current: ContextVar[Optional['RequestMetrics']] = ContextVar('request_metrics', default=None)
+
+_PROJECT_ROOT = str(settings.BASE_DIR)
+# Frames from these files never explain where a query came from
+_SKIP_FILES = {
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'middleware.py'),
+}
+
+
+class RequestMetrics:
+    """Timings and counters collected while serving one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_name: Optional[str] = None
+        self.view_started: Optional[float] = None
+        self.view_ms = 0.0
+        self.query_count = 0
+        self.sql_ms = 0.0
+        self.serializer_ms = 0.0
+        # Inside a timed to_representation, so nested serializers aren't counted twice
+        self.serializing = False
+        self.slow_queries: List[Dict[str, Any]] = []
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+
+def start_request_metrics():
+    """Bind a fresh RequestMetrics to the current context; returns (metrics, reset token)"""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request_metrics(token) -> None:
+    _current.reset(token)
+
+
+def current_metrics() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+def originating_frame() -> Optional[str]:
+    """Innermost project source line on the current stack, e.g. ``hospital/views.py:120 in get_queryset``"""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if filename in _SKIP_FILES or not filename.startswith(_PROJECT_ROOT) or 'site-packages' in filename:
+            continue
+        return f'{os.path.relpath(filename, _PROJECT_ROOT)}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def sql_execute_wrapper(execute, sql, params, many, context):
+    """Connection execute wrapper adding query count/time to the current request"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        metrics.query_count += 1
+        metrics.sql_ms += elapsed
+        if elapsed >= settings.REQUEST_METRICS['SLOW_QUERY_MS']:
+            metrics.slow_queries.append({
+                'ms': round(elapsed, 2),
+                'sql': sql[:500],
+                'view': metrics.view_name,
+                'source': originating_frame(),
+            })
+
+
+def install_execute_wrapper(connection) -> None:
+    """Attach sql_execute_wrapper to a connection once"""
+    if sql_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_execute_wrapper)
+
+
+class SerializerTimingMixin:
+    """
+    Serializer mixin adding the time spent in ``to_representation`` to the
+    current request's serializer time.
+
+    Nested serializers are covered by the outermost one. For ``many=True``
+    each item is timed, so querying the list's queryset isn't counted.
+    """
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializing = False
+            metrics.serializer_ms += (time.perf_counter() - start) * 1000
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from hospital.models import Appointment, ArchivedAppointment, Invoice
+
+ARCHIVED_FIELDS = ['id', 'patient_id', 'doctor_id', 'appointment_time', 'status', 'notes', 'reason',
+                   'duration', 'created_at', 'updated_at']
+
+
+class Command(BaseCommand):
+    help = ('Move cancelled appointments older than APPOINTMENT_ARCHIVE["AFTER_DAYS"] into the compressed '
+            'archive table, where history views still find them. Run it from cron, e.g. nightly.')
+
+    def add_arguments(self, parser):
+        config = settings.APPOINTMENT_ARCHIVE
+        parser.add_argument('--after-days', type=int, default=config['AFTER_DAYS'],
+                            help='archive cancelled appointments this many days past')
+        parser.add_argument('--chunk-size', type=int, default=config['CHUNK_SIZE'])
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = now - timedelta(days=options['after_days'])
+        # Appointments that were invoiced stay, so the invoice keeps its link
+        old_cancelled = (Appointment.objects.filter(status='X', appointment_time__lt=cutoff)
+                         .exclude(Exists(Invoice.objects.filter(appointment=OuterRef('pk'))))
+                         .order_by('appointment_time'))
+
+        archived = 0
+        while True:
+            # One short transaction per chunk: rows are copied and deleted together
+            with transaction.atomic():
+                # Locked so a concurrent edit can't slip in between the copy and the delete
+                rows = list(old_cancelled.select_for_update().values(*ARCHIVED_FIELDS)[:options['chunk_size']])
+                if not rows:
+                    break
+                ArchivedAppointment.objects.bulk_create([ArchivedAppointment(**row) for row in rows])
+                # The time bound lets PostgreSQL skip the partitions of recent months
+                Appointment.objects.filter(pk__in=[row['id'] for row in rows], appointment_time__lt=cutoff).delete()
+            archived += len(rows)
+            if len(rows) < options['chunk_size']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} cancelled appointment(s) from before {cutoff:%Y-%m-%d}'
+        ))
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from hospital.partitioning import PARTITIONED_TABLES, ensure_partitions
+
+
+class Command(BaseCommand):
+    help = ('Create the monthly partitions of the appointment and medical record tables for the months '
+            'ahead (PostgreSQL). Run it from cron, e.g. daily.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=settings.PARTITIONING['MONTHS_AHEAD'])
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write('Partitioning is only used on PostgreSQL; nothing to do')
+            return
+        for table in PARTITIONED_TABLES:
+            created = ensure_partitions(table, options['months_ahead'])
+            if created:
+                self.stdout.write(f'{table}: created {", ".join(created)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Partitions exist through {options["months_ahead"]} month(s) ahead'
+        ))
@@ -0,0 +1,404 @@
+"""
+Reproducible synthetic dataset for scale testing.
+
+Doctors, departments and nurses are created first; patients and everything
+hanging off them (appointments, medical records, invoices with line items
+and payments) are then generated in fixed-size chunks spread over worker
+processes. Each chunk draws from its own RNG seeded with ``--seed`` and the
+chunk number, so the generated data does not depend on ``--workers``.
+
+    python manage.py generate_dataset --doctors 2000 --patients 1000000 \\
+        --appointments-per-patient 20 --workers 8
+"""
+import multiprocessing
+import os
+import random
+import time as clock
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from hospital.cache import bump_directory_version
+from hospital.db import copy_insert, reserve_ids
+from hospital.models import (
+    Appointment, Department, Doctor, Invoice, InvoiceItem, MedicalRecord, Nurse, Patient, Payment,
+)
+
+User = get_user_model()
+
+DEPARTMENTS = [
+    'Cardiology', 'Neurology', 'Pediatrics', 'Orthopedics', 'Dermatology', 'Oncology',
+    'Radiology', 'Gastroenterology', 'Psychiatry', 'Ophthalmology', 'Urology', 'General Medicine',
+]
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+FIRST_NAMES = [
+    'James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+    'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Carlos', 'Aisha',
+    'Wei', 'Priya', 'Hiroshi', 'Fatima', 'Olga', 'Mateo', 'Amara', 'Noah', 'Sofia', 'Yusuf',
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+    'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Taylor', 'Thomas', 'Moore', 'Jackson', 'Lee', 'Nguyen',
+    'Kim', 'Patel', 'Chen', 'Khan', 'Ivanova', 'Okafor', 'Silva', 'Cohen', 'Yamamoto', 'Novak',
+]
+REASONS = ['Routine check-up', 'Follow-up visit', 'Chest pain', 'Headache', 'Back pain', 'Skin rash',
+           'Fever', 'Vaccination', 'Blood pressure review', 'Lab results review', 'Joint pain', 'Fatigue']
+DIAGNOSES = ['No acute findings', 'Hypertension', 'Type 2 diabetes', 'Migraine', 'Seasonal allergies',
+             'Upper respiratory infection', 'Lumbar strain', 'Eczema', 'Anxiety', 'Osteoarthritis']
+PRESCRIPTIONS = ['None', 'Ibuprofen 400mg as needed', 'Lisinopril 10mg daily', 'Metformin 500mg twice daily',
+                 'Cetirizine 10mg daily', 'Amoxicillin 500mg three times daily for 7 days']
+ALLERGIES = ['', '', '', 'Penicillin', 'Peanuts', 'Latex', 'Sulfa drugs']
+ITEMS = [
+    ('CONSULTATION', 'Consultation fee', (80, 250)),
+    ('LAB_TEST', 'Blood panel', (30, 180)),
+    ('IMAGING', 'X-ray', (90, 400)),
+    ('MEDICATION', 'Dispensed medication', (10, 120)),
+    ('PROCEDURE', 'Minor procedure', (150, 900)),
+]
+PAYMENT_METHODS = ['CASH', 'CARD', 'INSURANCE', 'ONLINE']
+SLOT_MINUTES = 30
+# Prime stride for the per-doctor slot permutation (see slot_for)
+SLOT_STRIDE = 1_000_003
+
+# Set in each worker process by init_worker()
+_plan = None
+
+
+def insert(model, objs):
+    """Write new instances with COPY (PostgreSQL) or bulk_create, setting their primary keys"""
+    if connection.vendor == 'postgresql':
+        for obj, pk in zip(objs, reserve_ids(model, len(objs))):
+            obj.pk = pk
+    copy_insert(model, objs)
+
+
+def random_schedule(rng):
+    """Varied weekly schedule in the format read by get_weekly_schedule()"""
+    days = WEEKDAYS[:5] if rng.random() < 0.6 else sorted(rng.sample(WEEKDAYS[:6], rng.randint(3, 6)),
+                                                            key=WEEKDAYS.index)
+    start = rng.choice([7, 8, 8, 9, 9, 9, 10])
+    hours = rng.choice([6, 8, 8, 8, 9, 10])
+    schedule = {}
+    for day in days:
+        entry = {'start': f'{start:02d}:00', 'end': f'{start + hours:02d}:00'}
+        if hours >= 8:
+            entry.update({'break_start': f'{start + 4:02d}:00', 'break_end': f'{start + 5:02d}:00'})
+        schedule[day] = entry
+    return schedule
+
+
+def slot_layout(schedule, first_day):
+    """Working-day offsets within a week (relative to first_day) and bookable slot start times"""
+    offsets = sorted((WEEKDAYS.index(day) - first_day.weekday()) % 7 for day in schedule)
+    entry = next(iter(schedule.values()))
+    start = int(entry['start'][:2]) * 60
+    end = int(entry['end'][:2]) * 60
+    blocked = range(int(entry['break_start'][:2]) * 60, int(entry['break_end'][:2]) * 60) \
+        if 'break_start' in entry else range(0)
+    times = [time(minute // 60, minute % 60) for minute in range(start, end, SLOT_MINUTES)
+             if minute not in blocked]
+    return offsets, times
+
+
+def slot_for(doctor, n):
+    """
+    The n-th appointment slot of a doctor within the generated date range.
+
+    Slots are numbered over every working day and slot time; an affine
+    permutation with a prime stride scatters consecutive n over the range
+    while staying collision-free, so chunks generated in parallel never
+    double-book a doctor.
+    """
+    offsets, times = doctor['offsets'], doctor['times']
+    total = _plan['weeks'] * len(offsets) * len(times)
+    index = (n * SLOT_STRIDE + doctor['slot_offset']) % total
+    day_index, slot = divmod(index, len(times))
+    week, weekday = divmod(day_index, len(offsets))
+    day = _plan['first_day'] + timedelta(days=week * 7 + offsets[weekday])
+    return datetime.combine(day, times[slot], tzinfo=timezone.get_current_timezone())
+
+
+def init_worker(plan):
+    global _plan
+    _plan = plan
+    # Fork-started workers inherit the parent's setup; spawn-started ones need their own
+    django.setup()
+    connections.close_all()
+
+
+def generate_chunk(chunk):
+    """Create one chunk of patients with their appointments, records and billing"""
+    plan = _plan
+    rng = random.Random(f"{plan['seed']}-chunk-{chunk}")
+    first = chunk * plan['chunk_size']
+    last = min(first + plan['chunk_size'], plan['patients'])
+    doctors = plan['doctors']
+    now = timezone.now()
+    tz = timezone.get_current_timezone()
+    prefix = plan['prefix']
+    counts = {'patients': last - first, 'appointments': 0, 'records': 0, 'invoices': 0}
+
+    with transaction.atomic():
+        users = [
+            User(username=f'{prefix}_patient_{i}', password=plan['password'], role='PATIENT',
+                 first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                 email=f'{prefix}_patient_{i}@example.com',
+                 date_joined=now - timedelta(days=rng.randint(0, plan['days'])))
+            for i in range(first, last)
+        ]
+        insert(User, users)
+
+        patients = []
+        for user in users:
+            age = int(min(max(rng.gauss(45, 20), 0), 99))
+            in_patient = rng.random() < 0.05
+            patients.append(Patient(
+                user_id=user.pk, age=age,
+                dob=now.date() - timedelta(days=age * 365 + rng.randint(0, 364)),
+                gender=rng.choices('MFO', weights=(49, 49, 2))[0],
+                contact_info=f'+1 {rng.randint(200, 999)} {rng.randint(100, 999)} {rng.randint(0, 9999):04d}',
+                allergies=rng.choice(ALLERGIES),
+                patient_type='IN' if in_patient else 'OUT',
+                assigned_doctor_id=rng.choice(doctors)['id'] if rng.random() < 0.7 else None,
+                assigned_nurse_id=rng.choice(plan['nurses']) if in_patient and plan['nurses'] else None,
+            ))
+        insert(Patient, patients)
+
+        appointments = []
+        per_patient = plan['appointments_per_patient']
+        for offset, patient in enumerate(patients):
+            for n in range(rng.randint(0, 2 * per_patient)):
+                # Global appointment number -> (doctor, that doctor's n-th slot)
+                number = (first + offset) * 2 * per_patient + n
+                doctor = doctors[number % len(doctors)]
+                start = slot_for(doctor, number // len(doctors))
+                if start < now:
+                    status = 'X' if rng.random() < 0.08 else 'C'
+                else:
+                    status = 'X' if rng.random() < 0.05 else 'S'
+                booked = start - timedelta(days=rng.randint(1, 45), minutes=rng.randint(0, 1439))
+                appointments.append(Appointment(
+                    patient_id=patient.pk, doctor_id=doctor['id'], appointment_time=start,
+                    status=status, reason=rng.choice(REASONS), duration=SLOT_MINUTES,
+                    created_at=booked, updated_at=min(max(booked, start), now),
+                ))
+        insert(Appointment, appointments)
+        counts['appointments'] = len(appointments)
+
+        records = []
+        invoices = []
+        completed = [appointment for appointment in appointments if appointment.status == 'C']
+        for appointment in completed:
+            visit = appointment.appointment_time.astimezone(tz)
+            if rng.random() < plan['record_ratio']:
+                follow_up = rng.random() < 0.2
+                records.append(MedicalRecord(
+                    patient_id=appointment.patient_id, doctor_id=appointment.doctor_id,
+                    visit_date=visit.date(), visit_notes=f'{appointment.reason}. Examined and discussed plan.',
+                    diagnosis=rng.choice(DIAGNOSES), prescriptions=rng.choice(PRESCRIPTIONS),
+                    lab_results='Within normal limits' if rng.random() < 0.3 else '',
+                    follow_up_required=follow_up,
+                    follow_up_date=visit.date() + timedelta(days=rng.randint(14, 90)) if follow_up else None,
+                    attachments=[],
+                    created_at=visit + timedelta(hours=1), updated_at=visit + timedelta(hours=1),
+                ))
+            if rng.random() < plan['invoice_ratio']:
+                invoices.append(Invoice(
+                    invoice_number=f"INV-{prefix.upper()}-{plan['seed']}-{chunk}-{len(invoices)}",
+                    patient_id=appointment.patient_id, appointment_id=appointment.pk,
+                    doctor_id=appointment.doctor_id, issue_date=visit.date(),
+                    due_date=visit.date() + timedelta(days=30),
+                    created_at=visit + timedelta(hours=2), updated_at=visit + timedelta(hours=2),
+                ))
+        insert(MedicalRecord, records)
+        counts['records'] = len(records)
+
+        billing = []
+        for invoice in invoices:
+            invoice_items = [
+                InvoiceItem(description=description, item_type=item_type, quantity=rng.randint(1, 2),
+                            unit_price=Decimal(rng.randint(*price_range)))
+                for item_type, description, price_range in
+                [ITEMS[0]] + rng.sample(ITEMS[1:], rng.randint(0, 3))
+            ]
+            invoice.total_amount = sum(item.quantity * item.unit_price for item in invoice_items)
+            roll = rng.random()
+            if roll < 0.7:
+                invoice.paid_amount = invoice.total_amount
+            elif roll < 0.85:
+                invoice.paid_amount = (invoice.total_amount / 2).quantize(Decimal('0.01'))
+            if invoice.paid_amount >= invoice.total_amount:
+                invoice.status = 'PAID'
+            elif invoice.paid_amount > 0:
+                invoice.status = 'PARTIALLY_PAID'
+            else:
+                invoice.status = 'OVERDUE' if invoice.due_date < now.date() else 'UNPAID'
+            payment = None
+            if invoice.paid_amount:
+                payment = Payment(
+                    amount=invoice.paid_amount, payment_method=rng.choice(PAYMENT_METHODS),
+                    transaction_id=f'TX{rng.getrandbits(48):012X}',
+                    payment_date=datetime.combine(invoice.issue_date, time(12), tzinfo=tz)
+                    + timedelta(days=rng.randint(0, 25)),
+                )
+            billing.append((invoice, invoice_items, payment))
+        insert(Invoice, invoices)
+        counts['invoices'] = len(invoices)
+
+        items, payments = [], []
+        for invoice, invoice_items, payment in billing:
+            for item in invoice_items:
+                item.invoice_id = invoice.pk
+            items.extend(invoice_items)
+            if payment is not None:
+                payment.invoice_id = invoice.pk
+                payments.append(payment)
+        insert(InvoiceItem, items)
+        insert(Payment, payments)
+
+    connections.close_all()
+    return counts
+
+
+class Command(BaseCommand):
+    help = 'Generate a large, reproducible synthetic dataset covering every hospital model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--doctors', type=int, default=1000)
+        parser.add_argument('--nurses', type=int, default=500)
+        parser.add_argument('--patients', type=int, default=100000)
+        parser.add_argument('--appointments-per-patient', type=int, default=10,
+                            help='average appointments per patient')
+        parser.add_argument('--record-ratio', type=float, default=0.8,
+                            help='share of completed appointments with a medical record')
+        parser.add_argument('--invoice-ratio', type=float, default=0.6,
+                            help='share of completed appointments that are invoiced')
+        parser.add_argument('--days', type=int, default=730,
+                            help='appointments span this many days, centred on today')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='patients per work unit')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--prefix', default='syn', help='username prefix of generated accounts')
+        parser.add_argument('--password', default='synthetic')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f"Accounts prefixed '{prefix}_' already exist; pick another --prefix.")
+
+        started = clock.monotonic()
+        rng = random.Random(f"{options['seed']}-staff")
+        first_day = timezone.localdate() - timedelta(days=options['days'] // 2)
+        plan = {
+            'seed': options['seed'],
+            'prefix': prefix,
+            # Hash once: every generated account shares the same password
+            'password': make_password(options['password']),
+            'patients': options['patients'],
+            'chunk_size': options['chunk_size'],
+            'appointments_per_patient': options['appointments_per_patient'],
+            'record_ratio': options['record_ratio'],
+            'invoice_ratio': options['invoice_ratio'],
+            'days': options['days'],
+            'weeks': options['days'] // 7,
+            'first_day': first_day,
+        }
+        with transaction.atomic():
+            plan['doctors'], plan['nurses'] = self.create_staff(rng, plan, options)
+        self.check_capacity(plan)
+        self.stdout.write(f"{len(plan['doctors'])} doctors and {len(plan['nurses'])} nurses "
+                          f'created in {clock.monotonic() - started:.1f}s')
+
+        chunks = range((options['patients'] + options['chunk_size'] - 1) // options['chunk_size'])
+        totals = {'patients': 0, 'appointments': 0, 'records': 0, 'invoices': 0}
+        workers = max(1, min(options['workers'], len(chunks)))
+        if workers == 1:
+            init_worker(plan)
+            results = map(generate_chunk, chunks)
+            pool = None
+        else:
+            # Worker processes must not share the parent's database connection
+            connections.close_all()
+            pool = multiprocessing.Pool(workers, initializer=init_worker, initargs=(plan,))
+            results = pool.imap_unordered(generate_chunk, chunks)
+        try:
+            for done, counts in enumerate(results, 1):
+                for key, value in counts.items():
+                    totals[key] += value
+                self.stdout.write(f'  chunk {done}/{len(chunks)}: {totals["patients"]} patients, '
+                                  f'{totals["appointments"]} appointments '
+                                  f'({clock.monotonic() - started:.0f}s)')
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        # Raw inserts skip the signals that normally invalidate the directory
+        bump_directory_version()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {totals['patients']} patients, {totals['appointments']} appointments, "
+            f"{totals['records']} medical records and {totals['invoices']} invoices "
+            f'in {clock.monotonic() - started:.1f}s (password {options["password"]!r})'
+        ))
+
+    def create_staff(self, rng, plan, options):
+        departments = [Department.objects.get_or_create(name=name)[0] for name in DEPARTMENTS]
+        prefix = plan['prefix']
+        now = timezone.now()
+
+        users = [
+            User(username=f'{prefix}_doctor_{i}', password=plan['password'], role='DOCTOR',
+                 first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                 email=f'{prefix}_doctor_{i}@example.com', date_joined=now)
+            for i in range(options['doctors'])
+        ]
+        insert(User, users)
+        doctors = []
+        for i, user in enumerate(users):
+            department = departments[i % len(departments)]
+            doctors.append(Doctor(user_id=user.pk, specialization=department.name, department=department,
+                                  contact_info=f'+1 555 {i:06d}', schedule=random_schedule(rng)))
+        insert(Doctor, doctors)
+
+        nurse_users = [
+            User(username=f'{prefix}_nurse_{i}', password=plan['password'], role='NURSE',
+                 first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                 email=f'{prefix}_nurse_{i}@example.com', date_joined=now)
+            for i in range(options['nurses'])
+        ]
+        insert(User, nurse_users)
+        nurses = [
+            Nurse(user_id=user.pk, department=departments[i % len(departments)],
+                  contact_info=f'+1 556 {i:06d}', shift=rng.choice(['Day', 'Night', 'Evening']))
+            for i, user in enumerate(nurse_users)
+        ]
+        insert(Nurse, nurses)
+
+        doctor_plans = []
+        for doctor in doctors:
+            offsets, times = slot_layout(doctor.schedule, plan['first_day'])
+            doctor_plans.append({'id': doctor.pk, 'offsets': offsets, 'times': times,
+                                 'slot_offset': rng.getrandbits(32)})
+        return doctor_plans, [nurse.pk for nurse in nurses]
+
+    def check_capacity(self, plan):
+        if not plan['doctors']:
+            raise CommandError('At least one doctor is required.')
+        # Appointment numbers run up to patients * 2 * average, spread evenly over doctors
+        needed = plan['patients'] * 2 * plan['appointments_per_patient'] // len(plan['doctors']) + 1
+        smallest = min(plan['weeks'] * len(d['offsets']) * len(d['times']) for d in plan['doctors'])
+        if needed > smallest:
+            raise CommandError(
+                f'Not enough slots: a doctor may need {needed} appointments but the smallest '
+                f'schedule only has {smallest} slots in {plan["days"]} days. '
+                'Increase --days or --doctors.'
+            )
@@ -0,0 +1,43 @@
+import time as clock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from hospital.onboarding import RosterError, onboard_staff, read_roster
+
+
+class Command(BaseCommand):
+    help = ('Create staff accounts with their doctor, nurse or staff profiles from a roster file '
+            '(CSV with a header row, or JSON). Columns: username, password, email, first_name, last_name, '
+            'role (DOCTOR, NURSE, RECEPTIONIST or ADMIN), department (id, or name unless all digits), contact_info, '
+            'specialization (doctors), shift (nurses), position (others).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('roster', help='path to the roster file')
+        parser.add_argument('--dry-run', action='store_true', help='only validate the roster')
+
+    def handle(self, *args, **options):
+        started = clock.monotonic()
+        try:
+            with open(options['roster'], 'rb') as f:
+                rows = read_roster(f.read(), options['roster'])
+            results, created = onboard_staff(rows, dry_run=options['dry_run'], offline=True)
+        except OSError as e:
+            raise CommandError(f'Cannot read roster: {e}')
+        except RosterError as e:
+            raise CommandError(str(e))
+        except IntegrityError:
+            raise CommandError('Some usernames were created by someone else meanwhile; nothing was created')
+
+        failed = 0
+        for result in results:
+            if result['status'] == 'error':
+                failed += 1
+                errors = '; '.join(f'{field}: {" ".join(map(str, messages))}'
+                                   for field, messages in result['errors'].items())
+                self.stderr.write(f"  row {result['row']} ({result['username']}): {errors}")
+        verb = 'Validated' if options['dry_run'] else 'Created'
+        count = len(results) - failed if options['dry_run'] else created
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {count} account(s), {failed} row(s) rejected, in {clock.monotonic() - started:.1f}s'
+        ))
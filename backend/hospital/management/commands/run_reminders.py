@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from hospital.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = 'Send appointment reminders as they fall due (runs until stopped)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='send the reminders due now, then exit (for cron or a quick check)')
+
+    def handle(self, *args, **options):
+        config = settings.REMINDERS
+        scheduler = ReminderScheduler()
+        next_poll = 0.0
+        while True:
+            if time.time() >= next_poll:
+                scheduler.poll()
+                next_poll = time.time() + config['POLL_SECONDS']
+            sent = scheduler.run_due()
+            if sent:
+                self.stdout.write(f'Sent {sent} reminder(s); {len(scheduler.wheel)} pending')
+            if options['once']:
+                break
+            time.sleep(config.get('TICK_SECONDS', 1))
@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from hospital.cache import bump_directory_version
+from hospital.models import Department, Doctor, MedicalRecord, Patient
+
+User = get_user_model()
+
+DEPARTMENTS = ['Cardiology', 'Neurology', 'Pediatrics', 'Orthopedics', 'Dermatology']
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday']
+
+
+class Command(BaseCommand):
+    help = 'Create the doctors, patients and receptionists used by load_test.py'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=20)
+        parser.add_argument('--patients', type=int, default=200)
+        parser.add_argument('--receptionists', type=int, default=5)
+        parser.add_argument('--records-per-patient', type=int, default=2)
+        parser.add_argument('--password', default='loadtest')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        # Hash once: every load-test account shares the same password
+        password = make_password(options['password'])
+        departments = [Department.objects.get_or_create(name=name)[0] for name in DEPARTMENTS]
+
+        doctors = self.create_users('lt_doctor', 'DOCTOR', options['doctors'], password)
+        existing = set(Doctor.objects.filter(user__in=doctors).values_list('user_id', flat=True))
+        Doctor.objects.bulk_create([
+            Doctor(
+                user=user,
+                specialization=departments[i % len(departments)].name,
+                department=departments[i % len(departments)],
+                contact_info=f'+1 555 {i:04d}',
+                schedule={
+                    day: {'start': '09:00', 'end': '17:00', 'break_start': '12:00', 'break_end': '13:00'}
+                    for day in WEEKDAYS
+                },
+            )
+            for i, user in enumerate(doctors) if user.id not in existing
+        ])
+
+        patients = self.create_users('lt_patient', 'PATIENT', options['patients'], password)
+        existing = set(Patient.objects.filter(user__in=patients).values_list('user_id', flat=True))
+        Patient.objects.bulk_create([
+            Patient(user=user, age=20 + i % 60, gender='MFO'[i % 3], contact_info=f'+1 555 {i:06d}')
+            for i, user in enumerate(patients) if user.id not in existing
+        ])
+
+        self.create_records(options['records_per_patient'])
+        self.create_users('lt_reception', 'RECEPTIONIST', options['receptionists'], password)
+        # bulk_create() skips the signals that normally invalidate the directory
+        transaction.on_commit(bump_directory_version)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Load-test data ready: {options['doctors']} doctors, {options['patients']} patients, "
+            f"{options['receptionists']} receptionists (password '{options['password']}')"
+        ))
+
+    def create_records(self, per_patient):
+        patients = list(Patient.objects.filter(user__username__startswith='lt_patient_')
+                        .exclude(medical_records__isnull=False))
+        doctors = list(Doctor.objects.filter(user__username__startswith='lt_doctor_'))
+        if not doctors:
+            return
+        today = timezone.now().date()
+        MedicalRecord.objects.bulk_create([
+            MedicalRecord(
+                patient=patient,
+                doctor=doctors[(patient.id + n) % len(doctors)],
+                visit_date=today - timedelta(days=30 * (n + 1)),
+                visit_notes='Routine check-up.',
+                diagnosis='No acute findings',
+                prescriptions='None',
+            )
+            for patient in patients for n in range(per_patient)
+        ])
+
+    def create_users(self, prefix, role, count, password):
+        usernames = [f'{prefix}_{i}' for i in range(count)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        User.objects.bulk_create([
+            User(username=username, password=password, role=role,
+                 first_name=prefix.split('_')[1].title(), last_name=str(i))
+            for i, username in enumerate(usernames) if username not in existing
+        ])
+        users = {user.username: user for user in User.objects.filter(username__in=usernames)}
+        return [users[username] for username in usernames]
@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from hospital.models import Appointment, MedicalRecord
+
+
+class Command(BaseCommand):
+    help = ('Close out past appointments still marked scheduled: completed if the doctor wrote a '
+            'medical record for the patient that day, no-show otherwise. Run it from cron, e.g. hourly.')
+
+    def add_arguments(self, parser):
+        config = settings.APPOINTMENT_SWEEP
+        parser.add_argument('--grace-hours', type=int, default=config['GRACE_HOURS'],
+                            help='leave appointments this recent for the doctor to update')
+        parser.add_argument('--chunk-size', type=int, default=config['CHUNK_SIZE'])
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = now - timedelta(hours=options['grace_hours'])
+        # Past scheduled appointments, oldest first, via the partial index on scheduled appointment times
+        stale = Appointment.objects.filter(status='S', appointment_time__lt=cutoff).order_by('appointment_time')
+        has_record = Exists(MedicalRecord.objects.filter(
+            patient=OuterRef('patient'),
+            doctor=OuterRef('doctor'),
+            visit_date=OuterRef('visit_day'),
+        ))
+
+        completed = no_show = 0
+        while True:
+            # One short transaction per chunk keeps row locks brief
+            with transaction.atomic():
+                ids = list(stale.values_list('pk', flat=True)[:options['chunk_size']])
+                if not ids:
+                    break
+                # status='S' again: a doctor may have updated some rows since they were selected
+                chunk = Appointment.objects.filter(pk__in=ids, status='S')
+                # update() bypasses auto_now; stamp updated_at so change feeds pick the rows up
+                chunk_completed = (chunk.annotate(visit_day=TruncDate('appointment_time'))
+                                   .filter(has_record).update(status='C', updated_at=now))
+                chunk_no_show = chunk.update(status='N', updated_at=now)
+            completed += chunk_completed
+            no_show += chunk_no_show
+            if len(ids) < options['chunk_size']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Marked {completed} appointment(s) completed and {no_show} no-show (before {cutoff:%Y-%m-%d %H:%M})'
+        ))
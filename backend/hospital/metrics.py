@@ -0,0 +1,62 @@
+"""
+Prometheus metrics.
+
+Metric objects are module-level singletons; updating them is a dict lookup
+and a lock, cheap enough for every request. With ``PROMETHEUS_MULTIPROC_DIR``
+set (before the workers start), prometheus_client keeps the values in
+per-process files and ``render_metrics`` aggregates all workers.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest,
+)
+from prometheus_client import multiprocess
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUEST_LATENCY = Histogram(
+    'hospital_http_request_duration_seconds',
+    'Request latency by URL name',
+    ['view', 'method'],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    'hospital_http_requests_total',
+    'Requests by URL name and status code',
+    ['view', 'method', 'status'],
+)
+REQUEST_ERRORS = Counter(
+    'hospital_http_request_errors_total',
+    'Requests answered with a 5xx status, by URL name',
+    ['view', 'method'],
+)
+DB_QUERIES = Histogram(
+    'hospital_db_queries_per_request',
+    'Database queries per request by URL name',
+    ['view'],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+
+BOOKINGS_ATTEMPTED = Counter('hospital_bookings_attempted_total', 'Appointment booking attempts')
+SLOT_CONFLICTS = Counter('hospital_booking_slot_conflicts_total', 'Bookings rejected because the slot was taken')
+CANCELLATIONS = Counter('hospital_appointment_cancellations_total', 'Appointments cancelled')
+
+
+def observe_request(view: str, method: str, status: int, seconds: float, query_count: int) -> None:
+    REQUEST_LATENCY.labels(view, method).observe(seconds)
+    REQUESTS.labels(view, method, str(status)).inc()
+    if status >= 500:
+        REQUEST_ERRORS.labels(view, method).inc()
+    DB_QUERIES.labels(view).observe(query_count)
+
+
+def render_metrics():
+    """Return (body, content type) in the Prometheus text exposition format"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,400 @@
+import hashlib
+import json
+import logging
+import secrets
+import threading
+import time
+from typing import Dict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from .instrumentation import current_metrics, end_request_metrics, start_request_metrics
+from .metrics import observe_request
+from .routers import allow_replica_reads, get_replicas, reset_replica_reads
+
+performance_logger = logging.getLogger('hospital.performance')
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+    Parse an Accept-Encoding header into a {coding: qvalue} mapping.
+
+    Args:
+        header: Raw header value, e.g. ``"br;q=1.0, gzip;q=0.8, *;q=0"``
+
+    Returns:
+        Dictionary of lower-cased codings to their quality values
+    """
+    codings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+def brotli_compress(content: bytes, quality: int, max_random_bytes: int) -> bytes:
+    """
+    Brotli-compress ``content`` with 1 to ``max_random_bytes`` (at most 256)
+    random bytes of padding, the brotli counterpart of the random file name
+    Django's gzip middleware adds to mitigate BREACH.
+
+    The padding is a metadata meta-block (RFC 7932, section 9.2), which
+    decoders skip. It goes right after the stream header, where flushing
+    the compressor leaves a byte-aligned meta-block boundary.
+    """
+    if not max_random_bytes:
+        return brotli.compress(content, quality=quality)
+    padding = secrets.token_bytes(secrets.randbelow(min(max_random_bytes, 256)) + 1)
+    compressor = brotli.Compressor(quality=quality)
+    header = compressor.process(b'') + compressor.flush()
+    # ISLAST=0, MNIBBLES=0 (coded as 3), reserved bit, MSKIPBYTES=1, MSKIPLEN-1; 14 bits
+    metadata = ((3 << 1) | (1 << 4) | ((len(padding) - 1) << 6)).to_bytes(2, 'little') + padding
+    return header + metadata + compressor.process(content) + compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Negotiated brotli/gzip response compression.
+
+    Responses smaller than ``RESPONSE_COMPRESSION_MIN_SIZE`` bytes are sent
+    as-is. Brotli is preferred when the client accepts it and the ``brotli``
+    package is installed; everything else is handled by Django's gzip
+    middleware. Brotli wins ties in quality, since browsers send
+    ``gzip, deflate, br`` unweighted. Both get random-length padding against
+    BREACH. Streaming responses are always gzipped, except event streams,
+    which gzip would hold back in its buffer.
+    """
+
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        min_size = getattr(settings, 'RESPONSE_COMPRESSION_MIN_SIZE', 1024)
+        if not response.streaming and len(response.content) < min_size:
+            return response
+
+        if response.has_header('Content-Encoding'):
+            return response
+
+        codings = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        br, gzip = codings.get('br', 0), codings.get('gzip', 0)
+        if brotli is None or response.streaming or br <= 0 or br < gzip:
+            if gzip <= 0:
+                patch_vary_headers(response, ('Accept-Encoding',))
+                return response
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        quality = getattr(settings, 'RESPONSE_COMPRESSION_BROTLI_QUALITY', 5)
+        compressed_content = brotli_compress(response.content, quality, self.max_random_bytes)
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Allow replica reads for safe requests, with read-your-writes stickiness.
+
+    After a client sends an unsafe request, its reads stay on the primary
+    for ``REPLICA_STICKY_SECONDS`` so it never sees replication lag on data
+    it just wrote. Clients are identified by their Authorization header,
+    falling back to the remote address.
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not get_replicas():
+            return self.get_response(request)
+        sticky_key = self.get_sticky_key(request)
+        safe = request.method in self.SAFE_METHODS
+        token = allow_replica_reads(safe and not cache.get(sticky_key))
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_replica_reads(token)
+        if not safe:
+            cache.set(sticky_key, 1, getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+        return response
+
+    async def __acall__(self, request):
+        if not get_replicas():
+            return await self.get_response(request)
+        sticky_key = self.get_sticky_key(request)
+        safe = request.method in self.SAFE_METHODS
+        token = allow_replica_reads(safe and not await cache.aget(sticky_key))
+        try:
+            response = await self.get_response(request)
+        finally:
+            reset_replica_reads(token)
+        if not safe:
+            await cache.aset(sticky_key, 1, getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+        return response
+
+    @staticmethod
+    def get_sticky_key(request) -> str:
+        identity = request.META.get('HTTP_AUTHORIZATION') or request.META.get('REMOTE_ADDR', '')
+        return 'replica_sticky:' + hashlib.sha1(identity.encode()).hexdigest()
+
+
+class ASGIURLConfMiddleware:
+    """
+    Resolve ASGI requests against ``ASGI_ROOT_URLCONF``.
+
+    Lets the ASGI entry point serve async versions of selected views under
+    the same URLs while WSGI keeps using ``ROOT_URLCONF``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.urlconf = getattr(settings, 'ASGI_ROOT_URLCONF', None)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self.urlconf and isinstance(request, ASGIRequest):
+            request.urlconf = self.urlconf
+        return await self.get_response(request)
+
+
+class RequestMetricsMiddleware:
+    """
+    Per-request performance instrumentation.
+
+    Records SQL query count and time, view time (including rendering),
+    serializer time and response size. Adds them to a ``Server-Timing``
+    header and logs a structured JSON entry for requests slower than
+    ``REQUEST_METRICS['SLOW_REQUEST_MS']`` or containing slow queries, with
+    the originating view and source line of each slow query. The same
+    numbers feed the Prometheus metrics labeled by URL name.
+    """
+    # Keep the Prometheus method label bounded
+    METRIC_METHODS = {'GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE'}
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = start_request_metrics()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request_metrics(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = start_request_metrics()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request_metrics(token)
+        return self.finish(request, response, metrics)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = current_metrics()
+        if metrics is not None:
+            match = request.resolver_match
+            metrics.view_name = match.view_name if match else view_func.__name__
+            metrics.view_started = time.perf_counter()
+        return None
+
+    def finish(self, request, response, metrics):
+        config = settings.REQUEST_METRICS
+        total_ms = metrics.total_ms
+        if metrics.view_started is not None:
+            metrics.view_ms = (time.perf_counter() - metrics.view_started) * 1000
+        size = None if response.streaming else len(response.content)
+
+        method = request.method if request.method in self.METRIC_METHODS else 'OTHER'
+        observe_request(metrics.view_name or 'unmatched', method, response.status_code,
+                        total_ms / 1000, metrics.query_count)
+
+        if config['SERVER_TIMING']:
+            timings = [
+                f'db;dur={metrics.sql_ms:.2f};desc="{metrics.query_count} queries"',
+                f'view;dur={metrics.view_ms:.2f}',
+                f'serialize;dur={metrics.serializer_ms:.2f}',
+                f'total;dur={total_ms:.2f}',
+            ]
+            if size is not None:
+                timings.append(f'size;desc="{size} bytes"')
+            response['Server-Timing'] = ', '.join(timings)
+
+        if total_ms >= config['SLOW_REQUEST_MS'] or metrics.slow_queries:
+            performance_logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.path,
+                'view': metrics.view_name,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 2),
+                'view_ms': round(metrics.view_ms, 2),
+                'sql_ms': round(metrics.sql_ms, 2),
+                'query_count': metrics.query_count,
+                'serializer_ms': round(metrics.serializer_ms, 2),
+                'response_bytes': size,
+                'slow_queries': metrics.slow_queries,
+            }))
+        return response
+
+
+def parse_request_start(header: str):
+    """
+    Parse a proxy's ``X-Request-Start`` header into epoch seconds.
+
+    Accepts ``t=<value>`` or a bare value in seconds, milliseconds or
+    microseconds (as sent by nginx, Heroku and most load balancers).
+
+    Returns:
+        Epoch seconds as a float, or None if the header is unusable
+    """
+    value = header.strip()
+    if value.startswith('t='):
+        value = value[2:]
+    try:
+        start = float(value)
+    except ValueError:
+        return None
+    if start > 1e14:
+        return start / 1e6
+    if start > 1e11:
+        return start / 1e3
+    return start
+
+
+class LoadSheddingMiddleware:
+    """
+    Reject requests early with 503 while the server is overloaded.
+
+    Overload is detected from queue latency (the time between the proxy's
+    ``X-Request-Start`` stamp and this worker picking the request up) and,
+    optionally, the number of requests in flight in this process. Once
+    detected, the worker stays in overload mode for
+    ``LOAD_SHEDDING['COOLDOWN_SECONDS']``: requests to ``SHED_PATHS`` are
+    refused outright, other requests only when they themselves queued too
+    long. Runs before authentication, so shed requests never touch the
+    database.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.config = getattr(settings, 'LOAD_SHEDDING', {})
+        if not self.config.get('ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.overloaded_until = 0.0
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        rejected = self.admit(request)
+        if rejected is not None:
+            return rejected
+        try:
+            return self.get_response(request)
+        finally:
+            self.release()
+
+    async def __acall__(self, request):
+        rejected = self.admit(request)
+        if rejected is not None:
+            return rejected
+        try:
+            return await self.get_response(request)
+        finally:
+            self.release()
+
+    def admit(self, request):
+        """Count the request in, or return a 503 response if it must be shed"""
+        path = request.path
+        if any(path.startswith(prefix) for prefix in self.config.get('EXEMPT_PATHS', ())):
+            with self.lock:
+                self.in_flight += 1
+            return None
+
+        now = time.time()
+        queue_ms = None
+        header = request.META.get('HTTP_X_REQUEST_START')
+        if header:
+            started = parse_request_start(header)
+            if started is not None:
+                queue_ms = max(0.0, (now - started) * 1000)
+
+        max_queue_ms = self.config.get('MAX_QUEUE_MS')
+        max_in_flight = self.config.get('MAX_IN_FLIGHT')
+        with self.lock:
+            queued_too_long = queue_ms is not None and max_queue_ms and queue_ms > max_queue_ms
+            saturated = max_in_flight and self.in_flight >= max_in_flight
+            if queued_too_long or saturated:
+                self.overloaded_until = now + self.config.get('COOLDOWN_SECONDS', 10)
+            overloaded = now < self.overloaded_until
+            shed = queued_too_long or saturated or (
+                overloaded and any(path.startswith(prefix) for prefix in self.config.get('SHED_PATHS', ()))
+            )
+            if not shed:
+                self.in_flight += 1
+                return None
+
+        response = JsonResponse({"error": "Server is overloaded, please retry shortly"}, status=503)
+        response['Retry-After'] = str(self.config.get('RETRY_AFTER', 5))
+        return response
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
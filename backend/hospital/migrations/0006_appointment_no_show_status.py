@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0005_invoice_invoiceitem_payment_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointment',
+            name='status',
+            field=models.CharField(choices=[('S', 'Scheduled'), ('C', 'Completed'), ('X', 'Cancelled'), ('N', 'No-show')], default='S', max_length=1),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0007_change_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='reminded_for',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Appointment time the last reminder was sent for', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status', 'S')), fields=['appointment_time'], name='appointment_scheduled_time_idx'),
+        ),
+    ]
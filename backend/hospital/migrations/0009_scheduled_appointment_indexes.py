@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0008_appointment_reminders'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status', 'S')), fields=['doctor', 'appointment_time'], name='appointment_doctor_sched_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status', 'S')), fields=['patient', 'appointment_time'], name='appointment_patient_sched_idx'),
+        ),
+    ]
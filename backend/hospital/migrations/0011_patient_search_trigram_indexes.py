@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:42
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models
+
+
+class AddPostgresIndexConcurrently(AddIndexConcurrently):
+    """Build the index without locking writes; other databases get no trigram index"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('hospital', '0010_admin_ordering_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddPostgresIndexConcurrently(
+            model_name='customuser',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Concat('first_name', models.Value(' '), 'last_name'), name='gin_trgm_ops'), name='user_full_name_trgm_idx'),
+        ),
+        AddPostgresIndexConcurrently(
+            model_name='patient',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['contact_info'], name='patient_contact_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
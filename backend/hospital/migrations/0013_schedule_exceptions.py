@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0012_analytics_export_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('LEAVE', 'Leave'), ('HOLIDAY', 'Holiday'), ('CLOSURE', 'Closure'), ('OTHER', 'Other')], default='LEAVE', max_length=20)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(help_text='Last day (inclusive)')),
+                ('start_time', models.TimeField(blank=True, help_text='Leave empty to block whole days', null=True)),
+                ('end_time', models.TimeField(blank=True, help_text='Leave empty to block whole days', null=True)),
+                ('reason', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_schedule_exceptions', to=settings.AUTH_USER_MODEL)),
+                ('department', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='schedule_exceptions', to='hospital.department')),
+                ('doctor', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='schedule_exceptions', to='hospital.doctor')),
+            ],
+            options={
+                'ordering': ['start_date', 'id'],
+                'indexes': [models.Index(fields=['doctor', 'end_date', 'start_date'], name='exception_doctor_idx'), models.Index(fields=['department', 'end_date', 'start_date'], name='exception_department_idx'), models.Index(condition=models.Q(('department__isnull', True), ('doctor__isnull', True)), fields=['end_date', 'start_date'], name='exception_hospital_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('end_date__gte', models.F('start_date'))), name='schedule_exception_date_range'), models.CheckConstraint(condition=models.Q(('doctor__isnull', True), ('department__isnull', True), _connector='OR'), name='schedule_exception_single_scope'), models.CheckConstraint(condition=models.Q(models.Q(('end_time__isnull', True), ('start_time__isnull', True)), models.Q(('end_time__gt', models.F('start_time')), ('end_time__isnull', False), ('start_time__isnull', False)), _connector='OR'), name='schedule_exception_time_range')],
+            },
+        ),
+    ]
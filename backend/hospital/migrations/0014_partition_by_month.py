@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+from hospital.partitioning import PARTITIONED_TABLES, convert_to_partitioned, convert_to_plain
+
+
+def partition_tables(apps, schema_editor):
+    # Monthly range partitioning is PostgreSQL only; other databases keep plain tables
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # One transaction per table: each holds a lock on every partition and index it builds
+    for table in PARTITIONED_TABLES:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            convert_to_partitioned(schema_editor, table, settings.PARTITIONING['MONTHS_AHEAD'])
+
+
+def unpartition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in PARTITIONED_TABLES:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            convert_to_plain(schema_editor, table)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('hospital', '0013_schedule_exceptions'),
+    ]
+
+    operations = [
+        # A foreign key can't reference a partitioned table unless it includes the partition key
+        migrations.AlterField(
+            model_name='invoice',
+            name='appointment',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invoices', to='hospital.appointment'),
+        ),
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
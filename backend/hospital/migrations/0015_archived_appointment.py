@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:55
+
+import django.db.models.deletion
+from django.db import DatabaseError, migrations, models, transaction
+
+
+def compress_archive(apps, schema_editor):
+    """
+    Archived rows are written once and rarely read: have PostgreSQL compress
+    any row over the 128-byte minimum instead of only those over ~2kB, with
+    lz4 on servers that support it.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE hospital_archivedappointment SET (toast_tuple_target = 128)')
+    if connection.pg_version >= 140000:
+        try:
+            with transaction.atomic(using=connection.alias):
+                for column in ('notes', 'reason'):
+                    schema_editor.execute(
+                        f'ALTER TABLE hospital_archivedappointment ALTER COLUMN {column} SET COMPRESSION lz4')
+        except DatabaseError:
+            # Server built without lz4: the default pglz compression still applies
+            pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0014_partition_by_month'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAppointment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('appointment_time', models.DateTimeField()),
+                ('status', models.CharField(choices=[('S', 'Scheduled'), ('C', 'Completed'), ('X', 'Cancelled'), ('N', 'No-show')], max_length=1)),
+                ('notes', models.TextField(blank=True)),
+                ('reason', models.TextField(blank=True)),
+                ('duration', models.IntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_appointments', to='hospital.doctor')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_appointments', to='hospital.patient')),
+            ],
+            options={
+                'ordering': ['-appointment_time'],
+                'indexes': [models.Index(fields=['patient', '-appointment_time'], name='archived_patient_idx'), models.Index(fields=['doctor', '-appointment_time'], name='archived_doctor_idx')],
+            },
+        ),
+        migrations.RunPython(compress_archive, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+from typing import List, Optional, Tuple
+
+
+def parse_field_list(value: Optional[str]) -> Optional[List[str]]:
+    """
+    Split a comma separated query parameter into field names.
+
+    Args:
+        value: Raw query parameter value, e.g. ``"id,visit_date"``
+
+    Returns:
+        List of field names, or None if the parameter was not given
+    """
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsetViewMixin:
+    """
+    List view mixin for ``?fields=`` / ``?omit=`` sparse fieldsets.
+
+    Requested fields trim both the JSON payload and the SQL SELECT. Without
+    either parameter, GET requests use ``summary_serializer_class`` (when set)
+    unless the client asks for ``?view=full``.
+    """
+    summary_serializer_class = None
+
+    def get_fieldset(self) -> Tuple[Optional[List[str]], Optional[List[str]]]:
+        params = self.request.query_params
+        return parse_field_list(params.get('fields')), parse_field_list(params.get('omit'))
+
+    def use_sparse_fieldset(self) -> bool:
+        return self.request.method == 'GET'
+
+    def get_serializer_class(self):
+        if self.use_sparse_fieldset() and self.summary_serializer_class is not None:
+            fields, omit = self.get_fieldset()
+            if fields is None and omit is None and self.request.query_params.get('view') != 'full':
+                return self.summary_serializer_class
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        if self.use_sparse_fieldset():
+            fields, omit = self.get_fieldset()
+            kwargs.setdefault('fields', fields)
+            kwargs.setdefault('omit', omit)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.use_sparse_fieldset():
+            queryset = self.get_serializer().trim_queryset(queryset)
+        return queryset
@@ -1,8 +1,20 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Concat
 from django.conf import settings
 from typing import Optional, Dict, Any
 
+
+def full_name_expression(prefix: str = '') -> Concat:
+    """
+    "first_name last_name" of a user, e.g. ``full_name_expression('user__')``
+    from a profile model. Queries must build the name this way to match the
+    trigram index on CustomUser.
+    """
+    return Concat(f'{prefix}first_name', models.Value(' '), f'{prefix}last_name')
+
+
 class CustomUser(AbstractUser):
     ROLE_CHOICES = [
         ('ADMIN', 'Admin'),
@@ -13,6 +25,12 @@ class CustomUser(AbstractUser):
     ]
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='PATIENT')
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Patient typeahead (PostgreSQL only, see hospital.search)
+            GinIndex(OpClass(full_name_expression(), name='gin_trgm_ops'), name='user_full_name_trgm_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -80,6 +98,12 @@ class Patient(models.Model):
     assigned_doctor: Optional['Doctor'] = models.ForeignKey(Doctor, on_delete=models.SET_NULL, null=True, blank=True)
     assigned_nurse: Optional['Nurse'] = models.ForeignKey(Nurse, on_delete=models.SET_NULL, null=True, blank=True)
     
+    class Meta:
+        indexes = [
+            # Patient typeahead by phone number (PostgreSQL only, see hospital.search)
+            GinIndex(fields=['contact_info'], opclasses=['gin_trgm_ops'], name='patient_contact_trgm_idx'),
+        ]
+    
     def __str__(self) -> str:
         return f"{self.user.first_name} {self.user.last_name}"
 
@@ -88,6 +112,7 @@ class Appointment(models.Model):
         ('S', 'Scheduled'),
         ('C', 'Completed'),
         ('X', 'Cancelled'),
+        ('N', 'No-show'),
     ]
     
     patient: 'Patient' = models.ForeignKey(Patient, on_delete=models.CASCADE)
@@ -97,6 +122,10 @@ class Appointment(models.Model):
     notes: str = models.TextField(blank=True)
     reason: str = models.TextField(blank=True, help_text='Reason for appointment')
     duration: int = models.IntegerField(default=30, help_text='Duration in minutes')
+    reminded_for: models.DateTimeField = models.DateTimeField(
+        null=True, blank=True, editable=False,
+        help_text='Appointment time the last reminder was sent for'
+    )
     created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True)
     updated_at: models.DateTimeField = models.DateTimeField(auto_now=True)
     
@@ -108,6 +137,22 @@ class Appointment(models.Model):
                 name='unique_doctor_appointment_time'
             )
         ]
+        indexes = [
+            # Delta-sync change feed: (updated_at, id) cursor, globally and per doctor
+            models.Index(fields=['updated_at', 'id'], name='appointment_changes_idx'),
+            models.Index(fields=['doctor', 'updated_at', 'id'], name='appointment_doctor_changes_idx'),
+            # Reminder scheduler and past-appointment sweep: scheduled appointments by time
+            models.Index(fields=['appointment_time'], condition=models.Q(status='S'),
+                         name='appointment_scheduled_time_idx'),
+            # Availability and "upcoming" lookups only read scheduled rows; once the sweep
+            # closes out past appointments these indexes hold little beyond future bookings
+            models.Index(fields=['doctor', 'appointment_time'], condition=models.Q(status='S'),
+                         name='appointment_doctor_sched_idx'),
+            models.Index(fields=['patient', 'appointment_time'], condition=models.Q(status='S'),
+                         name='appointment_patient_sched_idx'),
+            # Default ordering and the admin's date hierarchy over all appointments
+            models.Index(fields=['appointment_time'], name='appointment_time_idx'),
+        ]
         ordering = ['appointment_time']
     
     def __str__(self) -> str:
@@ -129,6 +174,109 @@ class Appointment(models.Model):
         from django.utils import timezone
         return self.appointment_time > timezone.now() and self.status == 'S'
 
+class ArchivedAppointment(models.Model):
+    """
+    Cold storage for old cancelled appointments, moved out of the live
+    appointment table by ``manage.py archive_appointments``. Rows keep their
+    original id. On PostgreSQL the table is set up to compress rows (see
+    migration 0015).
+    """
+    id: int = models.BigIntegerField(primary_key=True)
+    patient: 'Patient' = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='archived_appointments')
+    doctor: 'Doctor' = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='archived_appointments')
+    appointment_time: models.DateTimeField = models.DateTimeField()
+    status: str = models.CharField(max_length=1, choices=Appointment.STATUS_CHOICES)
+    notes: str = models.TextField(blank=True)
+    reason: str = models.TextField(blank=True)
+    duration: int = models.IntegerField()
+    created_at: models.DateTimeField = models.DateTimeField()
+    updated_at: models.DateTimeField = models.DateTimeField()
+    archived_at: models.DateTimeField = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-appointment_time']
+        indexes = [
+            # History views: a patient's or doctor's past appointments, newest first
+            models.Index(fields=['patient', '-appointment_time'], name='archived_patient_idx'),
+            models.Index(fields=['doctor', '-appointment_time'], name='archived_doctor_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.patient} - {self.doctor} - {self.appointment_time} (archived)"
+
+
+class ScheduleException(models.Model):
+    """
+    Time off outside a doctor's weekly ``Doctor.schedule``: leave for one
+    doctor, a closure of a department, or a holiday for the whole hospital
+    (neither doctor nor department set). Without times it takes out whole
+    days; with times, the same hours on each day of the range.
+    """
+    KIND_CHOICES = [
+        ('LEAVE', 'Leave'),
+        ('HOLIDAY', 'Holiday'),
+        ('CLOSURE', 'Closure'),
+        ('OTHER', 'Other'),
+    ]
+
+    # The composite indexes below lead with these columns, so no separate index
+    doctor: Optional['Doctor'] = models.ForeignKey(
+        Doctor, on_delete=models.CASCADE, null=True, blank=True, db_index=False,
+        related_name='schedule_exceptions'
+    )
+    department: Optional['Department'] = models.ForeignKey(
+        Department, on_delete=models.CASCADE, null=True, blank=True, db_index=False,
+        related_name='schedule_exceptions'
+    )
+    kind: str = models.CharField(max_length=20, choices=KIND_CHOICES, default='LEAVE')
+    start_date: models.DateField = models.DateField()
+    end_date: models.DateField = models.DateField(help_text='Last day (inclusive)')
+    start_time = models.TimeField(null=True, blank=True, help_text='Leave empty to block whole days')
+    end_time = models.TimeField(null=True, blank=True, help_text='Leave empty to block whole days')
+    reason: str = models.TextField(blank=True)
+
+    created_by: Optional['CustomUser'] = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='created_schedule_exceptions'
+    )
+    created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['start_date', 'id']
+        constraints = [
+            models.CheckConstraint(condition=models.Q(end_date__gte=models.F('start_date')),
+                                   name='schedule_exception_date_range'),
+            models.CheckConstraint(condition=models.Q(doctor__isnull=True) | models.Q(department__isnull=True),
+                                   name='schedule_exception_single_scope'),
+            models.CheckConstraint(
+                condition=(models.Q(start_time__isnull=True, end_time__isnull=True)
+                           | models.Q(start_time__isnull=False, end_time__isnull=False,
+                                      end_time__gt=models.F('start_time'))),
+                name='schedule_exception_time_range',
+            ),
+        ]
+        indexes = [
+            # Exceptions overlapping a date range: end_date >= first day AND start_date <= last day,
+            # a range scan on end_date that skips everything already over
+            models.Index(fields=['doctor', 'end_date', 'start_date'], name='exception_doctor_idx'),
+            models.Index(fields=['department', 'end_date', 'start_date'], name='exception_department_idx'),
+            models.Index(fields=['end_date', 'start_date'],
+                         condition=models.Q(doctor__isnull=True, department__isnull=True),
+                         name='exception_hospital_idx'),
+        ]
+
+    def __str__(self) -> str:
+        scope = self.doctor or self.department or 'Hospital'
+        return f"{self.get_kind_display()}: {scope} {self.start_date} - {self.end_date}"
+
+    @property
+    def whole_day(self) -> bool:
+        return self.start_time is None
+
+
 class MedicalRecord(models.Model):
     patient: 'Patient' = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='medical_records')
     doctor: 'Doctor' = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='medical_records')
@@ -176,6 +324,11 @@ class MedicalRecord(models.Model):
         indexes = [
             models.Index(fields=['patient', '-visit_date']),
             models.Index(fields=['doctor', '-visit_date']),
+            # Delta-sync change feed: (updated_at, id) cursor, globally and per doctor
+            models.Index(fields=['updated_at', 'id'], name='record_changes_idx'),
+            models.Index(fields=['doctor', 'updated_at', 'id'], name='record_doctor_changes_idx'),
+            # Default ordering, so admin pages don't sort the whole table
+            models.Index(fields=['-visit_date', '-created_at'], name='record_ordering_idx'),
         ]
     
     def __str__(self) -> str:
@@ -195,11 +348,14 @@ class Invoice(models.Model):
     
     invoice_number: str = models.CharField(max_length=50, unique=True, editable=False)
     patient: 'Patient' = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='invoices')
+    # Not enforced by the database: a foreign key can't reference the partitioned
+    # appointment table (see hospital.partitioning)
     appointment: Optional['Appointment'] = models.ForeignKey(
         Appointment, 
         on_delete=models.SET_NULL, 
         null=True, 
         blank=True,
+        db_constraint=False,
         related_name='invoices'
     )
     doctor: 'Doctor' = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='invoices')
@@ -231,6 +387,8 @@ class Invoice(models.Model):
         indexes = [
             models.Index(fields=['patient', '-created_at']),
             models.Index(fields=['status', '-created_at']),
+            # Incremental analytics export (hospital.export) of invoices and their items
+            models.Index(fields=['updated_at', 'id'], name='invoice_changes_idx'),
         ]
     
     def save(self, *args, **kwargs):
@@ -325,6 +483,10 @@ class Payment(models.Model):
     
     class Meta:
         ordering = ['-payment_date']
+        indexes = [
+            # Incremental analytics export (hospital.export)
+            models.Index(fields=['payment_date', 'id'], name='payment_export_idx'),
+        ]
     
     def __str__(self) -> str:
         return f"Payment ${self.amount} for {self.invoice.invoice_number}"
@@ -0,0 +1,157 @@
+"""
+Bulk staff onboarding.
+
+A roster (CSV with a header row, or a JSON list of objects) lists one hire
+per row: account details, role and the profile fields of that role. Every
+row is validated first, with the departments and the taken usernames
+loaded in one query each. The passwords of the valid rows are then hashed
+in parallel: through the server's bounded hashing pool for HTTP requests
+(``hashing.make_passwords``), on every core for ``manage.py onboard_staff``
+(``hashing.bulk_make_passwords``). The users and their Doctor, Nurse or
+Staff profiles are inserted with ``bulk_create`` in a single transaction.
+Invalid rows are skipped and reported; each row gets a result.
+"""
+import csv
+import io
+import json
+from typing import Any, Dict, List, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .cache import bump_directory_version
+from .hashing import bulk_make_passwords, make_passwords
+from .models import Department, Doctor, Nurse, Staff
+from .serializers import StaffOnboardingRowSerializer
+
+User = get_user_model()
+
+
+class RosterError(ValueError):
+    """The roster file can't be read"""
+
+
+def read_roster(content: bytes, filename: str = '') -> List[Dict[str, Any]]:
+    """
+    Rows of a roster file: JSON (a list, or an object with a ``staff`` list)
+    when the name ends in .json or the content starts like JSON, CSV otherwise.
+    """
+    try:
+        text = content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise RosterError('Roster must be UTF-8 encoded')
+    if filename.lower().endswith('.json') or text.lstrip()[:1] in ('[', '{'):
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise RosterError(f'Invalid JSON roster: {e}')
+        if isinstance(data, dict):
+            data = data.get('staff')
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise RosterError('JSON roster must be a list of objects')
+        return data
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or 'username' not in reader.fieldnames:
+        raise RosterError('CSV roster needs a header row including "username"')
+    # Empty cells mean "not given"
+    return [{key: value for key, value in row.items() if key and value not in (None, '')} for row in reader]
+
+
+def department_lookup() -> Dict[str, Dict[Any, int]]:
+    """Department ids under ``ids`` (by id) and ``names`` (by lower-cased name)"""
+    lookup = {'ids': {}, 'names': {}}
+    for pk, name in Department.objects.values_list('pk', 'name'):
+        lookup['ids'][pk] = pk
+        lookup['names'][name.lower()] = pk
+    return lookup
+
+
+def build_profile(user: User, data: Dict[str, Any]):
+    role, department_id = data['role'], data['department']
+    contact_info = data.get('contact_info', '')
+    if role == 'DOCTOR':
+        return Doctor(user=user, department_id=department_id, contact_info=contact_info,
+                      specialization=data['specialization'])
+    if role == 'NURSE':
+        return Nurse(user=user, department_id=department_id, contact_info=contact_info, shift=data['shift'])
+    if department_id is None:
+        return None
+    return Staff(user=user, department_id=department_id, contact_info=contact_info,
+                 role=data.get('position') or dict(User.ROLE_CHOICES)[role])
+
+
+def onboard_staff(rows: List[Dict[str, Any]], dry_run: bool = False,
+                  offline: bool = False) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Create accounts and role profiles for roster rows.
+
+    Args:
+        rows: Roster rows, e.g. from ``read_roster``
+        dry_run: Only validate
+        offline: Hash on every core instead of in the bounded pool; for
+            management commands, not requests
+
+    Returns:
+        Tuple of the per-row results (row number, username, status
+        "created", "valid" or "error", and the new ids or the errors) and
+        the number of accounts created
+
+    Raises:
+        IntegrityError: if a username was taken concurrently; nothing is created
+        HashingOverloaded: if the hashing pool stays full; nothing is created
+    """
+    context = {'departments': department_lookup()}
+    usernames = [User.normalize_username(str(row.get('username') or '')) for row in rows]
+    taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+    results: Dict[int, Dict[str, Any]] = {}
+    valid: List[Tuple[int, Dict[str, Any]]] = []
+    for number, (row, username) in enumerate(zip(rows, usernames), 1):
+        serializer = StaffOnboardingRowSerializer(data=row, context=context)
+        if not serializer.is_valid():
+            results[number] = {'row': number, 'username': username, 'status': 'error', 'errors': serializer.errors}
+        elif username in taken:
+            results[number] = {'row': number, 'username': username, 'status': 'error',
+                               'errors': {'username': ['A user with that username already exists.']}}
+        else:
+            # Later rows repeating this username are rejected as taken
+            taken.add(username)
+            valid.append((number, {**serializer.validated_data, 'username': username}))
+
+    if dry_run or not valid:
+        for number, data in valid:
+            results[number] = {'row': number, 'username': data['username'], 'status': 'valid'}
+        return [results[number] for number in sorted(results)], 0
+
+    hash_passwords = bulk_make_passwords if offline else make_passwords
+    passwords = hash_passwords([data.get('password') or None for _, data in valid])
+    users = [
+        User(
+            username=data['username'],
+            password=password,
+            email=User.objects.normalize_email(data.get('email', '')),
+            first_name=data.get('first_name', ''),
+            last_name=data.get('last_name', ''),
+            role=data['role'],
+        )
+        for (_, data), password in zip(valid, passwords)
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        profiles = [build_profile(user, data) for user, (_, data) in zip(users, valid)]
+        for model in (Doctor, Nurse, Staff):
+            model.objects.bulk_create([profile for profile in profiles if isinstance(profile, model)])
+        # bulk_create skips the signals that normally invalidate the doctor directory
+        if any(isinstance(profile, Doctor) for profile in profiles):
+            transaction.on_commit(bump_directory_version)
+
+    for (number, data), user, profile in zip(valid, users, profiles):
+        results[number] = {
+            'row': number,
+            'username': data['username'],
+            'status': 'created',
+            'user_id': user.pk,
+            'role': data['role'],
+            'profile_id': profile.pk if profile is not None else None,
+        }
+    return [results[number] for number in sorted(results)], len(users)
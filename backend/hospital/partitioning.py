@@ -0,0 +1,251 @@
+"""
+Monthly range partitioning of the appointment and medical record tables
+(PostgreSQL only).
+
+Both tables are partitioned by month of ``Appointment.appointment_time``
+and ``MedicalRecord.visit_date``: queries for recent or upcoming rows only
+touch the latest partitions, and old months can be vacuumed, moved or
+dropped on their own. Partitions are named ``<table>_pYYYYMM`` and cover
+UTC months; a ``<table>_default`` partition catches rows outside every
+month created so far.
+
+PostgreSQL requires a partitioned table's primary key to include the
+partition key, so the database key is ``(id, <partition column>)``. Django
+still treats ``id`` alone as the primary key, which holds because ids come
+from a single sequence. For the same reason no foreign key can reference a
+partitioned table: ``Invoice.appointment`` is not enforced by the database.
+
+``convert_to_partitioned`` rewrites an existing table into this layout
+(migration 0014) and ``ensure_partitions`` creates the months ahead; run
+``manage.py ensure_partitions`` from cron, e.g. daily.
+"""
+from datetime import date, datetime, time, timezone as dt_timezone
+from typing import List, Optional, Tuple, Union
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+# Table -> partition column
+PARTITIONED_TABLES = {
+    'hospital_appointment': 'appointment_time',
+    'hospital_medicalrecord': 'visit_date',
+}
+
+
+def month_start(value: Union[date, datetime]) -> date:
+    """First day of the (UTC) month containing a date or timestamp"""
+    if isinstance(value, datetime):
+        value = value.astimezone(dt_timezone.utc).date()
+    return value.replace(day=1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f'{table}_p{month:%Y%m}'
+
+
+def default_partition_name(table: str) -> str:
+    return f'{table}_default'
+
+
+def is_date_column(cursor, table: str) -> bool:
+    """Whether the partition column is a date (else a timestamp)"""
+    cursor.execute(
+        "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+        "WHERE attrelid = %s::regclass AND attname = %s",
+        [table, PARTITIONED_TABLES[table]],
+    )
+    return cursor.fetchone()[0] == 'date'
+
+
+def month_bounds(cursor, table: str, month: date) -> Tuple[str, str]:
+    """FROM and TO literals of a month's partition: dates, or midnight UTC for timestamps"""
+    is_date = is_date_column(cursor, table)
+    return tuple(
+        m.isoformat() if is_date else datetime.combine(m, time.min, tzinfo=dt_timezone.utc).isoformat()
+        for m in (month, add_months(month, 1))
+    )
+
+
+def is_partitioned(cursor, table: str) -> bool:
+    cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table])
+    return cursor.fetchone() is not None
+
+
+def partitions(cursor, table: str) -> List[str]:
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = %s::regclass",
+        [table],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def create_partition(cursor, qn, table: str, month: date) -> bool:
+    """
+    Add the partition for a month unless it exists.
+
+    Rows for that month already in the default partition are moved into it:
+    the partition is built as a standalone table, filled from the default
+    partition, then attached (which also builds the parent's indexes on it).
+
+    Returns:
+        True if the partition was created
+    """
+    name = partition_name(table, month)
+    existing = partitions(cursor, table)
+    if name in existing:
+        return False
+    column = PARTITIONED_TABLES[table]
+    start, end = month_bounds(cursor, table, month)
+    cursor.execute(f'CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    if default_partition_name(table) in existing:
+        # ATTACH needs this lock anyway; taking it first stops inserts into the
+        # month landing in the default partition after the move
+        cursor.execute(f'LOCK TABLE {qn(default_partition_name(table))} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {qn(default_partition_name(table))} '
+            f'WHERE {qn(column)} >= %s AND {qn(column)} < %s RETURNING *) '
+            f'INSERT INTO {qn(name)} SELECT * FROM moved',
+            [start, end],
+        )
+    cursor.execute(f'ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)',
+                   [start, end])
+    return True
+
+
+def ensure_partitions(table: str, months_ahead: int, today: Optional[date] = None,
+                      using: str = DEFAULT_DB_ALIAS) -> List[str]:
+    """
+    Create any missing partitions from the current month through
+    ``months_ahead`` months ahead. Does nothing for a table that isn't
+    partitioned (including on other databases).
+
+    Returns:
+        Names of the partitions created
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return []
+    first = month_start(today or datetime.now(dt_timezone.utc).date())
+    created = []
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if not is_partitioned(cursor, table):
+            return []
+        for offset in range(months_ahead + 1):
+            month = add_months(first, offset)
+            if create_partition(cursor, connection.ops.quote_name, table, month):
+                created.append(partition_name(table, month))
+    return created
+
+
+def table_definition(cursor, table: str) -> Tuple[str, List[Tuple[str, str]], List[str]]:
+    """
+    The primary key name, the other constraints (name, definition) and the
+    CREATE INDEX statements of the indexes not backing a constraint
+    """
+    cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", [table])
+    primary_key = cursor.fetchone()[0]
+    # Check constraints and NOT NULL are copied by CREATE TABLE ... LIKE
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('u', 'f', 'x') ORDER BY conname",
+        [table],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i WHERE i.indrelid = %s::regclass "
+        "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid) "
+        "ORDER BY i.indexrelid",
+        [table],
+    )
+    return primary_key, constraints, [row[0] for row in cursor.fetchall()]
+
+
+def restore_definition(cursor, qn, table: str, constraints: List[Tuple[str, str]], indexes: List[str]) -> None:
+    for name, definition in constraints:
+        cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}')
+    for definition in indexes:
+        cursor.execute(definition)
+
+
+def convert_to_partitioned(schema_editor, table: str, months_ahead: int) -> None:
+    """
+    Rebuild a plain table as a table partitioned by month, keeping its rows,
+    id sequence, constraints and indexes (under the same names, so later
+    migrations still find them). Foreign keys referencing the table must be
+    dropped first.
+
+    Locks the table and copies every row: plan a maintenance window for
+    large tables. The transaction also holds a lock on each partition and
+    its indexes, roughly 20 per month with rows, so years of history may
+    need a higher ``max_locks_per_transaction``.
+    """
+    qn = schema_editor.quote_name
+    column = PARTITIONED_TABLES[table]
+    staging = f'{table}_partitioned'
+    sequence = f'{table}_id_seq'
+
+    with schema_editor.connection.cursor() as cursor:
+        if is_partitioned(cursor, table):
+            return
+        cursor.execute(f'LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE')
+        primary_key, constraints, indexes = table_definition(cursor, table)
+        cursor.execute(f'SELECT max(id) FROM {qn(table)}')
+        max_id = cursor.fetchone()[0]
+        current = month_start(datetime.now(dt_timezone.utc))
+        last = add_months(current, months_ahead)
+        # Months that hold rows, so a stray far-off date doesn't create every month up to it;
+        # rows after the last month wait in the default partition for ensure_partitions
+        value = qn(column) if is_date_column(cursor, table) else f"{qn(column)} AT TIME ZONE 'UTC'"
+        cursor.execute(f"SELECT DISTINCT date_trunc('month', {value})::date FROM {qn(table)}")
+        months = {month for month, in cursor.fetchall() if month <= last}
+        months.update(add_months(current, offset) for offset in range(months_ahead + 1))
+
+        # Identity columns can't be partitioned before PostgreSQL 17, so id is
+        # copied as a plain bigint and given an owned sequence below
+        cursor.execute(f'CREATE TABLE {qn(staging)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS '
+                       f'INCLUDING STORAGE) PARTITION BY RANGE ({qn(column)})')
+        for month in sorted(months):
+            start, end = month_bounds(cursor, table, month)
+            cursor.execute(f'CREATE TABLE {qn(partition_name(table, month))} PARTITION OF {qn(staging)} '
+                           f'FOR VALUES FROM (%s) TO (%s)', [start, end])
+        cursor.execute(f'CREATE TABLE {qn(default_partition_name(table))} PARTITION OF {qn(staging)} DEFAULT')
+        cursor.execute(f'INSERT INTO {qn(staging)} SELECT * FROM {qn(table)}')
+
+        cursor.execute(f'DROP TABLE {qn(table)}')
+        cursor.execute(f'ALTER TABLE {qn(staging)} RENAME TO {qn(table)}')
+        cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(primary_key)} PRIMARY KEY (id, {qn(column)})')
+        cursor.execute(f'CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id')
+        cursor.execute('SELECT setval(%s, %s, %s)', [sequence, max_id or 1, max_id is not None])
+        cursor.execute(f'ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)', [sequence])
+        restore_definition(cursor, qn, table, constraints, indexes)
+        cursor.execute(f'ANALYZE {qn(table)}')
+
+
+def convert_to_plain(schema_editor, table: str) -> None:
+    """Reverse of convert_to_partitioned: one ordinary table with an identity id"""
+    qn = schema_editor.quote_name
+    staging = f'{table}_unpartitioned'
+
+    with schema_editor.connection.cursor() as cursor:
+        if not is_partitioned(cursor, table):
+            return
+        cursor.execute(f'LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE')
+        primary_key, constraints, indexes = table_definition(cursor, table)
+        cursor.execute(f'SELECT max(id) FROM {qn(table)}')
+        max_id = cursor.fetchone()[0]
+
+        cursor.execute(f'CREATE TABLE {qn(staging)} (LIKE {qn(table)} INCLUDING CONSTRAINTS INCLUDING STORAGE)')
+        cursor.execute(f'INSERT INTO {qn(staging)} SELECT * FROM {qn(table)}')
+        # Takes the partitions and the owned id sequence with it
+        cursor.execute(f'DROP TABLE {qn(table)}')
+        cursor.execute(f'ALTER TABLE {qn(staging)} RENAME TO {qn(table)}')
+        cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(primary_key)} PRIMARY KEY (id)')
+        cursor.execute(f'ALTER TABLE {qn(table)} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY')
+        if max_id is not None:
+            cursor.execute("SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)", [table, max_id])
+        restore_definition(cursor, qn, table, constraints, indexes)
@@ -0,0 +1,222 @@
+"""
+Appointment reminders.
+
+``ReminderScheduler`` runs in its own process (``manage.py run_reminders``).
+Instead of scanning the table on a timer it keeps the reminders of the next
+few minutes in an in-memory timer wheel and tops the wheel up in moving
+windows:
+
+* each poll loads scheduled appointments whose time entered the look-ahead
+  window since the previous poll (a range scan on
+  ``appointment_scheduled_time_idx``), and
+* re-reads appointments changed since the previous poll (the change-feed
+  index on ``updated_at``), so bookings, reschedules and cancellations
+  inside the loaded window replace or drop their timers.
+
+A reminder is sent at most once per appointment time: before sending, the
+scheduler claims it with a conditional UPDATE of ``reminded_for``. A
+cancelled, completed or moved appointment fails the claim and is skipped,
+and a rescheduled one gets a fresh reminder for its new time. Running a
+second scheduler is safe, if pointless.
+
+Reminders are delivered through the channel class in
+``REMINDERS['CHANNEL']``; ``LocMemChannel`` keeps them in memory for local
+runs and tests.
+"""
+import logging
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Appointment
+
+logger = logging.getLogger(__name__)
+
+REMINDER_FIELDS = (
+    'pk', 'status', 'appointment_time', 'reminded_for',
+    'patient__user__email', 'patient__user__first_name', 'patient__user__last_name',
+    'doctor__user__first_name', 'doctor__user__last_name',
+)
+
+
+class Reminder(NamedTuple):
+    appointment_id: int
+    appointment_time: datetime
+    patient_email: str
+    patient_name: str
+    doctor_name: str
+
+
+class BaseChannel:
+    """Delivers reminders; subclasses implement send()"""
+
+    def send(self, reminder: Reminder) -> None:
+        raise NotImplementedError
+
+
+class LogChannel(BaseChannel):
+    """Logs reminders instead of sending them"""
+
+    def send(self, reminder: Reminder) -> None:
+        logger.info('Reminder for appointment %s at %s to %s',
+                    reminder.appointment_id, reminder.appointment_time, reminder.patient_email or reminder.patient_name)
+
+
+class LocMemChannel(BaseChannel):
+    """Keeps sent reminders in ``LocMemChannel.outbox``, like Django's locmem email backend"""
+    outbox: List[Reminder] = []
+
+    def send(self, reminder: Reminder) -> None:
+        LocMemChannel.outbox.append(reminder)
+
+
+class EmailChannel(BaseChannel):
+    """Emails the patient through Django's configured email backend"""
+
+    def send(self, reminder: Reminder) -> None:
+        if not reminder.patient_email:
+            return
+        local_time = timezone.localtime(reminder.appointment_time)
+        send_mail(
+            'Appointment reminder',
+            f'Dear {reminder.patient_name},\n\nThis is a reminder of your appointment with '
+            f'Dr. {reminder.doctor_name} on {local_time:%A, %d %B %Y at %H:%M}.\n',
+            None,
+            [reminder.patient_email],
+        )
+
+
+def get_channel() -> BaseChannel:
+    return import_string(settings.REMINDERS['CHANNEL'])()
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel keyed by appointment id.
+
+    Timers are bucketed by tick; scheduling, replacing and cancelling are
+    O(1), and advancing only visits the slots for the elapsed ticks.
+    Timers further out than one revolution wait in their slot until their
+    tick comes round.
+    """
+
+    def __init__(self, tick: float, slots: int, now: float):
+        self.tick = tick
+        self.slots = slots
+        self.wheel: List[Dict[int, int]] = [{} for _ in range(slots)]
+        self.timers: Dict[int, tuple] = {}
+        self.current_tick = int(now // tick)
+
+    def __len__(self) -> int:
+        return len(self.timers)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self.timers
+
+    def schedule(self, key: int, due: float, payload) -> None:
+        """Set the timer for ``key``, replacing any existing one; past times fire on the next advance"""
+        self.cancel(key)
+        due_tick = max(int(due // self.tick), self.current_tick)
+        self.timers[key] = (due_tick, payload)
+        self.wheel[due_tick % self.slots][key] = due_tick
+
+    def cancel(self, key: int) -> None:
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            del self.wheel[timer[0] % self.slots][key]
+
+    def advance(self, now: float) -> list:
+        """Remove and return the payloads of all timers due by ``now``"""
+        target = int(now // self.tick)
+        due = []
+        for step in range(min(target - self.current_tick + 1, self.slots)):
+            slot = self.wheel[(self.current_tick + step) % self.slots]
+            for key in [key for key, due_tick in slot.items() if due_tick <= target]:
+                del slot[key]
+                due.append(self.timers.pop(key)[1])
+        self.current_tick = max(self.current_tick, target + 1)
+        return due
+
+
+class ReminderScheduler:
+    """Loads upcoming reminders in moving windows and sends them when due"""
+
+    def __init__(self, channel: Optional[BaseChannel] = None, clock=time.time):
+        config = settings.REMINDERS
+        self.channel = channel or get_channel()
+        self.clock = clock
+        self.lead = timedelta(minutes=config['LEAD_MINUTES'])
+        self.lookahead = timedelta(seconds=config['LOOKAHEAD_SECONDS'])
+        self.retry_seconds = config.get('RETRY_SECONDS', 300)
+        self.wheel = TimerWheel(config.get('TICK_SECONDS', 1), config.get('WHEEL_SLOTS', 3600), clock())
+        # Appointment times up to here are loaded; changes since changes_since are tracked
+        self.loaded_until: Optional[datetime] = None
+        self.changes_since: Optional[datetime] = None
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.clock(), tz=dt_timezone.utc)
+
+    def poll(self) -> None:
+        """Top the wheel up to the end of the look-ahead window and pick up recent changes"""
+        now = self.now()
+        horizon = now + self.lead + self.lookahead
+        window = Appointment.objects.filter(status='S', appointment_time__lte=horizon)
+        if self.loaded_until is None:
+            # First poll: everything upcoming, including reminders missed while stopped
+            window = window.filter(appointment_time__gt=now)
+        else:
+            window = window.filter(appointment_time__gt=self.loaded_until)
+        for row in window.exclude(reminded_for=F('appointment_time')).values_list(*REMINDER_FIELDS):
+            self.schedule(row)
+
+        if self.changes_since is not None:
+            changed = Appointment.objects.filter(updated_at__gte=self.changes_since)
+            for row in changed.values_list(*REMINDER_FIELDS):
+                pk, status, appointment_time, reminded_for = row[:4]
+                if status == 'S' and now < appointment_time <= horizon and reminded_for != appointment_time:
+                    self.schedule(row)
+                else:
+                    self.wheel.cancel(pk)
+
+        self.loaded_until = horizon
+        # Overlap a little so a transaction that commits late is still seen
+        self.changes_since = now - timedelta(seconds=settings.REMINDERS.get('CHANGE_OVERLAP_SECONDS', 5))
+
+    def schedule(self, row) -> None:
+        pk, _, appointment_time, _, email, first_name, last_name, doctor_first, doctor_last = row
+        reminder = Reminder(pk, appointment_time, email, f'{first_name} {last_name}'.strip(),
+                            f'{doctor_first} {doctor_last}'.strip())
+        self.wheel.schedule(pk, (appointment_time - self.lead).timestamp(), reminder)
+
+    def run_due(self) -> int:
+        """Send the reminders that are due; returns how many were sent"""
+        sent = 0
+        for reminder in self.wheel.advance(self.clock()):
+            if self.send(reminder):
+                sent += 1
+        return sent
+
+    def send(self, reminder: Reminder) -> bool:
+        # Claim first: fails if the appointment was cancelled, moved or already reminded
+        claimed = Appointment.objects.filter(
+            pk=reminder.appointment_id, status='S',
+            appointment_time=reminder.appointment_time, appointment_time__gt=self.now(),
+        ).exclude(reminded_for=F('appointment_time')).update(reminded_for=F('appointment_time'))
+        if not claimed:
+            return False
+        try:
+            self.channel.send(reminder)
+        except Exception:
+            logger.exception('Reminder for appointment %s failed; retrying in %ss',
+                             reminder.appointment_id, self.retry_seconds)
+            Appointment.objects.filter(pk=reminder.appointment_id,
+                                       reminded_for=reminder.appointment_time).update(reminded_for=None)
+            self.wheel.schedule(reminder.appointment_id, self.clock() + self.retry_seconds, reminder)
+            return False
+        return True
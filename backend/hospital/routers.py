@@ -0,0 +1,57 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Whether reads in the current request/task may go to a replica
+_use_replica: ContextVar[bool] = ContextVar('use_replica', default=False)
+
+
+def get_replicas() -> list:
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def allow_replica_reads(allowed: bool):
+    """Enable or disable replica reads for the current context; returns a reset token"""
+    return _use_replica.set(allowed)
+
+
+def reset_replica_reads(token) -> None:
+    _use_replica.reset(token)
+
+
+def pin_to_primary() -> None:
+    """Send the remaining reads of the current context to the primary"""
+    _use_replica.set(False)
+
+
+class PrimaryReplicaRouter:
+    """
+    Route reads to ``DATABASE_REPLICAS`` and everything else to the primary.
+
+    Reads only go to a replica when the current request allowed it (see
+    ``ReplicaRoutingMiddleware``), no write has happened yet in this context,
+    and the primary is not inside a transaction.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = get_replicas()
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror the primary, so objects from any alias can be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
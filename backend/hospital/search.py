@@ -0,0 +1,57 @@
+"""
+Patient typeahead.
+
+On PostgreSQL, names are matched with pg_trgm word similarity against the
+GIN index on the users' "first last" name, so partial and misspelt input
+("jon smi") still finds "John Smith", and phone-number input is matched as
+a substring of ``Patient.contact_info`` through its own trigram index.
+Matches are ranked by similarity. Other databases fall back to plain
+case-insensitive substring matching.
+"""
+import re
+
+from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import QuerySet
+
+from .models import Patient, full_name_expression
+
+PHONE_QUERY = re.compile(r'[\d\s()+\-.]+')
+
+
+def is_phone_query(query: str) -> bool:
+    return bool(PHONE_QUERY.fullmatch(query)) and sum(c.isdigit() for c in query) >= 3
+
+
+def search_patients(query: str, limit: int) -> QuerySet:
+    """
+    Patients matching a typeahead query, best matches first.
+
+    Args:
+        query: Part of a name or contact number
+        limit: Maximum number of results
+
+    Returns:
+        Queryset of dicts with id, full_name, contact_info, dob, age and gender
+    """
+    query = query.strip()
+    queryset = Patient.objects.annotate(full_name=full_name_expression('user__'))
+    phone = is_phone_query(query)
+
+    if connections[queryset.db].vendor == 'postgresql':
+        if phone:
+            # LIKE '%...%' is served by the contact_info trigram index
+            queryset = queryset.filter(contact_info__contains=query).annotate(
+                rank=TrigramSimilarity('contact_info', query))
+        else:
+            queryset = queryset.filter(full_name__trigram_word_similar=query).annotate(
+                rank=TrigramWordSimilarity(query, 'full_name'))
+        queryset = queryset.order_by('-rank', 'pk')
+    else:
+        if phone:
+            queryset = queryset.filter(contact_info__contains=query)
+        else:
+            queryset = queryset.filter(full_name__icontains=query)
+        queryset = queryset.order_by('full_name', 'pk')
+
+    return queryset.values('id', 'full_name', 'contact_info', 'dob', 'age', 'gender')[:limit]
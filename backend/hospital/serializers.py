@@ -1,17 +1,66 @@
 from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
 from django.utils import timezone
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .models import Patient, Doctor, Nurse, Staff, Department
+from .hashing import make_password
+from .instrumentation import SerializerTimingMixin
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin that keeps only the requested fields.
+
+    Accepts ``fields`` (whitelist) and ``omit`` (blacklist) keyword arguments
+    and can narrow a queryset to the columns the remaining fields read.
+    """
+    # Model columns read by fields whose source is not a model field
+    sparse_field_sources: Dict[str, Tuple[str, ...]] = {}
+    # select_related() paths needed by nested fields
+    sparse_select_related: Dict[str, Tuple[str, ...]] = {}
+
+    def __init__(self, *args, fields: Optional[Iterable[str]] = None,
+                 omit: Optional[Iterable[str]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in omit or ():
+            self.fields.pop(name, None)
+
+    def get_model_columns(self) -> List[str]:
+        """Concrete model columns needed to render the remaining fields"""
+        model = self.Meta.model
+        concrete = {f.name for f in model._meta.concrete_fields}
+        columns = [model._meta.pk.name]
+        for name, field in self.fields.items():
+            if name in self.sparse_field_sources:
+                sources = self.sparse_field_sources[name]
+            else:
+                sources = (field.source.split('.')[0],)
+            columns.extend(s for s in sources if s in concrete and s not in columns)
+        return columns
+
+    def trim_queryset(self, queryset):
+        """Restrict the SELECT to the columns and joins the fields need"""
+        related = [
+            path
+            for name in self.fields
+            for path in self.sparse_select_related.get(name, ())
+        ]
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*self.get_model_columns())
+
+class UserSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'role']
 
-class RegisterSerializer(serializers.ModelSerializer):
+class RegisterSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
     class Meta:
@@ -19,46 +68,95 @@ class RegisterSerializer(serializers.ModelSerializer):
         fields = ['username', 'password', 'email', 'first_name', 'last_name', 'role']
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            password=validated_data['password'],
-            email=validated_data.get('email', ''),
+        # Same as create_user(), but hashed outside the request thread
+        user = User(
+            username=User.normalize_username(validated_data['username']),
+            email=User.objects.normalize_email(validated_data.get('email', '')),
             first_name=validated_data.get('first_name', ''),
             last_name=validated_data.get('last_name', ''),
             role=validated_data.get('role', 'PATIENT')
         )
+        user.password = make_password(validated_data['password'])
+        user.save()
         return user
 
-class PatientProfileSerializer(serializers.ModelSerializer):
+class StaffOnboardingRowSerializer(SerializerTimingMixin, serializers.Serializer):
+    """
+    One roster row of bulk staff onboarding (see hospital.onboarding).
+
+    ``department`` is a department id when all digits and a name
+    otherwise, resolved against the ``departments`` lookup in the context. A blank password creates an
+    account that can't log in until a password is set.
+    """
+    PROFILE_ROLES = ['DOCTOR', 'NURSE', 'RECEPTIONIST', 'ADMIN']
+
+    username = serializers.CharField(max_length=150, validators=[User.username_validator])
+    password = serializers.CharField(required=False, allow_blank=True, write_only=True)
+    email = serializers.EmailField(required=False, allow_blank=True)
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    role = serializers.ChoiceField(choices=PROFILE_ROLES)
+    department = serializers.CharField(required=False, allow_blank=True)
+    contact_info = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    specialization = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    shift = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    position = serializers.CharField(max_length=100, required=False, allow_blank=True,
+                                     help_text='Job title of receptionists and admins')
+
+    def validate(self, attrs):
+        errors = {}
+        department = (attrs.get('department') or '').strip()
+        if department:
+            departments = self.context['departments']
+            if department.isascii() and department.isdigit():
+                attrs['department'] = departments['ids'].get(int(department))
+            else:
+                attrs['department'] = departments['names'].get(department.lower())
+            if attrs['department'] is None:
+                errors['department'] = [f'Unknown department "{department}".']
+        elif attrs['role'] != 'ADMIN':
+            # Admins may have no department, and then get no staff profile
+            errors['department'] = ['This field is required.']
+        else:
+            attrs['department'] = None
+        if attrs['role'] == 'DOCTOR' and not attrs.get('specialization'):
+            errors['specialization'] = ['Required for doctors.']
+        if attrs['role'] == 'NURSE' and not attrs.get('shift'):
+            errors['shift'] = ['Required for nurses.']
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+class PatientProfileSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = Patient
         fields = ['age', 'gender', 'contact_info', 'medical_history']
 
-class DoctorProfileSerializer(serializers.ModelSerializer):
+class DoctorProfileSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = Doctor
         fields = ['specialization', 'department', 'contact_info', 'schedule']
 
-class NurseProfileSerializer(serializers.ModelSerializer):
+class NurseProfileSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = Nurse
         fields = ['department', 'contact_info', 'shift']
 
-class StaffProfileSerializer(serializers.ModelSerializer):
+class StaffProfileSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = Staff
         fields = ['role', 'department', 'contact_info']
 
 # Additional Serializers
-from .models import Doctor, Appointment, MedicalRecord, Patient
+from .models import Doctor, Appointment, ArchivedAppointment, MedicalRecord, Patient
 
-class DoctorListSerializer(serializers.ModelSerializer):
+class DoctorListSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     class Meta:
         model = Doctor
         fields = ['id', 'user', 'specialization', 'department', 'contact_info', 'schedule']
 
-class AvailableSlotSerializer(serializers.Serializer):
+class AvailableSlotSerializer(SerializerTimingMixin, serializers.Serializer):
     start_time = serializers.DateTimeField()
     end_time = serializers.DateTimeField()
     formatted_time = serializers.SerializerMethodField()
@@ -71,10 +169,13 @@ class AvailableSlotSerializer(serializers.Serializer):
             
         return start_time.strftime('%Y-%m-%d %H:%M %p')
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(SerializerTimingMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     doctor_details = DoctorListSerializer(source='doctor', read_only=True)
     can_cancel = serializers.SerializerMethodField()
 
+    sparse_field_sources = {'can_cancel': ('appointment_time',)}
+    sparse_select_related = {'doctor_details': ('doctor__user',)}
+
     class Meta:
         model = Appointment
         fields = ['id', 'patient', 'doctor_details', 'appointment_time', 'status', 'notes', 'reason', 'duration', 'created_at', 'updated_at', 'can_cancel']
@@ -84,34 +185,58 @@ class AppointmentSerializer(serializers.ModelSerializer):
         time_until_appointment = obj.appointment_time - timezone.now()
         return time_until_appointment > timedelta(hours=24)
 
-class AppointmentCreateSerializer(serializers.ModelSerializer):
+class AppointmentSummarySerializer(AppointmentSerializer):
+    """Compact default representation for appointment lists"""
+    class Meta(AppointmentSerializer.Meta):
+        fields = ['id', 'patient', 'doctor', 'appointment_time', 'status', 'duration', 'can_cancel']
+
+class ArchivedAppointmentSerializer(SerializerTimingMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedAppointment
+        fields = ['id', 'patient', 'doctor', 'appointment_time', 'status', 'notes', 'reason', 'duration', 'created_at', 'updated_at', 'archived_at']
+
+class AppointmentCreateSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = Appointment
         fields = ['id', 'doctor', 'appointment_time', 'reason', 'duration']
 
-class AppointmentUpdateSerializer(serializers.ModelSerializer):
+class AppointmentUpdateSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = Appointment
         fields = ['status', 'notes']
         read_only_fields = ['status']
 
-class MedicalRecordSerializer(serializers.ModelSerializer):
+class AppointmentBulkStatusSerializer(SerializerTimingMixin, serializers.Serializer):
+    """Outcome to record for a batch of scheduled appointments"""
+    MAX_IDS = 500
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_IDS)
+    status = serializers.ChoiceField(choices=[
+        choice for choice in Appointment.STATUS_CHOICES if choice[0] != 'S'
+    ])
+
+class MedicalRecordSerializer(SerializerTimingMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = MedicalRecord
         fields = ['id', 'patient', 'doctor', 'visit_date', 'visit_notes', 'diagnosis', 'prescriptions', 'lab_results', 'follow_up_required', 'follow_up_date', 'attachments', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
 
-class MedicalRecordCreateSerializer(serializers.ModelSerializer):
+class MedicalRecordSummarySerializer(MedicalRecordSerializer):
+    """Compact default representation for medical record lists"""
+    class Meta(MedicalRecordSerializer.Meta):
+        fields = ['id', 'patient', 'doctor', 'visit_date', 'diagnosis', 'follow_up_required', 'follow_up_date']
+
+class MedicalRecordCreateSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = MedicalRecord
         fields = ['patient', 'visit_date', 'visit_notes', 'diagnosis', 'prescriptions', 'lab_results', 'follow_up_required', 'follow_up_date', 'attachments']
 
-class MedicalRecordUpdateSerializer(serializers.ModelSerializer):
+class MedicalRecordUpdateSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = MedicalRecord
         fields = ['visit_notes', 'diagnosis', 'prescriptions', 'lab_results', 'follow_up_required', 'follow_up_date', 'attachments']
 
-class PatientMedicalHistorySerializer(serializers.ModelSerializer):
+class PatientMedicalHistorySerializer(SerializerTimingMixin, serializers.ModelSerializer):
     medical_records = MedicalRecordSerializer(many=True, read_only=True)
     class Meta:
         model = Patient
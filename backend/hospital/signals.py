@@ -0,0 +1,102 @@
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .analytics import invalidate_demographics
+from .cache import bump_directory_version
+from .db import record_connection_opened
+from .events import get_broadcast, publish_appointment_event
+from .instrumentation import install_execute_wrapper
+from .models import Appointment, Department, Doctor, Nurse, Patient
+
+User = get_user_model()
+
+
+def invalidate_doctor_directory() -> None:
+    # Bump after commit so a concurrent rebuild can't cache uncommitted state
+    transaction.on_commit(bump_directory_version)
+
+
+@receiver([post_save, post_delete], sender=Doctor)
+@receiver([post_save, post_delete], sender=Department)
+def doctor_directory_changed(sender, **kwargs):
+    invalidate_doctor_directory()
+
+
+@receiver([post_save, post_delete], sender=User)
+def doctor_user_changed(sender, instance, **kwargs):
+    # Logins only touch last_login, which the directory doesn't show
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    if instance.role == 'DOCTOR':
+        invalidate_doctor_directory()
+
+
+def appointment_event_type(appointment: Appointment, created: bool) -> str:
+    if created:
+        return 'created'
+    return 'cancelled' if appointment.status == 'X' else 'updated'
+
+
+def cached_user_ids(appointment: Appointment) -> Optional[Tuple[int, int]]:
+    """The patient's and doctor's user ids if both relations are already loaded"""
+    fields = Appointment._meta
+    if fields.get_field('patient').is_cached(appointment) and fields.get_field('doctor').is_cached(appointment):
+        return appointment.patient.user_id, appointment.doctor.user_id
+    return None
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, created, **kwargs):
+    # Nobody can be listening (e.g. in-process broadcast under WSGI): skip the event entirely
+    if not get_broadcast().has_subscribers():
+        return
+    event = appointment_event_type(instance, created)
+    payload = {
+        'id': instance.pk,
+        'status': instance.status,
+        'appointment_time': instance.appointment_time,
+        'updated_at': instance.updated_at,
+    }
+    known_user_ids = cached_user_ids(instance)
+
+    def publish():
+        # Otherwise resolve the recipients after commit, outside the writer's transaction
+        user_ids = known_user_ids or (Appointment.objects.filter(pk=payload['id'])
+                                      .values_list('patient__user_id', 'doctor__user_id').first())
+        if user_ids:
+            publish_appointment_event(event, payload, user_ids)
+
+    transaction.on_commit(publish)
+
+
+@receiver(post_save, sender=Patient)
+def patient_saved(sender, instance, created, **kwargs):
+    # New patients are folded into the cached demographics incrementally
+    if not created:
+        transaction.on_commit(invalidate_demographics)
+
+
+@receiver(post_delete, sender=Patient)
+def patient_deleted(sender, **kwargs):
+    transaction.on_commit(invalidate_demographics)
+
+
+@receiver(post_delete, sender=Doctor)
+@receiver(post_delete, sender=Nurse)
+def assigned_staff_deleted(sender, **kwargs):
+    # SET_NULL on Patient.assigned_* is a bulk UPDATE that sends no Patient signals
+    transaction.on_commit(invalidate_demographics)
+
+
+@receiver(connection_created)
+def database_connection_opened(sender, connection, **kwargs):
+    record_connection_opened(connection.alias)
+    if settings.REQUEST_METRICS['ENABLED']:
+        install_execute_wrapper(connection)
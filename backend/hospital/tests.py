@@ -1,3 +1,776 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from datetime import time as dt_time
+from io import StringIO
+from typing import Dict, List, Tuple
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from . import analytics, hashing
+from .analytics import doctor_utilization, get_demographics_snapshot, scheduled_minutes
+from .changefeed import encode_cursor
+from .events import InProcessBroadcast
+from .models import (
+    Appointment, CustomUser, Department, Doctor, MedicalRecord, Nurse, Patient, ScheduleException, Staff,
+)
+from .partitioning import PARTITIONED_TABLES, default_partition_name, ensure_partitions, is_partitioned, partition_name
+from .reminders import LocMemChannel, ReminderScheduler, TimerWheel
+from .serializers import AppointmentBulkStatusSerializer
+from .utils import ScheduleExceptions, get_doctor_schedule, is_slot_conflict
+
+
+def make_doctor_and_patient():
+    department = Department.objects.create(name='Cardiology')
+    doctor = Doctor.objects.create(
+        user=CustomUser.objects.create_user('doctor', password='pw', role='DOCTOR', first_name='Ada', last_name='Lee'),
+        department=department, specialization='Cardiology', contact_info='100',
+    )
+    patient = Patient.objects.create(
+        user=CustomUser.objects.create_user('patient', password='pw', role='PATIENT', first_name='Bo',
+                                            last_name='Ray', email='bo@example.com'),
+        age=40, gender='M', contact_info='555',
+    )
+    return doctor, patient
+
+
+@override_settings(PASSWORD_HASHING={'OFFLOAD': True, 'MAX_PENDING': 1, 'QUEUE_TIMEOUT': 0.1})
+class HashingPoolTests(SimpleTestCase):
+    def test_failed_submit_gives_its_slot_back(self):
+        broken = mock.Mock(**{'submit.side_effect': BrokenProcessPool})
+        with mock.patch.object(hashing, '_slots', threading.BoundedSemaphore(1)), \
+                mock.patch.object(hashing, 'get_executor', return_value=broken):
+            # With the slot leaked, the second call would be refused as overloaded
+            for _ in range(2):
+                with self.assertRaises(BrokenProcessPool):
+                    hashing.make_password('secret')
+        self.assertEqual(broken.submit.call_count, 4)
+
+
+class TimerWheelTests(SimpleTestCase):
+    def test_fires_timers_in_order_of_their_ticks(self):
+        wheel = TimerWheel(tick=1, slots=8, now=0)
+        wheel.schedule(1, 3, 'a')
+        wheel.schedule(2, 5, 'b')
+        self.assertEqual(wheel.advance(2), [])
+        self.assertEqual(wheel.advance(3), ['a'])
+        self.assertEqual(wheel.advance(6), ['b'])
+        self.assertEqual(len(wheel), 0)
+
+    def test_timer_beyond_one_revolution_waits_for_its_tick(self):
+        wheel = TimerWheel(tick=1, slots=8, now=0)
+        # Tick 10 shares slot 2 with tick 2
+        wheel.schedule(1, 10, 'late')
+        wheel.schedule(2, 2, 'early')
+        self.assertEqual(wheel.advance(7), ['early'])
+        self.assertIn(1, wheel)
+        # Advancing to tick 12 wraps round to slots 0-4
+        self.assertEqual(wheel.advance(12), ['late'])
+
+    def test_jump_past_a_whole_revolution_fires_everything_due(self):
+        wheel = TimerWheel(tick=1, slots=8, now=0)
+        for key in range(20):
+            wheel.schedule(key, key, key)
+        self.assertEqual(sorted(wheel.advance(100)), list(range(20)))
+
+    def test_reschedule_replaces_and_cancel_removes(self):
+        wheel = TimerWheel(tick=1, slots=8, now=6)
+        wheel.schedule(1, 7, 'first')
+        wheel.schedule(1, 9, 'moved')
+        wheel.schedule(2, 8, 'cancelled')
+        wheel.cancel(2)
+        wheel.cancel(3)
+        self.assertEqual(wheel.advance(8), [])
+        self.assertEqual(wheel.advance(9), ['moved'])
+
+    def test_past_due_timer_fires_on_next_advance(self):
+        wheel = TimerWheel(tick=1, slots=8, now=50)
+        wheel.schedule(1, 10, 'overdue')
+        self.assertEqual(wheel.advance(50), ['overdue'])
+
+    def test_ticks_coarser_than_a_second(self):
+        wheel = TimerWheel(tick=5, slots=4, now=0)
+        wheel.schedule(1, 12, 'a')
+        self.assertEqual(wheel.advance(9.9), [])
+        self.assertEqual(wheel.advance(10), ['a'])
+
+
+class ScheduleExceptionsTests(SimpleTestCase):
+    def setUp(self):
+        self.leave = ScheduleException(start_date=date(2025, 3, 1), end_date=date(2025, 3, 10))
+        self.morning = ScheduleException(start_date=date(2025, 3, 3), end_date=date(2025, 3, 4),
+                                         start_time=dt_time(9), end_time=dt_time(12))
+        self.training = ScheduleException(start_date=date(2025, 3, 4), end_date=date(2025, 3, 4),
+                                          start_time=dt_time(14), end_time=dt_time(15))
+        self.quarter = ScheduleException(start_date=date(2025, 1, 1), end_date=date(2025, 3, 31),
+                                         start_time=dt_time(16), end_time=dt_time(17))
+        self.holiday = ScheduleException(start_date=date(2025, 3, 20), end_date=date(2025, 3, 20))
+        self.exceptions = ScheduleExceptions([self.holiday, self.training, self.leave, self.quarter, self.morning])
+
+    def test_on_returns_every_overlapping_exception(self):
+        self.assertCountEqual(self.exceptions.on(date(2025, 3, 4)),
+                              [self.leave, self.morning, self.training, self.quarter])
+        self.assertCountEqual(self.exceptions.on(date(2025, 3, 1)), [self.leave, self.quarter])
+
+    def test_long_exception_found_behind_shorter_ones_that_ended(self):
+        # leave, morning and training all started later and ended before the 25th
+        self.assertEqual(self.exceptions.on(date(2025, 3, 25)), [self.quarter])
+
+    def test_range_ends_are_inclusive(self):
+        self.assertIn(self.leave, self.exceptions.on(date(2025, 3, 10)))
+        self.assertNotIn(self.leave, self.exceptions.on(date(2025, 3, 11)))
+        self.assertEqual(self.exceptions.on(date(2024, 12, 31)), [])
+        self.assertEqual(self.exceptions.on(date(2025, 4, 1)), [])
+
+    def test_day_off_only_for_whole_day_exceptions(self):
+        self.assertTrue(self.exceptions.is_day_off(date(2025, 3, 5)))
+        self.assertTrue(self.exceptions.is_day_off(date(2025, 3, 20)))
+        self.assertFalse(self.exceptions.is_day_off(date(2025, 3, 11)))
+
+    def test_blocked_hours_collects_partial_day_exceptions(self):
+        self.assertCountEqual(self.exceptions.blocked_hours(date(2025, 3, 4)),
+                              [(dt_time(9), dt_time(12)), (dt_time(14), dt_time(15)), (dt_time(16), dt_time(17))])
+        self.assertEqual(self.exceptions.blocked_hours(date(2025, 3, 12)), [(dt_time(16), dt_time(17))])
+
+    def test_empty(self):
+        exceptions = ScheduleExceptions([])
+        self.assertEqual(exceptions.on(date(2025, 3, 4)), [])
+        self.assertFalse(exceptions.is_day_off(date(2025, 3, 4)))
+
+
+class ScheduledMinutesTests(SimpleTestCase):
+    schedule = {'start_time': dt_time(9), 'end_time': dt_time(17),
+                'break_start': dt_time(12), 'break_end': dt_time(13)}
+
+    def test_working_hours_minus_break(self):
+        self.assertEqual(scheduled_minutes(self.schedule), 420)
+        self.assertEqual(scheduled_minutes(None), 0)
+
+    def test_overlapping_blocked_hours_count_once(self):
+        blocked = [(dt_time(9), dt_time(11)), (dt_time(10), dt_time(12, 30)), (dt_time(16), dt_time(18))]
+        # 9:00-13:00 (with the break) and 16:00-17:00 are gone
+        self.assertEqual(scheduled_minutes(self.schedule, blocked), 180)
+
+    def test_blocked_hours_outside_working_hours_are_ignored(self):
+        self.assertEqual(scheduled_minutes(self.schedule, [(dt_time(6), dt_time(8)), (dt_time(12), dt_time(13))]), 420)
+
+
+class DoctorUtilizationTests(TestCase):
+    # A Monday to Sunday week
+    monday = date(2025, 3, 3)
+
+    def setUp(self):
+        self.doctor, self.patient = make_doctor_and_patient()
+        day = {'start': '09:00', 'end': '17:00', 'break_start': '12:00', 'break_end': '13:00'}
+        self.doctor.schedule = {name: day for name in ['monday', 'tuesday', 'wednesday', 'thursday', 'friday']}
+        self.doctor.save()
+
+    def utilization(self):
+        return doctor_utilization(self.monday, self.monday + timedelta(days=6))
+
+    def test_days_left_out_of_the_schedule_are_off(self):
+        result = self.utilization()
+        self.assertEqual(result['scheduled_minutes'], 5 * 420)
+        self.assertEqual(result['weekdays'][6], {'weekday': 'sunday', 'booked_minutes': 0,
+                                                 'scheduled_minutes': 0, 'utilization': None})
+        self.assertIsNone(get_doctor_schedule(self.doctor, self.monday + timedelta(days=6)))
+
+    def test_doctor_without_a_schedule_works_default_hours_every_day(self):
+        self.doctor.schedule = {}
+        self.doctor.save()
+        self.assertEqual(self.utilization()['scheduled_minutes'], 7 * 420)
+
+    def test_schedule_exceptions_are_deducted(self):
+        wednesday, thursday = self.monday + timedelta(days=2), self.monday + timedelta(days=3)
+        ScheduleException.objects.create(doctor=self.doctor, start_date=wednesday, end_date=wednesday)
+        # Overlapping partial closures: 9:00-12:00 of Thursday is lost once
+        ScheduleException.objects.create(department=self.doctor.department, start_date=thursday, end_date=thursday,
+                                         start_time=dt_time(9), end_time=dt_time(11))
+        ScheduleException.objects.create(start_date=thursday, end_date=thursday,
+                                         start_time=dt_time(10), end_time=dt_time(12))
+        # A holiday on a day off changes nothing
+        ScheduleException.objects.create(start_date=self.monday + timedelta(days=6),
+                                         end_date=self.monday + timedelta(days=6))
+        # Leave for another department's doctors doesn't apply
+        ScheduleException.objects.create(department=Department.objects.create(name='Surgery'),
+                                         start_date=self.monday, end_date=self.monday)
+
+        result = self.utilization()
+        by_day = {row['weekday']: row['scheduled_minutes'] for row in result['weekdays']}
+        self.assertEqual(by_day['monday'], 420)
+        self.assertEqual(by_day['wednesday'], 0)
+        self.assertEqual(by_day['thursday'], 240)
+        self.assertEqual(result['scheduled_minutes'], 3 * 420 + 240)
+
+
+class DemographicsSnapshotTests(TestCase):
+    def setUp(self):
+        self.doctor, self.patient = make_doctor_and_patient()
+        self.patient.assigned_doctor = self.doctor
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.save()
+
+    def test_invalidation_during_a_rebuild_is_not_overwritten(self):
+        build = analytics.build_demographics_snapshot
+
+        def build_then_edit():
+            # The patient is edited after this request read it but before it caches the result
+            snapshot = build()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.patient.assigned_doctor = None
+                self.patient.save()
+            return snapshot
+
+        with mock.patch.object(analytics, 'build_demographics_snapshot', build_then_edit):
+            stale = get_demographics_snapshot()
+        self.assertEqual(stale['counts']['assigned_doctor_id'], {self.doctor.pk: 1})
+        self.assertEqual(get_demographics_snapshot()['counts']['assigned_doctor_id'], {None: 1})
+
+    def test_deleting_an_assigned_doctor_drops_the_snapshot(self):
+        get_demographics_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctor.delete()
+        self.assertEqual(get_demographics_snapshot()['counts']['assigned_doctor_id'], {None: 1})
+
+
+class AppointmentBulkStatusTests(TestCase):
+    url = '/api/appointments/bulk-status/'
+
+    def setUp(self):
+        self.doctor, self.patient = make_doctor_and_patient()
+        self.other_doctor = Doctor.objects.create(
+            user=CustomUser.objects.create_user('other', password='pw', role='DOCTOR'),
+            department=self.doctor.department, specialization='Cardiology', contact_info='200',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor.user)
+
+    def book(self, hours: float, doctor: Doctor = None, **kwargs) -> Appointment:
+        """An appointment ``hours`` ago (negative: ahead)"""
+        return Appointment.objects.create(doctor=doctor or self.doctor, patient=self.patient,
+                                          appointment_time=timezone.now() - timedelta(hours=hours), **kwargs)
+
+    def post(self, ids, new_status):
+        return self.client.post(self.url, {'ids': ids, 'status': new_status}, format='json')
+
+    def statuses(self, *appointments) -> List[str]:
+        return [Appointment.objects.get(pk=appointment.pk).status for appointment in appointments]
+
+    def cancellations(self) -> float:
+        return REGISTRY.get_sample_value('hospital_appointment_cancellations_total') or 0
+
+    def test_doctor_cannot_change_another_doctors_appointment(self):
+        theirs = self.book(-48, doctor=self.other_doctor)
+        response = self.post([theirs.pk], 'X')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 0)
+        self.assertEqual(response.data['results'], [{'id': theirs.pk, 'result': 'forbidden'}])
+        self.assertEqual(self.statuses(theirs), ['S'])
+
+    def test_unknown_ids_are_reported(self):
+        response = self.post([999999], 'X')
+        self.assertEqual(response.data['results'], [{'id': 999999, 'result': 'not_found'}])
+
+    def test_more_than_max_ids_is_rejected(self):
+        response = self.post(list(range(1, AppointmentBulkStatusSerializer.MAX_IDS + 2)), 'X')
+        self.assertEqual(response.status_code, 400)
+
+    def test_patients_may_not_use_it(self):
+        self.client.force_authenticate(self.patient.user)
+        self.assertEqual(self.post([self.book(-48).pk], 'X').status_code, 403)
+
+    def test_mixed_batch_only_changes_permitted_rows(self):
+        seen = self.book(2)
+        upcoming = self.book(-48)
+        cancelled = self.book(3, status='X')
+        theirs = self.book(4, doctor=self.other_doctor)
+
+        response = self.post([seen.pk, upcoming.pk, cancelled.pk, theirs.pk, seen.pk], 'C')
+
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['results'], [
+            {'id': seen.pk, 'result': 'updated'},
+            {'id': upcoming.pk, 'result': 'not_due'},
+            {'id': cancelled.pk, 'result': 'invalid_transition', 'status': 'X'},
+            {'id': theirs.pk, 'result': 'forbidden'},
+        ])
+        self.assertEqual(self.statuses(seen, upcoming, cancelled, theirs), ['C', 'S', 'X', 'S'])
+
+    def test_cancelling_counts_only_updated_rows(self):
+        before = self.cancellations()
+        mine = [self.book(-48), self.book(-72)]
+        theirs = self.book(-96, doctor=self.other_doctor)
+
+        response = self.post([mine[0].pk, mine[1].pk, theirs.pk], 'X')
+
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(self.statuses(*mine, theirs), ['X', 'X', 'S'])
+        self.assertEqual(self.cancellations() - before, 2)
+
+    def test_admin_may_change_any_appointment(self):
+        self.client.force_authenticate(CustomUser.objects.create_user('admin', password='pw', role='ADMIN'))
+        theirs = self.book(-48, doctor=self.other_doctor)
+        self.assertEqual(self.post([theirs.pk], 'X').data['updated'], 1)
+        self.assertEqual(self.statuses(theirs), ['X'])
+
+
+class ChangeFeedTests(TestCase):
+    url = '/api/sync/appointments/'
+
+    def setUp(self):
+        self.doctor, self.patient = make_doctor_and_patient()
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor.user)
+        now = timezone.now()
+        self.appointments = [
+            Appointment.objects.create(doctor=self.doctor, patient=self.patient,
+                                       appointment_time=now + timedelta(days=1, hours=hour))
+            for hour in range(5)
+        ]
+        # Three rows share one updated_at, two share another
+        self.older, self.newer = now - timedelta(hours=1), now - timedelta(minutes=30)
+        ids = [appointment.pk for appointment in self.appointments]
+        Appointment.objects.filter(pk__in=ids[:3]).update(updated_at=self.older)
+        Appointment.objects.filter(pk__in=ids[3:]).update(updated_at=self.newer)
+
+    def get(self, **params):
+        return self.client.get(self.url, params)
+
+    def test_pages_through_shared_timestamps_without_gaps_or_duplicates(self):
+        seen, pages, cursor = [], [], None
+        while True:
+            response = self.get(limit=2, **({'cursor': cursor} if cursor else {}))
+            self.assertEqual(response.status_code, 200)
+            seen += [row['id'] for row in response.data['results']]
+            pages.append(response.data['has_more'])
+            cursor = response.data['cursor']
+            if not response.data['has_more']:
+                break
+        self.assertEqual(seen, [appointment.pk for appointment in self.appointments])
+        self.assertEqual(pages, [True, True, False])
+
+        # Caught up: the same cursor comes back with nothing new
+        response = self.get(cursor=cursor)
+        self.assertEqual((response.data['results'], response.data['cursor']), ([], cursor))
+
+        # A later change shows up after the cursor
+        Appointment.objects.filter(pk=self.appointments[0].pk).update(updated_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual([row['id'] for row in self.get(cursor=cursor).data['results']], [self.appointments[0].pk])
+
+    def test_malformed_cursor_is_rejected(self):
+        for cursor in ('not-a-cursor', encode_cursor(self.older, 1)[:-4]):
+            self.assertEqual(self.get(cursor=cursor).status_code, 400)
+
+    def test_bad_limits(self):
+        self.assertEqual(self.get(limit='ten').status_code, 400)
+        self.assertEqual(self.get(limit=0).status_code, 400)
+
+    @override_settings(CHANGE_FEED={'PAGE_SIZE': 2, 'MAX_PAGE_SIZE': 3, 'SETTLE_SECONDS': 5})
+    def test_limit_is_clamped_to_max_page_size(self):
+        self.assertEqual(len(self.get().data['results']), 2)
+        response = self.get(limit=100)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertTrue(response.data['has_more'])
+
+    def test_rows_inside_the_settle_window_are_held_back(self):
+        recent = self.appointments[-1]
+        recent.notes = 'Bring referral'
+        recent.save()
+        self.assertNotIn(recent.pk, [row['id'] for row in self.get().data['results']])
+        with override_settings(CHANGE_FEED={'PAGE_SIZE': 200, 'MAX_PAGE_SIZE': 1000, 'SETTLE_SECONDS': 0}):
+            self.assertIn(recent.pk, [row['id'] for row in self.get().data['results']])
+
+
+class AppointmentEventTests(TestCase):
+    def setUp(self):
+        self.doctor, self.patient = make_doctor_and_patient()
+
+    def book(self) -> Appointment:
+        return Appointment.objects.create(doctor=self.doctor, patient=self.patient,
+                                          appointment_time=timezone.now() + timedelta(days=2))
+
+    def test_nothing_is_queued_without_subscribers(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.book()
+        self.assertEqual(callbacks, [])
+
+    @mock.patch.object(InProcessBroadcast, 'has_subscribers', return_value=True)
+    @mock.patch('hospital.signals.publish_appointment_event')
+    def test_loaded_relations_are_not_queried_again(self, publish, _):
+        with self.captureOnCommitCallbacks() as callbacks:
+            appointment = self.book()
+        with self.assertNumQueries(0):
+            callbacks[0]()
+        publish.assert_called_once()
+        self.assertEqual(publish.call_args.args[1]['id'], appointment.pk)
+        self.assertEqual(publish.call_args.args[2], (self.patient.user_id, self.doctor.user_id))
+
+        # A bare instance still looks its recipients up after commit
+        bare = Appointment.objects.get(pk=appointment.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            bare.save()
+        with self.assertNumQueries(1):
+            callbacks[0]()
+        self.assertEqual(publish.call_args.args[2], (self.patient.user_id, self.doctor.user_id))
+
+
+@override_settings(REMINDERS={
+    'CHANNEL': 'hospital.reminders.LocMemChannel',
+    'LEAD_MINUTES': 60,
+    'LOOKAHEAD_SECONDS': 300,
+    'TICK_SECONDS': 1,
+    'WHEEL_SLOTS': 600,
+    'RETRY_SECONDS': 30,
+    'CHANGE_OVERLAP_SECONDS': 5,
+})
+class ReminderSchedulerTests(TestCase):
+    def setUp(self):
+        self.doctor, self.patient = make_doctor_and_patient()
+        LocMemChannel.outbox = []
+        # A fake clock starting at the real time, so updated_at stamps fall in the change window
+        self.now = time.time()
+        self.scheduler = ReminderScheduler(clock=lambda: self.now)
+
+    def at(self, seconds: float) -> datetime:
+        """Appointment time whose reminder is due ``seconds`` from the fake now"""
+        return datetime.fromtimestamp(self.now, tz=dt_timezone.utc) + timedelta(minutes=60, seconds=seconds)
+
+    def book(self, seconds: float, **kwargs) -> Appointment:
+        return Appointment.objects.create(doctor=self.doctor, patient=self.patient,
+                                          appointment_time=self.at(seconds), **kwargs)
+
+    def test_sends_reminder_when_due(self):
+        appointment = self.book(120)
+        self.scheduler.poll()
+        self.assertIn(appointment.pk, self.scheduler.wheel)
+
+        self.now += 119
+        self.assertEqual(self.scheduler.run_due(), 0)
+        self.now += 1
+        self.assertEqual(self.scheduler.run_due(), 1)
+        self.assertEqual([r.appointment_id for r in LocMemChannel.outbox], [appointment.pk])
+        self.assertEqual(LocMemChannel.outbox[0].patient_email, 'bo@example.com')
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.reminded_for, appointment.appointment_time)
+
+    def test_only_loads_the_lookahead_window(self):
+        later = self.book(600)
+        self.scheduler.poll()
+        self.assertNotIn(later.pk, self.scheduler.wheel)
+
+        self.now += 400
+        self.scheduler.poll()
+        self.assertIn(later.pk, self.scheduler.wheel)
+
+    def test_reschedule_replaces_the_timer(self):
+        appointment = self.book(120)
+        self.scheduler.poll()
+        new_time = self.at(240)
+        appointment.appointment_time = new_time
+        appointment.save()
+        self.scheduler.poll()
+
+        self.now += 120
+        self.assertEqual(self.scheduler.run_due(), 0)
+        self.now += 120
+        self.assertEqual(self.scheduler.run_due(), 1)
+        self.assertEqual(LocMemChannel.outbox[0].appointment_time, new_time)
+
+    def test_reschedule_out_of_the_window_drops_the_timer(self):
+        appointment = self.book(120)
+        self.scheduler.poll()
+        appointment.appointment_time = self.at(3600)
+        appointment.save()
+        self.scheduler.poll()
+        self.assertNotIn(appointment.pk, self.scheduler.wheel)
+
+    def test_cancel_drops_the_timer(self):
+        appointment = self.book(120)
+        self.scheduler.poll()
+        appointment.status = 'X'
+        appointment.save()
+        self.scheduler.poll()
+        self.assertNotIn(appointment.pk, self.scheduler.wheel)
+
+        self.now += 120
+        self.assertEqual(self.scheduler.run_due(), 0)
+        self.assertEqual(LocMemChannel.outbox, [])
+
+    def test_cancelled_after_last_poll_fails_the_claim(self):
+        appointment = self.book(120)
+        self.scheduler.poll()
+        Appointment.objects.filter(pk=appointment.pk).update(status='X')
+
+        self.now += 120
+        self.assertEqual(self.scheduler.run_due(), 0)
+        self.assertEqual(LocMemChannel.outbox, [])
+
+    def test_already_reminded_appointments_are_not_loaded_again(self):
+        appointment = self.book(120)
+        Appointment.objects.filter(pk=appointment.pk).update(reminded_for=appointment.appointment_time)
+        self.scheduler.poll()
+        self.assertNotIn(appointment.pk, self.scheduler.wheel)
+
+
+@override_settings(APPOINTMENT_SWEEP={'GRACE_HOURS': 24, 'CHUNK_SIZE': 2})
+class SweepAppointmentsTests(TestCase):
+    def setUp(self):
+        self.doctor, self.patient = make_doctor_and_patient()
+        self.other_doctor = Doctor.objects.create(
+            user=CustomUser.objects.create_user('other', password='pw', role='DOCTOR'),
+            department=self.doctor.department, specialization='Cardiology', contact_info='101',
+        )
+        self.now = timezone.now()
+
+    def book(self, hours_ago: float, doctor=None, **kwargs) -> Appointment:
+        return Appointment.objects.create(doctor=doctor or self.doctor, patient=self.patient,
+                                          appointment_time=self.now - timedelta(hours=hours_ago), **kwargs)
+
+    def record(self, visit_date, doctor=None) -> None:
+        MedicalRecord.objects.create(patient=self.patient, doctor=doctor or self.doctor, visit_date=visit_date,
+                                     visit_notes='Seen', diagnosis='Fine', prescriptions='None')
+
+    def sweep(self) -> None:
+        call_command('sweep_appointments', stdout=StringIO())
+
+    def status(self, appointment: Appointment) -> str:
+        appointment.refresh_from_db()
+        return appointment.status
+
+    def test_classifies_past_scheduled_appointments(self):
+        seen = self.book(72)
+        self.record(timezone.localdate(seen.appointment_time))
+        missed = self.book(96)
+        # A record by another doctor, or on another day, doesn't count
+        seen_by_other = self.book(120)
+        self.record(timezone.localdate(seen_by_other.appointment_time), doctor=self.other_doctor)
+        seen_other_day = self.book(144)
+        self.record(timezone.localdate(seen_other_day.appointment_time) - timedelta(days=1))
+
+        self.sweep()
+
+        self.assertEqual(self.status(seen), 'C')
+        self.assertEqual(self.status(missed), 'N')
+        self.assertEqual(self.status(seen_by_other), 'N')
+        self.assertEqual(self.status(seen_other_day), 'N')
+
+    def test_leaves_recent_and_closed_appointments_alone(self):
+        recent = self.book(2)
+        upcoming = self.book(-48)
+        cancelled = self.book(72, status='X')
+        completed = self.book(96, status='C')
+
+        self.sweep()
+
+        self.assertEqual(self.status(recent), 'S')
+        self.assertEqual(self.status(upcoming), 'S')
+        self.assertEqual(self.status(cancelled), 'X')
+        self.assertEqual(self.status(completed), 'C')
+
+    def test_stamps_updated_at_for_the_change_feed(self):
+        missed = self.book(72)
+        before = Appointment.objects.get(pk=missed.pk).updated_at
+        self.sweep()
+        missed.refresh_from_db()
+        self.assertGreater(missed.updated_at, before)
+
+
+def book_across_months(doctor, patient) -> None:
+    """An appointment and a medical record in two past months, next week and a month far ahead"""
+    moments = [datetime(2025, 1, 15, 9, tzinfo=dt_timezone.utc), datetime(2025, 6, 30, 23, 30, tzinfo=dt_timezone.utc),
+               timezone.now() + timedelta(days=3), datetime(2099, 5, 1, 9, tzinfo=dt_timezone.utc)]
+    for moment in moments:
+        Appointment.objects.create(doctor=doctor, patient=patient, appointment_time=moment)
+        MedicalRecord.objects.create(doctor=doctor, patient=patient, visit_date=moment.date(), diagnosis='Checkup')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Partitioning is PostgreSQL only')
+class PartitionMigrationTests(TransactionTestCase):
+    # Migrations commit as they go, like manage.py migrate
+    tables = list(PARTITIONED_TABLES)
+
+    def setUp(self):
+        self.doctor, self.patient = make_doctor_and_patient()
+        book_across_months(self.doctor, self.patient)
+
+    def tearDown(self):
+        # Leave the schema migrated even if the round trip failed halfway
+        MigrationExecutor(connection).migrate(MigrationExecutor(connection).loader.graph.leaf_nodes('hospital'))
+
+    def migrate(self, target: str) -> None:
+        MigrationExecutor(connection).migrate([('hospital', target)])
+
+    def definition(self, table: str):
+        """Constraint and index names, (row count, highest id) and whether the table is partitioned"""
+        with connection.cursor() as cursor:
+            names = set(connection.introspection.get_constraints(cursor, table))
+            cursor.execute(f'SELECT count(*), max(id) FROM {table}')
+            return names, cursor.fetchone(), is_partitioned(cursor, table)
+
+    def create_rows(self) -> Dict[str, int]:
+        moment = timezone.now() + timedelta(days=5)
+        appointment = Appointment.objects.create(doctor=self.doctor, patient=self.patient, appointment_time=moment)
+        record = MedicalRecord.objects.create(doctor=self.doctor, patient=self.patient,
+                                              visit_date=moment.date(), diagnosis='Follow-up')
+        return {'hospital_appointment': appointment.pk, 'hospital_medicalrecord': record.pk}
+
+    def assert_rebuilt(self, before: Dict[str, Tuple], partitioned: bool) -> None:
+        for table in self.tables:
+            names, rows, is_part = self.definition(table)
+            self.assertEqual(is_part, partitioned)
+            self.assertEqual(rows, before[table][1])
+            self.assertEqual(names, before[table][0])
+        # The id sequence carries on past the copied rows
+        for table, pk in self.create_rows().items():
+            self.assertGreater(pk, before[table][1][1])
+
+    def test_round_trip_keeps_rows_sequences_and_indexes(self):
+        partitioned = {table: self.definition(table) for table in self.tables}
+        self.assertTrue(all(is_part for _, _, is_part in partitioned.values()))
+
+        self.migrate('0013_schedule_exceptions')
+        self.assert_rebuilt(partitioned, partitioned=False)
+
+        plain = {table: self.definition(table) for table in self.tables}
+        self.migrate('0015_archived_appointment')
+        self.assert_rebuilt(plain, partitioned=True)
+        self.assertEqual({table: self.definition(table)[0] for table in self.tables},
+                         {table: partitioned[table][0] for table in self.tables})
+
+        # The unique slot constraint is enforced again, and recognised as a slot conflict
+        taken = Appointment.objects.order_by('pk').first().appointment_time
+        with self.assertRaises(IntegrityError) as raised, transaction.atomic():
+            Appointment.objects.create(doctor=self.doctor, patient=self.patient, appointment_time=taken)
+        self.assertTrue(is_slot_conflict(raised.exception))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Partitioning is PostgreSQL only')
+class EnsurePartitionsTests(TestCase):
+    month = date(2099, 5, 1)
+
+    def setUp(self):
+        book_across_months(*make_doctor_and_patient())
+
+    def count(self, partition: str, table: str) -> int:
+        column = PARTITIONED_TABLES[table]
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {partition} WHERE {column} >= %s', [self.month])
+            return cursor.fetchone()[0]
+
+    def test_moves_rows_out_of_the_default_partition(self):
+        for table in PARTITIONED_TABLES:
+            self.assertEqual(self.count(default_partition_name(table), table), 1)
+
+            created = ensure_partitions(table, 0, today=self.month + timedelta(days=19))
+
+            self.assertEqual(created, [partition_name(table, self.month)])
+            self.assertEqual(self.count(default_partition_name(table), table), 0)
+            self.assertEqual(self.count(partition_name(table, self.month), table), 1)
+            self.assertEqual(ensure_partitions(table, 0, today=self.month), [])
+
+
+@override_settings(PASSWORD_HASHING={'OFFLOAD': False})
+class StaffOnboardingTests(TestCase):
+    url = '/api/register/staff/bulk/'
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Cardiology')
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user('admin', password='pw', role='ADMIN'))
+
+    def post(self, rows, **data):
+        return self.client.post(self.url, {'staff': rows, **data}, format='json')
+
+    def nurse(self, username: str, **fields) -> Dict[str, str]:
+        return {'username': username, 'role': 'NURSE', 'department': 'Cardiology', 'shift': 'Night', **fields}
+
+    def errors(self, response) -> Dict[str, List[str]]:
+        return {result['username']: sorted(result['errors']) for result in response.data['results']
+                if result['status'] == 'error'}
+
+    def test_csv_roster_creates_accounts_and_profiles(self):
+        roster = (
+            'username,password,role,department,specialization,shift,position\n'
+            'ada,Str0ng-pass!,DOCTOR,cardiology,Cardiology,,\n'
+            f'ben,,NURSE,{self.department.pk},,Night,\n'
+            'cy,,RECEPTIONIST,Cardiology,,,Front desk\n'
+            'dee,,ADMIN,,,,\n'
+        )
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(roster)
+        self.addCleanup(os.remove, f.name)
+        call_command('onboard_staff', f.name, stdout=StringIO(), stderr=StringIO())
+
+        self.assertTrue(CustomUser.objects.get(username='ada').check_password('Str0ng-pass!'))
+        self.assertFalse(CustomUser.objects.get(username='ben').has_usable_password())
+        self.assertEqual(Doctor.objects.get(user__username='ada').department, self.department)
+        self.assertEqual(Nurse.objects.get(user__username='ben').shift, 'Night')
+        self.assertEqual(Staff.objects.get(user__username='cy').role, 'Front desk')
+        # An admin without a department gets an account but no profile
+        self.assertEqual(CustomUser.objects.get(username='dee').role, 'ADMIN')
+        self.assertFalse(Staff.objects.filter(user__username='dee').exists())
+
+    def test_json_roster_upload(self):
+        roster = json.dumps({'staff': [
+            {'username': 'ada', 'role': 'DOCTOR', 'department': 'Cardiology', 'specialization': 'Cardiology'},
+            self.nurse('ben'),
+        ]})
+        upload = SimpleUploadedFile('roster.json', roster.encode(), content_type='application/json')
+        response = self.client.post(self.url, {'roster': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertTrue(Doctor.objects.filter(user__username='ada').exists())
+        self.assertTrue(Nurse.objects.filter(user__username='ben').exists())
+
+    def test_invalid_rows_are_skipped_and_reported(self):
+        CustomUser.objects.create_user('taken', password='pw', role='NURSE')
+        response = self.post([
+            self.nurse('ben'),
+            self.nurse('ben'),
+            self.nurse('taken'),
+            self.nurse('cy', department='Oncology'),
+            {'username': 'dee', 'role': 'DOCTOR', 'department': 'Cardiology'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 4))
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['created', 'error', 'error', 'error', 'error'])
+        taken = {'username': ['A user with that username already exists.']}
+        self.assertEqual(response.data['results'][1]['errors'], taken)
+        self.assertEqual(response.data['results'][2]['errors'], taken)
+        self.assertEqual(self.errors(response)['cy'], ['department'])
+        self.assertEqual(self.errors(response)['dee'], ['specialization'])
+        self.assertEqual(list(Nurse.objects.values_list('user__username', flat=True)), ['ben'])
+
+    def test_numeric_values_are_department_ids(self):
+        # A department named like another one's id doesn't shadow it
+        decoy = Department.objects.create(name=str(self.department.pk))
+        response = self.post([self.nurse('ben', department=str(self.department.pk)),
+                              self.nurse('cy', department=str(decoy.pk + 100))])
+        self.assertEqual(Nurse.objects.get(user__username='ben').department, self.department)
+        self.assertEqual(self.errors(response), {'cy': ['department']})
+
+    def test_dry_run_creates_nothing(self):
+        response = self.post([self.nurse('ben'), self.nurse('ben')], dry_run=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.data['results']], ['valid', 'error'])
+        self.assertEqual(response.data['created'], 0)
+        self.assertFalse(CustomUser.objects.filter(username='ben').exists())
+
+    @override_settings(STAFF_ONBOARDING={'MAX_HTTP_ROWS': 2})
+    def test_rosters_over_max_http_rows_are_rejected(self):
+        response = self.post([self.nurse('ben'), self.nurse('cy'), self.nurse('dee')])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CustomUser.objects.filter(role='NURSE').exists())
@@ -0,0 +1,105 @@
+"""
+Token-bucket request throttling.
+
+Rates use DRF's ``DEFAULT_THROTTLE_RATES`` notation: ``'60/min'`` is a
+bucket holding 60 tokens that refills at one token per second, so a client
+may burst up to the full bucket and then continues at the sustained rate.
+Buckets live in the process-local ``throttle`` cache.
+"""
+import time
+
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Base token-bucket throttle; subclasses set ``scope`` and ``get_cache_key``.
+
+    Each request costs ``get_cost(request, view)`` tokens (one by default).
+    """
+    cache_format = 'bucket_%(scope)s_%(ident)s'
+    timer = time.monotonic
+
+    def __init__(self):
+        super().__init__()
+        self.cache = caches['throttle']
+        self.refill_rate = self.num_requests / self.duration if self.rate else 0
+        self.deficit = 0.0
+
+    def get_cost(self, request, view) -> float:
+        return 1
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        tokens, updated = self.cache.get(self.key, (self.num_requests, now))
+        tokens = min(self.num_requests, tokens + (now - updated) * self.refill_rate)
+        # A request may never cost more than a full bucket
+        cost = min(self.get_cost(request, view), self.num_requests)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        else:
+            self.deficit = cost - tokens
+        self.cache.set(self.key, (tokens, now), self.duration)
+        return allowed
+
+    def wait(self):
+        return self.deficit / self.refill_rate if self.refill_rate else None
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Per-user bucket for authenticated requests"""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': request.user.pk}
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Per-IP bucket for unauthenticated requests"""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginThrottle(TokenBucketThrottle):
+    """Per-IP bucket for ``/login/``, which runs the password hasher on every attempt"""
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class AvailabilityThrottle(TokenBucketThrottle):
+    """
+    Per-user (or per-IP) bucket for doctor availability.
+
+    A request costs one token per day it asks for, so a 30-day lookup uses
+    the budget of thirty single-day ones.
+    """
+    scope = 'availability'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def get_cost(self, request, view):
+        try:
+            return max(1, int(request.GET.get('days', 7)))
+        except ValueError:
+            return 1
@@ -1,20 +1,21 @@
 from django.urls import path
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
-    RegisterPatientView, RegisterStaffView, UserProfileView,
+    LoginView, RegisterPatientView, RegisterStaffView, BulkStaffOnboardingView, UserProfileView,
     DoctorListView, DoctorAvailabilityView,
-    AppointmentListCreateView, AppointmentDetailView, MyAppointmentsView,
-    MedicalRecordListCreateView, MedicalRecordDetailView, PatientMedicalHistoryView
+    AppointmentListCreateView, AppointmentDetailView, AppointmentBulkStatusView, MyAppointmentsView,
+    ArchivedAppointmentListView,
+    MedicalRecordListCreateView, MedicalRecordDetailView, PatientMedicalHistoryView, PatientSearchView,
+    AppointmentChangesView, MedicalRecordChangesView, DatabasePoolStatsView, DoctorUtilizationView,
+    PatientDemographicsView
 )
 
 urlpatterns = [
     # Authentication
     path('register/patient/', RegisterPatientView.as_view(), name='register_patient'),
     path('register/staff/', RegisterStaffView.as_view(), name='register_staff'),
-    path('login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('register/staff/bulk/', BulkStaffOnboardingView.as_view(), name='register_staff_bulk'),
+    path('login/', LoginView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('profile/', UserProfileView.as_view(), name='user_profile'),
     
@@ -25,10 +26,24 @@ urlpatterns = [
     # Appointments
     path('appointments/', AppointmentListCreateView.as_view(), name='appointment_list_create'),
     path('appointments/my/', MyAppointmentsView.as_view(), name='my_appointments'),
+    path('appointments/bulk-status/', AppointmentBulkStatusView.as_view(), name='appointment_bulk_status'),
+    path('appointments/archive/', ArchivedAppointmentListView.as_view(), name='archived_appointments'),
     path('appointments/<int:pk>/', AppointmentDetailView.as_view(), name='appointment_detail'),
     
     # Medical Records / EHR
     path('medical-records/', MedicalRecordListCreateView.as_view(), name='medical_record_list_create'),
     path('medical-records/<int:pk>/', MedicalRecordDetailView.as_view(), name='medical_record_detail'),
+    path('patients/search/', PatientSearchView.as_view(), name='patient_search'),
     path('patients/<int:pk>/medical-history/', PatientMedicalHistoryView.as_view(), name='patient_medical_history'),
+    
+    # Delta sync
+    path('sync/appointments/', AppointmentChangesView.as_view(), name='appointment_changes'),
+    path('sync/medical-records/', MedicalRecordChangesView.as_view(), name='medical_record_changes'),
+    
+    # Analytics
+    path('analytics/utilization/', DoctorUtilizationView.as_view(), name='doctor_utilization'),
+    path('analytics/demographics/', PatientDemographicsView.as_view(), name='patient_demographics'),
+    
+    # Operations
+    path('ops/db-pool/', DatabasePoolStatsView.as_view(), name='db_pool_stats'),
 ]
\ No newline at end of file
@@ -0,0 +1,16 @@
+from django.urls import path
+
+from .async_views import (
+    AppointmentEventsView, AsyncDoctorAvailabilityView, AsyncDoctorListView, AsyncLoginView, AsyncMyAppointmentsView,
+)
+from .urls import urlpatterns as sync_urlpatterns
+
+# ASGI requests resolve against these first, so login and the read-heavy endpoints
+# are served by their async versions under the same paths and names
+urlpatterns = [
+    path('login/', AsyncLoginView.as_view(), name='token_obtain_pair'),
+    path('doctors/', AsyncDoctorListView.as_view(), name='doctor_list'),
+    path('doctors/<int:pk>/availability/', AsyncDoctorAvailabilityView.as_view(), name='doctor_availability'),
+    path('appointments/my/', AsyncMyAppointmentsView.as_view(), name='my_appointments'),
+    path('events/appointments/', AppointmentEventsView.as_view(), name='appointment_events'),
+] + sync_urlpatterns
@@ -1,25 +1,105 @@
+from bisect import bisect_right
 from datetime import datetime, timedelta, time
-from typing import List, Dict, Optional
+from itertools import accumulate
+from typing import List, Dict, Iterable, Optional, Tuple
+from django.db import IntegrityError
+from django.db.models import Q, QuerySet
 from django.utils import timezone
-from .models import Doctor, Appointment
+from .models import Doctor, Appointment, ScheduleException
 
 
-def get_doctor_schedule(doctor: Doctor, date: datetime.date) -> Optional[Dict[str, time]]:
+class ScheduleExceptions:
+    """
+    Schedule exceptions loaded for a date range, looked up by day.
+
+    Exceptions are sorted by start date alongside a running maximum of their
+    end dates, so finding those covering a day is a binary search plus a walk
+    back that stops as soon as nothing earlier can still be running.
+    """
+
+    def __init__(self, exceptions: Iterable[ScheduleException]):
+        self.exceptions = sorted(exceptions, key=lambda e: (e.start_date, e.end_date))
+        self.starts = [e.start_date for e in self.exceptions]
+        self.max_ends = list(accumulate((e.end_date for e in self.exceptions), max))
+
+    def on(self, date: datetime.date) -> List[ScheduleException]:
+        """Exceptions covering a date"""
+        found = []
+        i = bisect_right(self.starts, date) - 1
+        while i >= 0 and self.max_ends[i] >= date:
+            if self.exceptions[i].end_date >= date:
+                found.append(self.exceptions[i])
+            i -= 1
+        return found
+
+    def is_day_off(self, date: datetime.date) -> bool:
+        return any(e.whole_day for e in self.on(date))
+
+    def blocked_hours(self, date: datetime.date) -> List[Tuple[time, time]]:
+        """(start, end) times taken out of a date by partial-day exceptions"""
+        return [(e.start_time, e.end_time) for e in self.on(date) if not e.whole_day]
+
+
+def schedule_exceptions_queryset(doctor: Doctor, first_day: datetime.date,
+                                 last_day: datetime.date) -> QuerySet:
+    """
+    Exceptions overlapping [first_day, last_day] for a doctor: their own, their
+    department's and hospital-wide ones, each an index range scan.
+    """
+    return ScheduleException.objects.filter(
+        Q(doctor=doctor) | Q(department_id=doctor.department_id) | Q(doctor__isnull=True, department__isnull=True),
+        end_date__gte=first_day,
+        start_date__lte=last_day,
+    ).only('start_date', 'end_date', 'start_time', 'end_time').order_by()
+
+
+def get_schedule_exceptions(doctor: Doctor, first_day: datetime.date,
+                            last_day: datetime.date) -> ScheduleExceptions:
+    return ScheduleExceptions(schedule_exceptions_queryset(doctor, first_day, last_day))
+
+
+async def aget_schedule_exceptions(doctor: Doctor, first_day: datetime.date,
+                                   last_day: datetime.date) -> ScheduleExceptions:
+    """Async version of get_schedule_exceptions()"""
+    return ScheduleExceptions([e async for e in schedule_exceptions_queryset(doctor, first_day, last_day)])
+
+
+def get_doctor_schedule(doctor: Doctor, date: datetime.date,
+                        exceptions: Optional[ScheduleExceptions] = None) -> Optional[Dict[str, time]]:
     """
     Get doctor's working hours for a specific date.
     
     Args:
         doctor: Doctor instance
         date: Date to check schedule for
+        exceptions: Schedule exceptions loaded for a range including the
+            date; looked up for this date alone when omitted
         
     Returns:
         Dictionary with start_time, end_time, break_start, break_end
         Returns None if doctor doesn't work on that day
     """
+    if exceptions is None:
+        exceptions = get_schedule_exceptions(doctor, date, date)
+    if exceptions.is_day_off(date):
+        return None
+    return get_weekly_schedule(doctor, date)
+
+
+def get_weekly_schedule(doctor: Doctor, date: datetime.date) -> Optional[Dict[str, time]]:
+    """
+    Working hours on the date's weekday from the repeating weekly
+    ``Doctor.schedule``, ignoring schedule exceptions.
+
+    A doctor without a schedule works the default hours every day; once a
+    schedule lists any day, the days it leaves out are days off (None).
+    """
     day_name = date.strftime('%A').lower()
     schedule = doctor.schedule.get(day_name, {})
     
     if not schedule:
+        if doctor.schedule:
+            return None
         # Default schedule if not specified
         return {
             'start_time': time(9, 0),
@@ -46,39 +126,89 @@ def get_doctor_schedule(doctor: Doctor, date: datetime.date) -> Optional[Dict[st
         }
 
 
-def get_available_slots(doctor: Doctor, date: datetime.date, duration: int = 30) -> List[datetime]:
+def get_day_appointments(doctor: Doctor, date: datetime.date):
     """
-    Calculate available time slots for a doctor on a given date.
+    Queryset of a doctor's scheduled appointments on a given date.
     
     Args:
         doctor: Doctor instance
-        date: Date to check availability for
-        duration: Appointment duration in minutes (default 30)
+        date: Date to look up
         
     Returns:
-        List of available datetime slots
+        Appointment queryset (unevaluated)
     """
-    schedule = get_doctor_schedule(doctor, date)
-    if not schedule:
-        return []
-    
-    # Get all existing appointments for this doctor on this date
     start_of_day = timezone.make_aware(datetime.combine(date, time.min))
     end_of_day = timezone.make_aware(datetime.combine(date, time.max))
     
-    existing_appointments = Appointment.objects.filter(
+    return Appointment.objects.filter(
         doctor=doctor,
         appointment_time__gte=start_of_day,
         appointment_time__lte=end_of_day,
         status='S'  # Only consider scheduled appointments
     )
+
+
+def get_available_slots(doctor: Doctor, date: datetime.date, duration: int = 30,
+                        exceptions: Optional[ScheduleExceptions] = None) -> List[datetime]:
+    """
+    Calculate available time slots for a doctor on a given date.
     
-    # Create a set of booked time ranges
-    booked_slots = set()
-    for appointment in existing_appointments:
-        slot_start = appointment.appointment_time
-        slot_end = slot_start + timedelta(minutes=appointment.duration)
+    Args:
+        doctor: Doctor instance
+        date: Date to check availability for
+        duration: Appointment duration in minutes (default 30)
+        exceptions: Schedule exceptions loaded for a range including the
+            date, to share one query across several days
+        
+    Returns:
+        List of available datetime slots
+    """
+    if exceptions is None:
+        exceptions = get_schedule_exceptions(doctor, date, date)
+    return compute_available_slots(doctor, date, duration, get_day_appointments(doctor, date), exceptions)
+
+
+async def aget_available_slots(doctor: Doctor, date: datetime.date, duration: int = 30,
+                               exceptions: Optional[ScheduleExceptions] = None) -> List[datetime]:
+    """Async version of get_available_slots() using the async ORM"""
+    if exceptions is None:
+        exceptions = await aget_schedule_exceptions(doctor, date, date)
+    existing_appointments = [
+        appointment async for appointment in get_day_appointments(doctor, date)
+    ]
+    return compute_available_slots(doctor, date, duration, existing_appointments, exceptions)
+
+
+def compute_available_slots(doctor: Doctor, date: datetime.date, duration: int,
+                            existing_appointments: Iterable[Appointment],
+                            exceptions: ScheduleExceptions) -> List[datetime]:
+    """
+    Calculate available time slots from already loaded appointments.
+    
+    Args:
+        doctor: Doctor instance
+        date: Date to check availability for
+        duration: Appointment duration in minutes
+        existing_appointments: The doctor's scheduled appointments on that date
+        exceptions: Schedule exceptions loaded for a range including the date
         
+    Returns:
+        List of available datetime slots
+    """
+    schedule = get_doctor_schedule(doctor, date, exceptions)
+    if not schedule:
+        return []
+    
+    # Create a set of booked time ranges; partial-day exceptions block time like appointments
+    booked_ranges = [
+        (appointment.appointment_time, appointment.appointment_time + timedelta(minutes=appointment.duration))
+        for appointment in existing_appointments
+    ] + [
+        (timezone.make_aware(datetime.combine(date, start)), timezone.make_aware(datetime.combine(date, end)))
+        for start, end in exceptions.blocked_hours(date)
+    ]
+    booked_slots = set()
+    for slot_start, slot_end in booked_ranges:
         # Mark all minutes in this range as booked
         current = slot_start
         while current < slot_end:
@@ -142,7 +272,8 @@ def is_slot_available(doctor: Doctor, start_time: datetime, duration: int = 30)
         return False
     
     # Get doctor's schedule for this day
-    schedule = get_doctor_schedule(doctor, start_time.date())
+    exceptions = get_schedule_exceptions(doctor, start_time.date(), start_time.date())
+    schedule = get_doctor_schedule(doctor, start_time.date(), exceptions)
     if not schedule:
         return False
     
@@ -161,6 +292,12 @@ def is_slot_available(doctor: Doctor, start_time: datetime, duration: int = 30)
         if not (slot_end <= break_start or appointment_time >= break_end):
             return False
     
+    # Check for partial-day schedule exceptions
+    slot_end_time = (start_time + timedelta(minutes=duration)).time()
+    for blocked_start, blocked_end in exceptions.blocked_hours(start_time.date()):
+        if not (slot_end_time <= blocked_start or appointment_time >= blocked_end):
+            return False
+    
     # Check for conflicting appointments
     slot_end = start_time + timedelta(minutes=duration)
     
@@ -180,3 +317,26 @@ def is_slot_available(doctor: Doctor, start_time: datetime, duration: int = 30)
     
     
     return True
+
+
+def is_slot_conflict(error: IntegrityError) -> bool:
+    """
+    Whether an IntegrityError was raised by the ``unique_doctor_appointment_time``
+    constraint, i.e. the slot was booked concurrently.
+
+    Args:
+        error: Error raised while saving an appointment
+
+    Returns:
+        True for a double booking, False for any other integrity failure
+    """
+    diag = getattr(error.__cause__, 'diag', None)
+    if diag is not None:
+        # PostgreSQL; on a partitioned table the violation names the partition's
+        # index, e.g. hospital_appointment_p202501_doctor_id_appointment_time_key
+        name = diag.constraint_name or ''
+        return name == 'unique_doctor_appointment_time' or (
+            name.startswith('hospital_appointment_') and name.endswith('_doctor_id_appointment_time_key')
+        )
+    # SQLite names the columns instead of the constraint
+    return 'hospital_appointment.doctor_id, hospital_appointment.appointment_time' in str(error)
@@ -5,26 +5,50 @@ from datetime import datetime, timedelta
 # Home page is now handled by Next.js frontend - view removed
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.views import TokenObtainPairView
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from .serializers import (
     RegisterSerializer, UserSerializer, 
     PatientProfileSerializer, DoctorProfileSerializer, 
     NurseProfileSerializer, StaffProfileSerializer,
     AppointmentSerializer, AppointmentCreateSerializer,
-    AppointmentUpdateSerializer, DoctorListSerializer,
-    AvailableSlotSerializer,
+    AppointmentUpdateSerializer, AppointmentSummarySerializer, AppointmentBulkStatusSerializer,
+    ArchivedAppointmentSerializer,
+    DoctorListSerializer, AvailableSlotSerializer,
     MedicalRecordSerializer, MedicalRecordCreateSerializer,
-    MedicalRecordUpdateSerializer, PatientMedicalHistorySerializer
+    MedicalRecordUpdateSerializer, MedicalRecordSummarySerializer,
+    PatientMedicalHistorySerializer
 )
-from .models import Patient, Doctor, Nurse, Staff, Appointment, MedicalRecord
+from .models import Patient, Doctor, Nurse, Staff, Appointment, ArchivedAppointment, MedicalRecord
+from .mixins import SparseFieldsetViewMixin, parse_field_list
+from .analytics import doctor_utilization, patient_demographics
+from .cache import get_cached_directory
+from .changefeed import InvalidCursor, changes_since
+from .db import get_pool_stats
+from .events import publish_appointment_event
+from .onboarding import RosterError, onboard_staff, read_roster
+from .search import search_patients
+from .metrics import BOOKINGS_ATTEMPTED, CANCELLATIONS, SLOT_CONFLICTS, render_metrics
+from .throttling import AvailabilityThrottle, LoginThrottle
+from .utils import is_slot_conflict
 from .permissions import (
     IsAdmin, IsDoctor, IsPatient, 
     IsPatientOrAdmin, IsAppointmentOwnerOrDoctor, CanCancelAppointment
 )
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
 from django.utils import timezone
+from rest_framework.exceptions import ValidationError
 
 User = get_user_model()
 
+class LoginView(TokenObtainPairView):
+    """JWT login with its own throttle: every attempt runs the password hasher"""
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES + [LoginThrottle]
+
+
 class RegisterPatientView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (permissions.AllowAny,)
@@ -45,6 +69,52 @@ class RegisterStaffView(generics.CreateAPIView):
     permission_classes = (IsAdmin,)
     serializer_class = RegisterSerializer
 
+class BulkStaffOnboardingView(APIView):
+    """
+    POST: Onboard many staff at once (admin only)
+          A JSON body {"staff": [rows], "dry_run": false}, or a multipart
+          upload with a "roster" CSV/JSON file (and optionally "dry_run")
+
+    Returns a result per row; valid rows are created together, invalid ones skipped.
+    """
+    permission_classes = (IsAdmin,)
+
+    def post(self, request):
+        upload = request.FILES.get('roster')
+        try:
+            if upload is not None:
+                rows = read_roster(upload.read(), upload.name)
+            else:
+                rows = request.data.get('staff')
+                if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                    raise RosterError('Send a "staff" list of objects or a "roster" file')
+        except RosterError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not rows:
+            return Response({"error": "The roster is empty"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.STAFF_ONBOARDING['MAX_HTTP_ROWS']:
+            return Response(
+                {"error": f"At most {settings.STAFF_ONBOARDING['MAX_HTTP_ROWS']} rows per request; "
+                          "use manage.py onboard_staff for larger rosters"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        try:
+            results, created = onboard_staff(rows, dry_run=dry_run)
+        except IntegrityError:
+            return Response(
+                {"error": "Another change created some of these usernames meanwhile; nothing was created, please retry"},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({
+            'dry_run': dry_run,
+            'created': created,
+            'failed': sum(result['status'] == 'error' for result in results),
+            'results': results,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
 class UserProfileView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -94,72 +164,182 @@ class UserProfileView(APIView):
         return Response({"detail": "Not implemented for this role"}, status=status.HTTP_501_NOT_IMPLEMENTED)
 
 
+class DatabasePoolStatsView(APIView):
+    """Connection pool metrics for the worker serving the request (admin only)"""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(get_pool_stats())
+
+
+class DoctorUtilizationView(APIView):
+    """
+    GET: Booked vs. scheduled minutes per doctor, department and weekday (admin only)
+         ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive), optional ?department=<id>
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        try:
+            start = datetime.strptime(request.query_params.get('start', ''), '%Y-%m-%d').date()
+            end = datetime.strptime(request.query_params.get('end', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return Response(
+                {"error": "start and end are required (format: YYYY-MM-DD)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 <= (end - start).days < settings.ANALYTICS_MAX_DAYS:
+            return Response(
+                {"error": f"end must be on or after start and at most {settings.ANALYTICS_MAX_DAYS} days later"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        department = request.query_params.get('department')
+        try:
+            department = int(department) if department else None
+        except ValueError:
+            return Response({"error": "department must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(doctor_utilization(start, end, department))
+
+
+class PatientDemographicsView(APIView):
+    """GET: Patient counts per age band, gender, patient type and assigned staff (admin only)"""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(patient_demographics())
+
+
+def prometheus_metrics(request):
+    """Prometheus scrape endpoint (text exposition format)"""
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
+
+
 # Appointment Views
 
+def filter_doctors(queryset, params):
+    """Apply the doctor directory query filters (department, specialization)"""
+    # Filter by department
+    department = params.get('department', None)
+    if department:
+        queryset = queryset.filter(department_id=department)
+    
+    # Filter by specialization
+    specialization = params.get('specialization', None)
+    if specialization:
+        queryset = queryset.filter(specialization__icontains=specialization)
+    
+    return queryset
+
+
+def parse_availability_params(params):
+    """
+    Parse the availability query parameters.
+    
+    Returns:
+        Tuple of (start date, number of days, slot duration in minutes)
+        
+    Raises:
+        ValueError: with a client-facing message if a parameter is invalid
+    """
+    # Get date from query params (required)
+    date_str = params.get('date')
+    if not date_str:
+        raise ValueError("Date parameter is required (format: YYYY-MM-DD)")
+    
+    try:
+        date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError("Invalid date format. Use YYYY-MM-DD")
+    
+    try:
+        # Get number of days to check (default 7)
+        days = int(params.get('days', 7))
+        # Get duration (default 30 minutes)
+        duration = int(params.get('duration', 30))
+    except ValueError:
+        raise ValueError("days and duration must be integers")
+    
+    if not 1 <= days <= settings.AVAILABILITY_MAX_DAYS:
+        raise ValueError(f"days must be between 1 and {settings.AVAILABILITY_MAX_DAYS}")
+    
+    return date, days, duration
+
+
+def filter_appointments_by_type(queryset, filter_type):
+    """Apply the upcoming/past/cancelled filter of the "my appointments" views"""
+    if filter_type == 'upcoming':
+        queryset = queryset.filter(
+            appointment_time__gte=timezone.now(),
+            status='S'
+        )
+    elif filter_type == 'past':
+        queryset = queryset.filter(
+            appointment_time__lt=timezone.now()
+        )
+    elif filter_type == 'cancelled':
+        queryset = queryset.filter(status='X')
+    
+    return queryset
+
+
 class DoctorListView(generics.ListAPIView):
-    """List all doctors with their specializations and departments"""
+    """
+    List all doctors with their specializations and departments.
+    Listings are cached per filter combination and invalidated on changes.
+    """
     queryset = Doctor.objects.all()
     serializer_class = DoctorListSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    def list(self, request, *args, **kwargs):
+        filters = {
+            'department': request.query_params.get('department'),
+            'specialization': (request.query_params.get('specialization') or '').lower(),
+        }
+        data = get_cached_directory(
+            filters,
+            lambda: list(super(DoctorListView, self).list(request, *args, **kwargs).data)
+        )
+        return Response(data)
+    
     def get_queryset(self):
-        queryset = Doctor.objects.all()
-        
-        # Filter by department
-        department = self.request.query_params.get('department', None)
-        if department:
-            queryset = queryset.filter(department_id=department)
-        
-        # Filter by specialization
-        specialization = self.request.query_params.get('specialization', None)
-        if specialization:
-            queryset = queryset.filter(specialization__icontains=specialization)
-        
-        return queryset
+        return filter_doctors(Doctor.objects.select_related('user'), self.request.query_params)
 
 
 class DoctorAvailabilityView(APIView):
     """Get available time slots for a specific doctor"""
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES + [AvailabilityThrottle]
     
     def get(self, request, pk):
         try:
-            doctor = Doctor.objects.get(pk=pk)
+            doctor = Doctor.objects.select_related('user').get(pk=pk)
         except Doctor.DoesNotExist:
             return Response(
                 {"error": "Doctor not found"}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Get date from query params (required)
-        date_str = request.query_params.get('date')
-        if not date_str:
-            return Response(
-                {"error": "Date parameter is required (format: YYYY-MM-DD)"}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
         try:
-            date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        except ValueError:
+            date, days, duration = parse_availability_params(request.query_params)
+        except ValueError as e:
             return Response(
-                {"error": "Invalid date format. Use YYYY-MM-DD"}, 
+                {"error": str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get number of days to check (default 7)
-        days = int(request.query_params.get('days', 7))
-        
-        # Get duration (default 30 minutes)
-        duration = int(request.query_params.get('duration', 30))
-        
         # Calculate available slots for each day
-        from .utils import get_available_slots
+        from .utils import get_available_slots, get_schedule_exceptions
         
+        # One query for the leave, closures and holidays across the whole range
+        exceptions = get_schedule_exceptions(doctor, date, date + timedelta(days=days - 1))
         all_slots = []
         for day_offset in range(days):
             check_date = date + timedelta(days=day_offset)
-            slots = get_available_slots(doctor, check_date, duration)
+            slots = get_available_slots(doctor, check_date, duration, exceptions)
             
             for slot in slots:
                 all_slots.append({
@@ -175,17 +355,20 @@ class DoctorAvailabilityView(APIView):
         })
 
 
-class AppointmentListCreateView(generics.ListCreateAPIView):
+class AppointmentListCreateView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
     """
     GET: List user's appointments (patients see their own, doctors see their schedule)
+         Summary representation by default; ?view=full, ?fields= and ?omit= pick columns
     POST: Create new appointment (patients only)
     """
     permission_classes = [permissions.IsAuthenticated]
+    serializer_class = AppointmentSerializer
+    summary_serializer_class = AppointmentSummarySerializer
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return AppointmentCreateSerializer
-        return AppointmentSerializer
+        return super().get_serializer_class()
     
     def get_queryset(self):
         user = self.request.user
@@ -232,6 +415,22 @@ class AppointmentListCreateView(generics.ListCreateAPIView):
         
         return queryset.order_by('appointment_time')
     
+    def create(self, request, *args, **kwargs):
+        BOOKINGS_ATTEMPTED.inc()
+        try:
+            return super().create(request, *args, **kwargs)
+        except ValidationError as exc:
+            codes = exc.get_codes()
+            if isinstance(codes, dict) and 'unique' in codes.get('non_field_errors', []):
+                SLOT_CONFLICTS.inc()
+            raise
+        except IntegrityError as exc:
+            if not is_slot_conflict(exc):
+                raise
+            # Lost a race with a concurrent booking for the same slot
+            SLOT_CONFLICTS.inc()
+            raise ValidationError({"appointment_time": ["This time slot is already booked."]})
+    
     def perform_create(self, serializer):
         # Automatically set patient to current user's patient profile
         user = self.request.user
@@ -283,6 +482,7 @@ class AppointmentDetailView(generics.RetrieveUpdateDestroyAPIView):
         # Mark as cancelled instead of deleting
         appointment.status = 'X'
         appointment.save()
+        CANCELLATIONS.inc()
         
         return Response(
             {"message": "Appointment cancelled successfully"},
@@ -290,7 +490,81 @@ class AppointmentDetailView(generics.RetrieveUpdateDestroyAPIView):
         )
 
 
-class MyAppointmentsView(generics.ListAPIView):
+def publish_status_events(recipients, new_status, updated_at) -> None:
+    """Publish live events for appointments whose status was changed with update()"""
+    event = 'cancelled' if new_status == 'X' else 'updated'
+    for pk, (patient_user_id, doctor_user_id, appointment_time) in recipients.items():
+        publish_appointment_event(event, {
+            'id': pk,
+            'status': new_status,
+            'appointment_time': appointment_time,
+            'updated_at': updated_at,
+        }, (patient_user_id, doctor_user_id))
+
+
+class AppointmentBulkStatusView(APIView):
+    """
+    POST: Record the outcome of many scheduled appointments at once
+          {"ids": [...], "status": "C" | "X" | "N"}
+
+    Same rules as updating a single appointment: doctors may change their
+    own appointments, admins any. Only scheduled appointments can change
+    status, and only past ones can be completed or marked no-show. The
+    eligible rows are updated with a single UPDATE; the response reports
+    the outcome for every requested id.
+    """
+    permission_classes = [IsAppointmentOwnerOrDoctor]
+
+    def post(self, request):
+        user = request.user
+        if user.role not in ['DOCTOR', 'ADMIN']:
+            return Response(
+                {"error": "Only doctors and admins can update appointments"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = AppointmentBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        new_status = serializer.validated_data['status']
+        now = timezone.now()
+
+        results = {}
+        with transaction.atomic():
+            # Lock the rows so the statuses checked below are the ones updated
+            rows = (Appointment.objects.select_for_update(of=('self',))
+                    .filter(pk__in=ids)
+                    .values_list('pk', 'status', 'appointment_time', 'doctor__user_id', 'patient__user_id'))
+            eligible = []
+            recipients = {}
+            for pk, current, appointment_time, doctor_user_id, patient_user_id in rows:
+                if user.role == 'DOCTOR' and doctor_user_id != user.pk:
+                    results[pk] = {"id": pk, "result": "forbidden"}
+                elif current != 'S':
+                    results[pk] = {"id": pk, "result": "invalid_transition", "status": current}
+                elif new_status in ('C', 'N') and appointment_time > now:
+                    results[pk] = {"id": pk, "result": "not_due"}
+                else:
+                    results[pk] = {"id": pk, "result": "updated"}
+                    eligible.append(pk)
+                    recipients[pk] = (patient_user_id, doctor_user_id, appointment_time)
+
+            # update() bypasses auto_now, so stamp updated_at explicitly
+            updated = Appointment.objects.filter(pk__in=eligible).update(status=new_status, updated_at=now)
+            # update() sends no post_save either, so publish the live events here
+            transaction.on_commit(lambda: publish_status_events(recipients, new_status, now))
+
+        if new_status == 'X':
+            CANCELLATIONS.inc(updated)
+
+        return Response({
+            "status": new_status,
+            "updated": updated,
+            "results": [results.get(pk, {"id": pk, "result": "not_found"}) for pk in ids],
+        })
+
+
+class MyAppointmentsView(SparseFieldsetViewMixin, generics.ListAPIView):
     """Convenience endpoint for patients to see their appointments"""
     serializer_class = AppointmentSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -312,35 +586,58 @@ class MyAppointmentsView(generics.ListAPIView):
         
         # Filter by type
         filter_type = self.request.query_params.get('filter', None)
-        
-        if filter_type == 'upcoming':
-            queryset = queryset.filter(
-                appointment_time__gte=timezone.now(),
-                status='S'
-            )
-        elif filter_type == 'past':
-            queryset = queryset.filter(
-                appointment_time__lt=timezone.now()
-            )
-        elif filter_type == 'cancelled':
-            queryset = queryset.filter(status='X')
+        queryset = filter_appointments_by_type(queryset, filter_type)
         
         return queryset.order_by('appointment_time')
 
 
+class ArchivedAppointmentListView(generics.ListAPIView):
+    """
+    GET: Archived (old cancelled) appointments, newest first
+         Patients see their own, doctors theirs, admins all;
+         ?start_date= / ?end_date= (YYYY-MM-DD) narrow the range
+    """
+    serializer_class = ArchivedAppointmentSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == 'PATIENT':
+            queryset = ArchivedAppointment.objects.filter(patient__user=user)
+        elif user.role == 'DOCTOR':
+            queryset = ArchivedAppointment.objects.filter(doctor__user=user)
+        elif user.role == 'ADMIN':
+            queryset = ArchivedAppointment.objects.all()
+        else:
+            queryset = ArchivedAppointment.objects.none()
+
+        for param, lookup in (('start_date', 'appointment_time__gte'), ('end_date', 'appointment_time__lte')):
+            value = self.request.query_params.get(param)
+            if value:
+                try:
+                    queryset = queryset.filter(**{lookup: timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))})
+                except ValueError:
+                    pass
+
+        return queryset.order_by('-appointment_time')
+
+
 # Medical Record / EHR Views
 
-class MedicalRecordListCreateView(generics.ListCreateAPIView):
+class MedicalRecordListCreateView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
     """
     GET: List medical records (filtered by user role)
+         Summary representation by default; ?view=full, ?fields= and ?omit= pick columns
     POST: Create new medical record (doctors only)
     """
     permission_classes = [permissions.IsAuthenticated]
+    serializer_class = MedicalRecordSerializer
+    summary_serializer_class = MedicalRecordSummarySerializer
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return MedicalRecordCreateSerializer
-        return MedicalRecordSerializer
+        return super().get_serializer_class()
     
     def get_queryset(self):
         user = self.request.user
@@ -496,3 +793,105 @@ class PatientMedicalHistoryView(generics.RetrieveAPIView):
         else:
             return Patient.objects.none()
 
+
+class PatientSearchView(APIView):
+    """
+    GET: Patient typeahead for staff
+         ?q= part of a name or contact number, ?limit= maximum results
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role not in ['DOCTOR', 'NURSE', 'ADMIN', 'RECEPTIONIST']:
+            return Response(
+                {"error": "Only staff can search patients"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        config = settings.PATIENT_SEARCH
+        query = request.query_params.get('q', '').strip()
+        if len(query) < config['MIN_LENGTH']:
+            return Response(
+                {"error": f"q must be at least {config['MIN_LENGTH']} characters"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(max(1, int(request.query_params.get('limit', config['LIMIT']))), config['MAX_LIMIT'])
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(list(search_patients(query, limit)))
+
+
+# Delta Sync
+
+class ChangeFeedView(APIView):
+    """
+    GET: Rows created or changed since ``?cursor=`` (all rows when omitted)
+         ?limit= sets the page size; ?fields= / ?omit= pick columns
+
+    Returns ``results``, the ``cursor`` to send on the next request and
+    ``has_more`` when further changes are ready right away.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = None
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def get(self, request):
+        config = settings.CHANGE_FEED
+        try:
+            limit = min(int(request.query_params.get('limit', config['PAGE_SIZE'])), config['MAX_PAGE_SIZE'])
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"error": "limit must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+        fields = parse_field_list(request.query_params.get('fields'))
+        omit = parse_field_list(request.query_params.get('omit'))
+        serializer = self.serializer_class(fields=fields, omit=omit)
+        # updated_at drives the cursor even when it is not rendered
+        queryset = serializer.trim_queryset(self.get_queryset()).only(
+            *serializer.get_model_columns(), 'updated_at')
+
+        try:
+            rows, cursor, has_more = changes_since(queryset, request.query_params.get('cursor'), limit)
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'results': self.serializer_class(rows, many=True, fields=fields, omit=omit).data,
+            'cursor': cursor,
+            'has_more': has_more,
+        })
+
+
+class AppointmentChangesView(ChangeFeedView):
+    """Appointment change feed: patients and doctors get their own, admins all"""
+    serializer_class = AppointmentSerializer
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == 'PATIENT':
+            return Appointment.objects.filter(patient__user=user)
+        if user.role == 'DOCTOR':
+            return Appointment.objects.filter(doctor__user=user)
+        if user.role == 'ADMIN':
+            return Appointment.objects.all()
+        return Appointment.objects.none()
+
+
+class MedicalRecordChangesView(ChangeFeedView):
+    """Medical record change feed, scoped like the medical record list"""
+    serializer_class = MedicalRecordSerializer
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == 'PATIENT':
+            return MedicalRecord.objects.filter(patient__user=user)
+        if user.role == 'DOCTOR':
+            return MedicalRecord.objects.filter(doctor__user=user)
+        if user.role in ['ADMIN', 'NURSE', 'RECEPTIONIST']:
+            return MedicalRecord.objects.all()
+        return MedicalRecord.objects.none()
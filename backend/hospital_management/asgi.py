@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application  # type: ignore
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_management.settings')
+# Persistent connections don't suit ASGI; see DATABASE_POOL in settings
+os.environ['HOSPITAL_SERVING_ASGI'] = '1'
 
 application = get_asgi_application()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -38,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -46,6 +48,11 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'hospital.middleware.CompressionMiddleware',
+    'hospital.middleware.RequestMetricsMiddleware',
+    'hospital.middleware.LoadSheddingMiddleware',
+    'hospital.middleware.ReplicaRoutingMiddleware',
+    'hospital.middleware.ASGIURLConfMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,6 +63,8 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'hospital_management.urls'
+# Used for requests served through asgi.py: async versions of the read-heavy views
+ASGI_ROOT_URLCONF = 'hospital_management.urls_asgi'
 
 TEMPLATES = [
     {
@@ -87,9 +96,83 @@ DATABASES = {
         'PASSWORD': 'securepassword',
         'HOST': 'localhost',
         'PORT': '5432',
-    }
+    },
+    # Read replicas: add aliases here and list them in DATABASE_REPLICAS, e.g.
+    # 'replica1': {
+    #     'ENGINE': 'django.db.backends.postgresql',
+    #     'NAME': 'hospital_db',
+    #     'USER': 'hospital_user',
+    #     'PASSWORD': 'securepassword',
+    #     'HOST': 'replica1.internal',
+    #     'PORT': '5432',
+    #     'TEST': {'MIRROR': 'default'},
+    # },
 }
 
+# Set by hospital_management.asgi before the settings load
+SERVING_ASGI = os.environ.get('HOSPITAL_SERVING_ASGI') == '1'
+
+# Connection pooling
+# 'persistent': each worker thread keeps its connection open for MAX_AGE seconds.
+#   Not under ASGI, where sync ORM calls run on short-lived threads whose
+#   connections would never be reused or closed: connections are then closed
+#   per request, as with 'off'. Use 'pool' to reuse connections under ASGI.
+# 'pool': psycopg 3 connection pool shared by a worker's threads (needs psycopg[pool])
+# 'off': open and close a connection per request
+DATABASE_POOL = {
+    'MODE': 'persistent',
+    'MAX_AGE': 60,       # seconds, 'persistent' mode
+    'MIN_SIZE': 2,       # connections, 'pool' mode
+    'MAX_SIZE': 10,
+    'TIMEOUT': 10,       # seconds to wait for a free pooled connection
+}
+
+for _alias, _db in DATABASES.items():
+    # Ping reused connections before handing them to a request
+    _db['CONN_HEALTH_CHECKS'] = DATABASE_POOL['MODE'] != 'off'
+    if DATABASE_POOL['MODE'] == 'pool':
+        _db['CONN_MAX_AGE'] = 0
+        _db.setdefault('OPTIONS', {})['pool'] = {
+            'name': _alias,
+            'min_size': DATABASE_POOL['MIN_SIZE'],
+            'max_size': DATABASE_POOL['MAX_SIZE'],
+            'timeout': DATABASE_POOL['TIMEOUT'],
+        }
+    else:
+        _persistent = DATABASE_POOL['MODE'] == 'persistent' and not SERVING_ASGI
+        _db['CONN_MAX_AGE'] = DATABASE_POOL['MAX_AGE'] if _persistent else 0
+
+# Safe (GET/HEAD/OPTIONS) reads are spread across these aliases; writes and
+# reads inside transactions always use 'default'
+DATABASE_REPLICAS: list[str] = []
+DATABASE_ROUTERS = ['hospital.routers.PrimaryReplicaRouter']
+
+# Keep a client's reads on the primary this long after it writes (seconds)
+REPLICA_STICKY_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Use a shared backend (Redis/Memcached) in production so invalidations reach every worker
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hospital-default',
+    },
+    # Throttle buckets: per-process on purpose, checked on every request
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hospital-throttle',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# Doctor directory cache (seconds)
+DOCTOR_DIRECTORY_CACHE_TIMEOUT = 300
+DOCTOR_DIRECTORY_STALE_TIMEOUT = 3600
+DOCTOR_DIRECTORY_REBUILD_LOCK_TIMEOUT = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -108,10 +191,16 @@ AUTH_PASSWORD_VALIDATORS = [
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
     }
 ]
-REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    ),
+
+AUTHENTICATION_BACKENDS = ['hospital.backends.OffloadedModelBackend']
+
+# Password hashing/verification in a per-process worker pool (see hospital.hashing)
+PASSWORD_HASHING = {
+    'OFFLOAD': True,
+    'WORKERS': 2,          # processes per server process
+    'MAX_PENDING': 64,     # queued calls before new ones wait
+    'QUEUE_TIMEOUT': 5,    # seconds to wait for a slot before answering 503
+    'BULK_WORKERS': None,  # threads hashing a roster in manage.py onboard_staff; None = one per CPU
 }
 
 SIMPLE_JWT = {
@@ -152,8 +241,136 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'hospital.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    # Token buckets (hospital.throttling): 'N/period' bursts up to N, refills at N per period
+    'DEFAULT_THROTTLE_CLASSES': (
+        'hospital.throttling.UserTokenBucketThrottle',
+        'hospital.throttling.IPTokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'user': '1200/min',
+        'anon': '300/min',
+        'login': '60/min',
+        # Charged per requested day
+        'availability': '300/min',
+    },
+    # Reverse proxies in front of the app. Anonymous and login buckets are keyed
+    # by client IP: with 0 that is REMOTE_ADDR and X-Forwarded-For is ignored;
+    # behind N trusted proxies (e.g. 1 for nginx) it is the address the
+    # outermost one appended. Never leave it unset (None): DRF then takes the
+    # client-supplied X-Forwarded-For as is, so rotating it evades the buckets.
+    'NUM_PROXIES': 0,
+}
+
+# Delta-sync change feeds (/api/sync/...)
+CHANGE_FEED = {
+    'PAGE_SIZE': 200,
+    'MAX_PAGE_SIZE': 1000,
+    # Rows younger than this are held back until concurrent transactions have committed
+    'SETTLE_SECONDS': 5,
+}
+
+# Live appointment events (server-sent events, ASGI only)
+EVENTS = {
+    # InProcessBroadcast only reaches streams in the process that made the change;
+    # use hospital.events.PostgresBroadcast when running more than one process
+    'BACKEND': 'hospital.events.InProcessBroadcast',
+    'QUEUE_SIZE': 100,         # undelivered events per stream before it must resync
+    'HEARTBEAT_SECONDS': 15,   # keepalive comment interval, below proxy idle timeouts
+    'RETRY_MS': 3000,          # client reconnect delay
+}
+
+# Appointment reminders (python manage.py run_reminders)
+REMINDERS = {
+    'CHANNEL': 'hospital.reminders.LogChannel',  # or EmailChannel, LocMemChannel
+    'LEAD_MINUTES': 24 * 60,        # how long before the appointment to remind
+    'POLL_SECONDS': 60,             # how often to load the next window and recent changes
+    'LOOKAHEAD_SECONDS': 300,       # reminders held in memory beyond the next due one; > POLL_SECONDS
+    'TICK_SECONDS': 1,              # timer wheel resolution
+    'WHEEL_SLOTS': 3600,
+    'RETRY_SECONDS': 300,           # after a channel failure
+    'CHANGE_OVERLAP_SECONDS': 5,
+}
+
+# Past-appointment sweep (python manage.py sweep_appointments)
+APPOINTMENT_SWEEP = {
+    'GRACE_HOURS': 24,   # time doctors get to record the outcome themselves
+    'CHUNK_SIZE': 1000,  # rows per UPDATE/transaction
+}
+
+# Admin changelists of tables estimated above this many rows show PostgreSQL's
+# row estimate instead of running COUNT(*) (see hospital.admin)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000
+
+# Patient typeahead (/api/patients/search/)
+PATIENT_SEARCH = {
+    'MIN_LENGTH': 2,
+    'LIMIT': 10,
+    'MAX_LIMIT': 50,
+}
+
+# Longest date range accepted by /api/analytics/utilization/
+ANALYTICS_MAX_DAYS = 366
+
+# Cached patient demographics (/api/analytics/demographics/)
+PATIENT_DEMOGRAPHICS = {
+    # New patients are added incrementally; a full re-aggregation runs at most this often
+    'FULL_REFRESH_SECONDS': 3600,
+}
+
+# Incremental columnar export for the analytics warehouse (manage.py export_analytics)
+ANALYTICS_EXPORT = {
+    'DIRECTORY': str(BASE_DIR / 'exports'),
+    # 'day' or 'month' partitions of each table by its change timestamp
+    'PARTITION': 'month',
+    'WORKERS': 4,
+    # Rows per fetch from the server-side cursor, and per Parquet row group
+    'CHUNK_SIZE': 50_000,
+    'PARQUET_COMPRESSION': 'zstd',
+    # Rows changed this recently are left to the next run, in case older transactions are still committing
+    'SETTLE_SECONDS': 60,
+}
+
+# Monthly partitions of the appointment and medical record tables (PostgreSQL,
+# see hospital.partitioning); manage.py ensure_partitions keeps this many months ahead
+PARTITIONING = {
+    'MONTHS_AHEAD': 12,
+}
+
+# manage.py archive_appointments: cancelled appointments older than this move to ArchivedAppointment
+APPOINTMENT_ARCHIVE = {
+    'AFTER_DAYS': 365,
+    'CHUNK_SIZE': 1000,
 }
 
+# Bulk staff onboarding (/api/register/staff/bulk/, manage.py onboard_staff)
+STAFF_ONBOARDING = {
+    # Rows per HTTP request. Each password takes ~0.5s in one of the WORKERS hashing
+    # processes, so 50 rows finish well inside a 30s worker timeout; the command has no limit
+    'MAX_HTTP_ROWS': 50,
+}
+
+# Largest ?days= accepted by the availability endpoint
+AVAILABILITY_MAX_DAYS = 31
+
+# Early 503s while the server is overloaded (see LoadSheddingMiddleware)
+LOAD_SHEDDING = {
+    'ENABLED': True,
+    'MAX_QUEUE_MS': 2000,   # X-Request-Start to pickup; needs the proxy to set the header
+    'MAX_IN_FLIGHT': 0,     # per worker process; 0 disables
+    'COOLDOWN_SECONDS': 10,
+    'RETRY_AFTER': 5,
+    'SHED_PATHS': ['/api/login/', '/api/register/', '/api/doctors/'],
+    'EXEMPT_PATHS': ['/metrics', '/api/ops/'],
+}
+
+# Response compression (brotli when installed, gzip otherwise)
+RESPONSE_COMPRESSION_MIN_SIZE = 1024  # bytes
+RESPONSE_COMPRESSION_BROTLI_QUALITY = 5
+
 
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # Only for development
@@ -167,3 +384,28 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 AUTH_USER_MODEL = 'hospital.CustomUser'
+
+# Per-request performance instrumentation (Server-Timing header + slow request log)
+REQUEST_METRICS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_QUERY_MS': 100,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'hospital.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
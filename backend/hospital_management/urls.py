@@ -3,8 +3,11 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from hospital.views import prometheus_metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', prometheus_metrics, name='prometheus_metrics'),
     path('api/', include('hospital.urls')),
     # Home page is now handled by the Next.js frontend
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
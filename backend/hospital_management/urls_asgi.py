@@ -0,0 +1,18 @@
+"""
+URL configuration for requests served through ASGI.
+
+Same routes as ``hospital_management.urls``, with the API's read-heavy
+endpoints replaced by their async views.
+"""
+from django.contrib import admin
+from django.urls import path, include
+from django.conf import settings
+from django.conf.urls.static import static
+
+from hospital.views import prometheus_metrics
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('metrics', prometheus_metrics, name='prometheus_metrics'),
+    path('api/', include('hospital.urls_asgi')),
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
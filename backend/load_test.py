@@ -0,0 +1,257 @@
+"""
+Load-test harness for the hospital API.
+
+Runs scripted user scenarios with many concurrent virtual users against a
+running server and reports throughput and latency percentiles per endpoint.
+
+    python manage.py seed_loadtest --doctors 20 --patients 200
+    python manage.py runserver
+    python load_test.py --patients 40 --doctors 10 --receptionists 5 --duration 60 \\
+        --output results/release-1.4.json
+    python load_test.py ... --compare results/release-1.3.json
+
+Scenarios:
+    patient       log in, browse doctors, check availability, book a slot,
+                  list own appointments
+    doctor        log in, review today's schedule and upcoming appointments,
+                  look up recent medical records
+    receptionist  log in, search doctors by specialization, look up a
+                  patient's records and medical history
+"""
+import argparse
+import http.client
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+SPECIALIZATIONS = ['Cardiology', 'Neurology', 'Pediatrics', 'Orthopedics', 'Dermatology']
+
+
+class Recorder:
+    """Thread-safe collection of (endpoint, status, latency) samples"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def record(self, name, status, elapsed_ms, ok):
+        with self.lock:
+            self.latencies[name].append(elapsed_ms)
+            self.statuses[name][status] += 1
+            if not ok:
+                self.errors[name] += 1
+
+    def summary(self, wall_seconds):
+        rows = {}
+        for name, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            rows[name] = {
+                'requests': len(ordered),
+                'errors': self.errors[name],
+                'rps': round(len(ordered) / wall_seconds, 2),
+                'mean_ms': round(statistics.mean(ordered), 2),
+                'p50_ms': round(percentile(ordered, 50), 2),
+                'p95_ms': round(percentile(ordered, 95), 2),
+                'p99_ms': round(percentile(ordered, 99), 2),
+                'max_ms': round(ordered[-1], 2),
+                'statuses': dict(self.statuses[name]),
+            }
+        return rows
+
+
+def percentile(ordered, pct):
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class VirtualUser:
+    """One simulated client with its own keep-alive connection and token"""
+
+    def __init__(self, base_url, username, password, recorder):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.username, self.password = username, password
+        self.recorder = recorder
+        self.token = None
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+    def call(self, method, path, name, body=None, expect=(200,)):
+        headers = {'Accept': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, self.prefix + path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            raw = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            raw, status = b'', 0
+        elapsed = (time.perf_counter() - start) * 1000
+
+        self.recorder.record(name, status, elapsed, status in expect)
+        if status in expect and raw:
+            try:
+                return json.loads(raw)
+            except ValueError:
+                return None
+        return None
+
+    def login(self):
+        data = self.call('POST', '/api/login/', 'POST /login/',
+                         {'username': self.username, 'password': self.password})
+        self.token = data and data.get('access')
+        return self.token is not None
+
+
+def patient_scenario(user, rng):
+    doctors = user.call('GET', '/api/doctors/', 'GET /doctors/') or []
+    if not doctors:
+        return
+    doctor = rng.choice(doctors)
+    day = (date.today() + timedelta(days=rng.randint(1, 14))).isoformat()
+    availability = user.call('GET', f"/api/doctors/{doctor['id']}/availability/?date={day}&days=3",
+                             'GET /doctors/<pk>/availability/')
+    slots = (availability or {}).get('slots') or []
+    if slots:
+        slot = rng.choice(slots)
+        # 400 means someone else booked the slot first, which is expected under load
+        user.call('POST', '/api/appointments/', 'POST /appointments/',
+                  {'doctor': doctor['id'], 'appointment_time': slot['start_time'],
+                   'reason': 'Load test booking', 'duration': 30},
+                  expect=(201, 400))
+    user.call('GET', '/api/appointments/my/?filter=upcoming', 'GET /appointments/my/')
+
+
+def doctor_scenario(user, rng):
+    today = date.today()
+    user.call('GET', f'/api/appointments/?start_date={today.isoformat()}'
+                     f'&end_date={(today + timedelta(days=1)).isoformat()}',
+              'GET /appointments/ (today)')
+    user.call('GET', '/api/appointments/my/?filter=upcoming', 'GET /appointments/my/')
+    records = user.call('GET', '/api/medical-records/', 'GET /medical-records/') or []
+    if records:
+        user.call('GET', f"/api/medical-records/{rng.choice(records)['id']}/",
+                  'GET /medical-records/<pk>/')
+
+
+def receptionist_scenario(user, rng):
+    specialization = rng.choice(SPECIALIZATIONS)
+    user.call('GET', f'/api/doctors/?specialization={specialization}', 'GET /doctors/?specialization=')
+    records = user.call('GET', '/api/medical-records/', 'GET /medical-records/') or []
+    patient_ids = sorted({record['patient'] for record in records})
+    if patient_ids:
+        patient_id = rng.choice(patient_ids)
+        user.call('GET', f'/api/medical-records/?patient={patient_id}', 'GET /medical-records/?patient=')
+        user.call('GET', f'/api/patients/{patient_id}/medical-history/',
+                  'GET /patients/<pk>/medical-history/')
+
+
+SCENARIOS = {
+    'patient': ('lt_patient', patient_scenario),
+    'doctor': ('lt_doctor', doctor_scenario),
+    'receptionist': ('lt_reception', receptionist_scenario),
+}
+
+
+def run_virtual_user(base_url, role, index, args, recorder, deadline):
+    prefix, scenario = SCENARIOS[role]
+    rng = random.Random(f'{args.seed}-{role}-{index}')
+    user = VirtualUser(base_url, f'{prefix}_{index}', args.password, recorder)
+    if not user.login():
+        return
+    while time.monotonic() < deadline:
+        scenario(user, rng)
+        if args.think_time:
+            time.sleep(rng.uniform(0, args.think_time))
+
+
+def print_report(rows, baseline=None):
+    header = f"{'endpoint':<38} {'reqs':>6} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(header)
+    print('-' * len(header))
+    for name, row in rows.items():
+        line = (f"{name:<38} {row['requests']:>6} {row['errors']:>5} {row['rps']:>8.1f} "
+                f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+        previous = (baseline or {}).get(name)
+        if previous:
+            delta = (row['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100 if previous['p95_ms'] else 0
+            line += f"   p95 {delta:+.0f}% vs baseline"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test harness for the hospital API')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--password', default='loadtest', help='password given to seed_loadtest')
+    parser.add_argument('--patients', type=int, default=20, help='concurrent patient users')
+    parser.add_argument('--doctors', type=int, default=5, help='concurrent doctor users')
+    parser.add_argument('--receptionists', type=int, default=3, help='concurrent receptionist users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--think-time', type=float, default=0.0, help='max pause between iterations')
+    parser.add_argument('--seed', default='1')
+    parser.add_argument('--output', help='write the results as JSON to this path')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    args = parser.parse_args()
+
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(target=run_virtual_user, daemon=True,
+                         args=(args.url, role, i, args, recorder, deadline))
+        for role, count in (('patient', args.patients), ('doctor', args.doctors),
+                            ('receptionist', args.receptionists))
+        for i in range(count)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    rows = recorder.summary(wall)
+    if not rows:
+        print('No requests were recorded; is the server running and seeded?', file=sys.stderr)
+        return 1
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)['endpoints']
+    print_report(rows, baseline)
+    total = sum(row['requests'] for row in rows.values())
+    print(f'\n{total} requests in {wall:.1f}s ({total / wall:.1f} req/s) with {len(threads)} virtual users')
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({
+                'run_at': datetime.now(timezone.utc).isoformat(),
+                'url': args.url,
+                'duration_s': round(wall, 2),
+                'virtual_users': {'patient': args.patients, 'doctor': args.doctors,
+                                  'receptionist': args.receptionists},
+                'endpoints': rows,
+            }, fh, indent=2)
+        print(f'Results written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -20,7 +20,7 @@ export default function MedicalRecordsList() {
 	useEffect(() => {
 		const fetchRecords = async () => {
 			try {
-				const response = await api.get('/medical-records/');
+				const response = await api.get('/medical-records/?fields=id,doctor,visit_date,diagnosis,prescriptions,visit_notes');
 				setRecords(response.data);
 			} catch (error) {
 				console.error('Failed to fetch medical records:', error);